@@ -0,0 +1,50 @@
+"""Benchmark of line balancing against the previous linear algorithm.
+
+Usage:
+    python -m benchmarks.bench_balance [items] [lines]
+"""
+import operator
+import random
+import sys
+import time
+from typing import Dict
+
+from fetchlib import balance_runs
+
+
+def balance_runs_linear(runs_required: Dict[str, float], lines: int):
+    """Previous balance_runs: load of every item is computed for every line.
+
+    Returns:
+        Amount of lines of every item.
+    """
+    lines_distribution = dict.fromkeys(runs_required.keys(), 1)
+    load = {}
+
+    for i in range(len(runs_required), lines):
+        for k in runs_required.keys():
+            load[k] = runs_required[k] / lines_distribution[k]
+        max_loaded = max(load.items(), key=operator.itemgetter(1))[0]
+        lines_distribution[max_loaded] += 1
+    return lines_distribution
+
+
+def measure(label, function, runs_required, lines):
+    start = time.perf_counter()
+    function(runs_required, lines)
+    elapsed = time.perf_counter() - start
+    print(f"{label:>7}: {elapsed * 1000:10.2f}ms")
+
+
+def main():
+    items = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    lines = int(sys.argv[2]) if len(sys.argv) > 2 else items + 500
+    rng = random.Random(0)
+    runs_required = {f"Item {i}": rng.uniform(1, 10**4) for i in range(items)}
+    print(f"items: {items}, lines: {lines}")
+    measure("linear", balance_runs_linear, runs_required, lines)
+    measure("heap", balance_runs, runs_required, lines)
+
+
+if __name__ == "__main__":
+    main()
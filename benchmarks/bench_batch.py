@@ -0,0 +1,51 @@
+"""Benchmark of planning many orders one by one and in a batch.
+
+Usage:
+    python -m benchmarks.bench_batch [orders]
+"""
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from fetchlib.batch import BatchDecomposition
+from fetchlib.decompositor import Decompositor
+from fetchlib.engine import ENGINE_NUMPY, decompose
+from fetchlib.setup import Setup
+from fetchlib.static_data_export import StaticDataExport
+
+from .synthetic_sde import write_synthetic_sde
+
+
+def main():
+    amount = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = Path(tmp) / "eve.db"
+        top = write_synthetic_sde(db_path)
+        data_export = StaticDataExport(db_path)
+        decompositor = Decompositor(data_export, Setup(path=None))
+        rng = random.Random(0)
+        orders = {
+            f"contract {i}": {
+                name: rng.randint(1, 50) for name in rng.sample(top, rng.randint(1, 5))
+            }
+            for i in range(amount)
+        }
+        # Warm up caches of data export
+        BatchDecomposition(orders=orders, decompositor=decompositor)
+
+        start = time.perf_counter()
+        for order in orders.values():
+            table = data_export.create_init_table(**order)
+            decompose(step=table, decompositor=decompositor, engine=ENGINE_NUMPY)
+        print(f"one by one: {time.perf_counter() - start:8.3f}s for {amount} orders")
+
+        start = time.perf_counter()
+        batch = BatchDecomposition(orders=orders, decompositor=decompositor)
+        batch.required_materials
+        print(f"     batch: {time.perf_counter() - start:8.3f}s for {amount} orders")
+
+
+if __name__ == "__main__":
+    main()
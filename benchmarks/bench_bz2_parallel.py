@@ -0,0 +1,68 @@
+"""Benchmark of block-parallel bz2 decompression.
+
+Usage:
+    python -m benchmarks.bench_bz2_parallel [archive.bz2]
+
+Without arguments a synthetic archive is generated.
+"""
+import bz2
+import os
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from fetchlib.bz2_parallel import decompress_file
+
+
+def synthetic_archive(directory: Path, size: int = 64 * 1024 * 1024) -> Path:
+    random.seed(0)
+    lines, total = [], 0
+    while total < size:
+        line = b"%d|%s|Tritanium|SQLite format 3\n" % (
+            random.randrange(10**6),
+            str(random.random()).encode(),
+        )
+        lines.append(line)
+        total += len(line)
+    path = directory / "synthetic.sqlite.bz2"
+    path.write_bytes(bz2.compress(b"".join(lines)))
+    return path
+
+
+def timed(source: Path, dest: Path, workers: int) -> float:
+    start = time.perf_counter()
+    decompress_file(source, dest, workers=workers)
+    return time.perf_counter() - start
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        source = Path(sys.argv[1]) if len(sys.argv) > 1 else synthetic_archive(tmp)
+        sequential = timed(source, tmp / "sequential", workers=1)
+        print(f"archive: {source} ({source.stat().st_size / 2**20:.1f}MB)")
+        print(f"sequential: {sequential:.2f}s")
+
+        cpus = os.cpu_count() or 1
+        workers = 2
+        while True:
+            workers = min(workers, cpus)
+            elapsed = timed(source, tmp / "parallel", workers=workers)
+            identical = (tmp / "parallel").read_bytes() == (
+                tmp / "sequential"
+            ).read_bytes()
+            speedup = sequential / elapsed
+            print(
+                f"workers: {workers:3d}  time: {elapsed:.2f}s  "
+                f"speedup: {speedup:.2f}x  per core: {speedup / workers:.2f}  "
+                f"identical: {identical}"
+            )
+            if workers == cpus:
+                break
+            workers *= 2
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+"""Benchmark of peak memory of Decomposition with kept and dropped steps.
+
+Usage:
+    python -m benchmarks.bench_decomposition
+"""
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+from fetchlib.decomposition import Decomposition
+from fetchlib.decompositor import Decompositor
+from fetchlib.setup import Setup
+from fetchlib.static_data_export import StaticDataExport
+
+from .synthetic_sde import write_synthetic_sde
+
+
+def measure(label, table, decompositor, **kwargs):
+    tracemalloc.start()
+    start = time.perf_counter()
+    decomposition = Decomposition(step=table, decompositor=decompositor, **kwargs)
+    for step in decomposition:
+        step["quantity"].sum()
+    decomposition.required_materials
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{label:>10}: {elapsed * 1000:8.2f}ms, peak {peak / 1024**2:6.2f}MB")
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = Path(tmp) / "eve.db"
+        top = write_synthetic_sde(db_path, levels=(400, 1200, 2400, 2400, 1200, 800))
+        data_export = StaticDataExport(db_path)
+        decompositor = Decompositor(data_export, Setup(path=None))
+        table = data_export.create_init_table(**{name: 1 for name in top})
+        # Warm up caches of data export
+        Decomposition(step=table, decompositor=decompositor)
+
+        measure("kept", table, decompositor)
+        measure("streamed", table, decompositor, lazy=True, keep_steps=False)
+
+
+if __name__ == "__main__":
+    main()
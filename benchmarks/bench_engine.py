@@ -0,0 +1,59 @@
+"""Benchmark of decomposition engines.
+
+Usage:
+    python -m benchmarks.bench_engine [eve.db]
+
+Without arguments a synthetic SDE is generated.
+"""
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from fetchlib.decompositor import Decompositor
+from fetchlib.engine import ENGINES, decompose
+from fetchlib.setup import Setup
+from fetchlib.static_data_export import StaticDataExport
+from fetchlib.timing import jobs_saved
+
+from .synthetic_sde import write_synthetic_sde
+
+REPEAT = 20
+
+
+def measure(engine, data_export, setup, order):
+    table = data_export.create_init_table(**order)
+    # Warm up caches of data export
+    decompose(step=table, decompositor=Decompositor(data_export, setup), engine=engine)
+
+    start = time.perf_counter()
+    for _ in range(REPEAT):
+        decomposition = decompose(
+            step=table, decompositor=Decompositor(data_export, setup), engine=engine
+        )
+        decomposition.steps, decomposition.required_materials
+    elapsed = (time.perf_counter() - start) / REPEAT
+    print(f"{engine:>8}: {elapsed * 1000:8.2f}ms per plan")
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        if len(sys.argv) > 1:
+            db_path = Path(sys.argv[1])
+            order = {"Avatar": 1}
+        else:
+            db_path = Path(tmp) / "eve.db"
+            order = {name: 1 for name in write_synthetic_sde(db_path, skip=0.02)[:10]}
+        data_export = StaticDataExport(db_path)
+        setup = Setup(path=None)
+        print(f"database: {db_path}, order: {order}")
+        for engine in ENGINES:
+            measure(engine, data_export, setup, order)
+        report = jobs_saved(
+            data_export.create_init_table(**order), Decompositor(data_export, setup)
+        )
+        print(str(report).splitlines()[0])
+
+
+if __name__ == "__main__":
+    main()
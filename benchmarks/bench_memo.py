@@ -0,0 +1,65 @@
+"""Benchmark of memoized step expansions.
+
+Orders are planned without memo, with an empty memo and once again after a
+change of lines, e.g. when the CLI reports jobs saved for a replanned
+production. Lines are not a part of memo keys, so the last pass replays
+every level from the memo.
+
+Usage:
+    python -m benchmarks.bench_memo
+"""
+import random
+import tempfile
+import time
+from pathlib import Path
+
+from fetchlib.decompositor import Decompositor, new_memo
+from fetchlib.engine import ENGINE_NUMPY, ENGINE_TOPOLOGICAL, decompose
+from fetchlib.setup import Setup
+from fetchlib.static_data_export import StaticDataExport
+
+from .synthetic_sde import write_synthetic_sde
+
+ORDERS = 20
+
+
+def measure(label, tables, data_export, setup, engine, memo=None):
+    start = time.perf_counter()
+    for table in tables:
+        decompose(
+            step=table,
+            decompositor=Decompositor(data_export, setup, memo),
+            engine=engine,
+        ).required_materials
+    elapsed = time.perf_counter() - start
+    stats = f", hit rate {memo.stats.hit_rate:.2f}" if memo is not None else ""
+    print(f"{label:>10}: {elapsed * 1000:8.2f}ms{stats}")
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = Path(tmp) / "eve.db"
+        top = write_synthetic_sde(db_path, skip=0.02)
+        data_export = StaticDataExport(db_path)
+        setup = Setup(path=None)
+        random.seed(1)
+        tables = [
+            data_export.create_init_table(
+                **{name: random.randint(1, 50) for name in random.sample(top, 5)}
+            )
+            for _ in range(ORDERS)
+        ]
+        # Warm up caches of data export
+        measure("warm-up", tables[:1], data_export, setup, ENGINE_NUMPY)
+
+        for engine in (ENGINE_NUMPY, ENGINE_TOPOLOGICAL):
+            print(f"engine: {engine}, orders: {ORDERS}")
+            memo = new_memo()
+            measure("no memo", tables, data_export, setup, engine)
+            measure("cold", tables, data_export, setup, engine, memo)
+            setup.production_lines += 1
+            measure("replanned", tables, data_export, setup, engine, memo)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""Benchmark of storing and loading plans.
+
+Usage:
+    python -m benchmarks.bench_plan [plans]
+"""
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+from fetchlib.batch import BatchDecomposition
+from fetchlib.decompositor import Decompositor
+from fetchlib.plan import NameTable, Plan
+from fetchlib.setup import Setup
+from fetchlib.static_data_export import StaticDataExport
+
+from .synthetic_sde import write_synthetic_sde
+
+
+def main():
+    amount = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        top = write_synthetic_sde(tmp / "eve.db")
+        data_export = StaticDataExport(tmp / "eve.db")
+        decompositor = Decompositor(data_export, Setup(path=None))
+        rng = random.Random(0)
+        orders = {
+            i: {name: rng.randint(1, 20) for name in rng.sample(top, 3)}
+            for i in range(amount)
+        }
+        batch = BatchDecomposition(orders=orders, decompositor=decompositor)
+        names = NameTable.from_data_export(data_export)
+        names.save(tmp / "names")
+
+        start = time.perf_counter()
+        for i in batch:
+            Plan.from_decomposition(batch[i], names).save(tmp / "plans" / str(i))
+        print(f"store: {time.perf_counter() - start:.2f}s for {amount} plans")
+
+        start = time.perf_counter()
+        names = NameTable.load(tmp / "names")
+        plans = [Plan.load(tmp / "plans" / str(i), names) for i in range(amount)]
+        jobs = sum(int(np.sum(plan.rows["jobs"])) for plan in plans)
+        elapsed = time.perf_counter() - start
+        size = sum(plan.nbytes for plan in plans)
+        print(
+            f"load: {elapsed:.2f}s, {size / 1024**2:.1f}MB of arrays, "
+            f"{jobs} jobs in total"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+"""Benchmark of job scheduling against step by step production.
+
+Usage:
+    python -m benchmarks.bench_scheduler [production lines] [reaction lines]
+"""
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from fetchlib.decompositor import Decompositor
+from fetchlib.engine import ArrayDecomposition
+from fetchlib.scheduler import schedule
+from fetchlib.setup import Setup
+from fetchlib.static_data_export import StaticDataExport
+from fetchlib.timing import estimate_time, format_duration
+
+from .synthetic_sde import write_synthetic_sde
+
+
+def main():
+    setup = Setup(path=None)
+    setup.production_lines = int(sys.argv[1]) if len(sys.argv) > 1 else 30
+    setup.reaction_lines = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = Path(tmp) / "eve.db"
+        top = write_synthetic_sde(db_path, skip=0.02, material_quantity=(1, 4))
+        data_export = StaticDataExport(db_path)
+        table = data_export.create_init_table(**{name: 2 for name in top[:5]})
+        decomposition = ArrayDecomposition(
+            step=table, decompositor=Decompositor(data_export, setup)
+        )
+
+        start = time.perf_counter()
+        result = schedule(decomposition)
+        elapsed = time.perf_counter() - start
+        print(f"lines: {setup.production_lines}/{setup.reaction_lines}")
+        print(f"jobs: {result.jobs.shape[0]}, scheduled in {elapsed:.2f}s")
+        print(result)
+        wall_time = estimate_time(decomposition).total_wall_time
+        print(f"Step by step estimate: {format_duration(wall_time)}")
+
+
+if __name__ == "__main__":
+    main()
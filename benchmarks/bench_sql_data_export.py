@@ -0,0 +1,63 @@
+"""Benchmark of SQL pushdown data export against the in-memory one.
+
+Usage:
+    python -m benchmarks.bench_sql_data_export [eve.db]
+
+Without arguments a synthetic SDE is generated.
+"""
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+from fetchlib.decomposition import Decomposition
+from fetchlib.decompositor import Decompositor
+from fetchlib.setup import Setup
+from fetchlib.sql_data_export import SqliteDataExport
+from fetchlib.static_data_export import StaticDataExport
+
+from .synthetic_sde import write_synthetic_sde
+
+ORDER_SIZE = 20
+
+
+def plan(data_export, order):
+    decompositor = Decompositor(data_export, Setup(path=None))
+    table = data_export.create_init_table(**order)
+    return Decomposition(step=table, decompositor=decompositor)
+
+
+def measure(name, factory, order):
+    # Warm up: snapshot/sidecar compilation is not measured
+    plan(factory(), order)
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    data_export = factory()
+    decomposition = plan(data_export, order)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(
+        f"{name:>10}: {elapsed * 1000:8.1f}ms  peak memory: {peak / 2**20:7.1f}MB  "
+        f"steps: {len(decomposition.steps)}"
+    )
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        if len(sys.argv) > 1:
+            db_path = Path(sys.argv[1])
+            order = {"Tengu": 10, "Raven": 10}
+        else:
+            db_path = Path(tmp) / "eve.db"
+            top = write_synthetic_sde(db_path)
+            order = {name: 10 for name in top[:ORDER_SIZE]}
+        print(f"database: {db_path}, order of {len(order)} items")
+        measure("in-memory", lambda: StaticDataExport(db_path), order)
+        measure("sql", lambda: SqliteDataExport(db_path), order)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""Synthetic SDE in the fuzzwork sqlite layout for benchmarks."""
+import random
+import sqlite3
+from pathlib import Path
+
+import pandas as pd
+
+BLUEPRINT_OFFSET = 10**6
+
+
+def synthetic_tables(
+    raw=300,
+    levels=(400, 1200, 2400, 800, 100),
+    inputs=(3, 9),
+    skip=0.0,
+    material_quantity=(1, 500),
+):
+    """Layered recipe DAG: level 1 are reactions, the rest is production.
+
+    Args:
+        skip - share of productable items of deeper levels added to inputs
+            of every item, so components are shared across levels
+        material_quantity - range of quantity of every input per run
+
+    Returns:
+        Dict of tables with AbstractDataExport columns and the list of
+        typeNames of the top level.
+    """
+    random.seed(0)
+    types, products, materials, activities = [], [], [], []
+    previous = list(range(1, raw + 1))
+    for type_id in previous:
+        types.append((type_id, 1, f"Raw {type_id}", 1000.0))
+    next_id = raw + 1
+    top, deeper = [], []
+    for level, size in enumerate(levels, start=1):
+        current = list(range(next_id, next_id + size))
+        next_id += size
+        activity = 11 if level == 1 else 1
+        for type_id in current:
+            blueprint = BLUEPRINT_OFFSET + type_id
+            types.append((type_id, level + 1, f"Item {type_id}", 1000.0 + level))
+            types.append((blueprint, 100, f"Item {type_id} Blueprint", None))
+            quantity = random.choice([100, 200]) if activity == 11 else 1
+            products.append((blueprint, activity, type_id, quantity))
+            activities.append((blueprint, activity, random.randint(600, 36000)))
+            sources = previous + (current[:0] if level == 1 else [])
+            if skip and deeper:
+                sources = sources + random.sample(deeper, int(len(deeper) * skip))
+            for material in random.sample(sources, random.randint(*inputs)):
+                materials.append(
+                    (blueprint, activity, material, random.randint(*material_quantity))
+                )
+        deeper += previous if level > 1 else []
+        previous = current
+        top = [f"Item {type_id}" for type_id in current]
+    tables = {
+        "invTypes": pd.DataFrame(
+            types, columns=["typeID", "groupID", "typeName", "marketGroupID"]
+        ).assign(published=1, description="Lorem ipsum " * 20),
+        "industryActivityProducts": pd.DataFrame(
+            products, columns=["typeID", "activityID", "productTypeID", "quantity"]
+        ),
+        "industryActivityMaterials": pd.DataFrame(
+            materials, columns=["typeID", "activityID", "materialTypeID", "quantity"]
+        ),
+        "industryActivity": pd.DataFrame(
+            activities, columns=["typeID", "activityID", "time"]
+        ),
+        "invMarketGroups": pd.DataFrame(
+            [(1000, None, "Synthetic", "", None, 1)],
+            columns=[
+                "marketGroupID",
+                "parentGroupID",
+                "marketGroupName",
+                "description",
+                "iconID",
+                "hasTypes",
+            ],
+        ),
+    }
+    return tables, top
+
+
+def write_synthetic_sde(path: Path, **kwargs):
+    """
+    Returns:
+        List of typeNames of the top level.
+    """
+    tables, top = synthetic_tables(**kwargs)
+    with sqlite3.connect(str(path)) as conn:
+        for name, table in tables.items():
+            table.to_sql(name, conn, index=False)
+    conn.close()
+    return top
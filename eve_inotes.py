@@ -1,22 +1,33 @@
 import os
+import sys
+from collections import defaultdict
 
+import pandas as pd
 from PyInquirer import prompt
 
-from fetchlib import balancify_runs
 from fetchlib.decomposition import Decomposition
-from fetchlib.decompositor import Decompositor
+from fetchlib.decompositor import Decompositor, new_memo
+from fetchlib.incremental import IncrementalDecomposition
+from fetchlib.name_index import UnknownTypeNames, parse_multibuy
+from fetchlib.preview import preview
+from fetchlib.render import write_plan
 from fetchlib.rig import AVALIABLE_RIGS, RigSet
+from fetchlib.scheduler import schedule
 from fetchlib.setup import SetupManager
 from fetchlib.static_data_export import sde
+from fetchlib.timing import estimate_time, jobs_saved
 from fetchlib.utils import CitadelType, ProductionClass, SpaceType
 
-setup_manager = SetupManager(data_export=sde)
-setup = setup_manager.get("main")
-
 
 class InqController:
-    def __init__(self, setup):
-        pass
+    def __init__(self, setup_manager, setup):
+        self.setup_manager = setup_manager
+        self.setup = setup
+        self.data_export = setup_manager.data_export
+        # The last plan follows changes of setup, see replan_last_production
+        self.plan = None
+        # Expansions shared by plans which are not replanned
+        self.memo = new_memo()
 
     def evaluate_production_for_list(self):
         questions = [
@@ -29,20 +40,24 @@ class InqController:
         ]
 
         string = prompt(questions)["eve_multibuy"]
-        lines = string.split("\n")
-        pairs = []
-        for line in lines:
-            if line == "":
-                continue
-            *product, amount = line.split()
-            pairs.append((" ".join(product), int(amount)))
-
-        table = sde.create_init_table(**dict(pairs))
-        decompositor = Decompositor(sde, setup)
-
-        decomposition = Decomposition(step=table, decompositor=decompositor)
-        print(str(decomposition))
-        print(balancify_runs(decomposition, setup))
+        pairs = parse_multibuy(string)
+        resolution = self.data_export.name_index.resolve_many(name for name, _ in pairs)
+        for name, close in resolution.suggestions.items():
+            hint = f", did you mean: {', '.join(close)}?" if close else ""
+            print(f"Skipped unknown item {name}{hint}")
+
+        order = defaultdict(int)
+        for name, (_, amount) in zip(resolution.names, pairs):
+            if name is not None:
+                order[name] += amount
+        if not order:
+            print("Nothing to produce")
+            return string
+
+        table = self.data_export.create_init_table(**order)
+        decompositor = Decompositor(self.data_export, self.setup)
+        self.plan = IncrementalDecomposition(step=table, decompositor=decompositor)
+        self.print_plan()
         return string
 
     def set_lines_amount(self):
@@ -61,8 +76,8 @@ class InqController:
 
         answers = prompt(questions)
         reac, produc = int(answers["reac"]), int(answers["prod"])
-        setup_manager.set_lines_amount(
-            setup=setup, reaction_lines=reac, production_lines=produc
+        self.setup_manager.set_lines_amount(
+            setup=self.setup, reaction_lines=reac, production_lines=produc
         )
         return "set_lines_amount"
 
@@ -75,24 +90,28 @@ class InqController:
             }
         ]
         answers = prompt(question)
-        setup._non_productables.add(answers["item"])
+        try:
+            self.setup_manager.add_non_productable_to_setup(self.setup, answers["item"])
+        except UnknownTypeNames as err:
+            print(err)
+            return "Unknown non-productable"
         return "Added non-productable"
 
     def show_setup(self):
         print("Rigs: ")
-        for r in setup.rig_set:
+        for r in self.setup.rig_set:
             print(r)
-        print("Citadel: {}".format(setup.citadel_type))
-        print("Space: {}".format(setup.space_type))
+        print("Citadel: {}".format(self.setup.citadel_type))
+        print("Space: {}".format(self.setup.space_type))
         print(
             "Lines - reaction: {}, production: {}".format(
-                setup.reaction_lines, setup.production_lines
+                self.setup.reaction_lines, self.setup.production_lines
             )
         )
         return "Shown setup"
 
     def set_citadel_type(self):
-        current = setup.citadel_type
+        current = self.setup.citadel_type
         possible = CitadelTypes.to_dict().values()
         activity_prompt = {
             "type": "list",
@@ -102,11 +121,11 @@ class InqController:
             "choices": [{"name": name} for name in possible],
         }
         answer = prompt(activity_prompt)
-        setup.citadel_type = answer["citadel"]
+        self.setup.citadel_type = answer["citadel"]
         return (activity_prompt, answer)
 
     def set_space_type(self):
-        current = setup.space_type
+        current = self.setup.space_type
         possible = SpaceType.to_dict().values()
         activity_prompt = {
             "type": "list",
@@ -116,11 +135,11 @@ class InqController:
             "choices": [{"name": name} for name in possible],
         }
         answer = prompt(activity_prompt)
-        setup.space_type = answer["space"]
+        self.setup.space_type = answer["space"]
         return activity_prompt, answer
 
     def select_rigs(self):
-        current = setup.rig_set
+        current = self.setup.rig_set
         activity_prompt = {
             "type": "checkbox",
             "name": "rigs",
@@ -132,7 +151,7 @@ class InqController:
             ],
         }
         answer = prompt(activity_prompt)
-        setup.rig_set = RigSet(answer["rigs"])
+        self.setup.rig_set = RigSet(answer["rigs"])
         return (activity_prompt, answer)
 
     def set_blueprint(self):
@@ -167,13 +186,16 @@ class InqController:
             },
         ]
         answers = prompt(questions)
-        setup_manager.add_blueprint_to_setup(
-            setup=setup,
-            name=answers["type_name"],
-            material_efficiency=float(answers["me"]),
-            time_efficiency=float(answers["te"]),
-            runs=int(answers["runs"]),
-        )
+        try:
+            self.setup_manager.add_blueprint_to_setup(
+                setup=self.setup,
+                name=answers["type_name"],
+                material_efficiency=float(answers["me"]),
+                time_efficiency=float(answers["te"]),
+                runs=int(answers["runs"]),
+            )
+        except UnknownTypeNames as err:
+            print(err)
         return (questions, answers)
 
     def show_collection_blueprint(self):
@@ -184,10 +206,15 @@ class InqController:
         }
         answer = prompt(question)
         no_bpc_msg = "No such BPC in collection!"
-        print(setup.collection.get(answer["bpc_name"], no_bpc_msg))
+        print(self.setup.collection.get(answer["bpc_name"], no_bpc_msg))
         return (question, answer)
 
-    def evaluate_production_schema(self):
+    def prompt_product(self):
+        """
+        Returns:
+            Answers and init table of the product, table is None if the
+            product is unknown.
+        """
         questions = [
             {
                 "type": "input",
@@ -203,23 +230,67 @@ class InqController:
         ]
         answers = prompt(questions)
 
-        product, amount = answers["product"].title(), int(answers["amount"])
-        table = sde.create_init_table(**{product: amount})
-        decompositor = Decompositor(sde, setup)
+        product, amount = answers["product"], int(answers["amount"])
+        try:
+            table = self.data_export.create_init_table(**{product: amount})
+        except UnknownTypeNames as err:
+            print(err)
+            return answers, None
+        return answers, table
 
-        decomposition = Decomposition(step=table, decompositor=decompositor)
-        print(str(decomposition))
-        print(balancify_runs(decomposition, setup))
+    def evaluate_production_schema(self):
+        answers, table = self.prompt_product()
+        if table is None:
+            return answers
+        decompositor = Decompositor(self.data_export, self.setup)
+        self.plan = IncrementalDecomposition(step=table, decompositor=decompositor)
+        self.print_plan()
         return answers
 
+    def preview_production(self):
+        answers, table = self.prompt_product()
+        if table is not None:
+            decompositor = Decompositor(self.data_export, self.setup)
+            result = preview({answers["product"]: int(answers["amount"])}, decompositor)
+            materials = pd.DataFrame(
+                {"estimate": result.estimate, "upper": result.upper}
+            )
+            print(materials.to_csv(sep="\t"))
+        return answers
+
+    def print_plan(self):
+        write_plan(self.plan, sys.stdout, setup=self.setup)
+        print(estimate_time(self.plan))
+        decompositor = Decompositor(self.data_export, self.setup, self.memo)
+        print(jobs_saved(self.plan.step, decompositor))
+        try:
+            print(schedule(self.plan))
+        except ValueError as err:
+            print(err)
+
+    def replan_last_production(self):
+        if self.plan is None:
+            print("Nothing to replan")
+            return True
+        self.plan.replan()
+        self.print_plan()
+        return True
+
     def calculate_materials(self):
-        pass
+        answers, table = self.prompt_product()
+        if table is not None:
+            decompositor = Decompositor(self.data_export, self.setup, self.memo)
+            decomposition = Decomposition(
+                step=table, decompositor=decompositor, keep_steps=False
+            )
+            print(decomposition.required_materials.to_csv(sep="\t"))
+        return answers
 
     def exit_app(self):
         pass
 
     def save_and_exit(self):
-        setup_manager.save_setup(setup)
+        self.setup_manager.save_setup(self.setup)
         return None
 
     def activity_set(self):
@@ -230,6 +301,8 @@ class InqController:
             "Choose space type": self.set_space_type,
             "Evaluate production for list": self.evaluate_production_for_list,
             "Evaluate production schema": self.evaluate_production_schema,
+            "Preview production": self.preview_production,
+            "Replan last production": self.replan_last_production,
             "Select rig set": self.select_rigs,
             "Set blueprint": self.set_blueprint,
             "Set lines amount": self.set_lines_amount,
@@ -276,5 +349,6 @@ def is_int(arg):
 
 if __name__ == "__main__":
     print("Welcome to Eve Inotes!")
-    controller = InqController(setup)
+    setup_manager = SetupManager(data_export=sde)
+    controller = InqController(setup_manager, setup_manager.get("main"))
     controller.choose_activity_cycle()
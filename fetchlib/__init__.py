@@ -1,55 +1,95 @@
-import operator
-from typing import Dict
+import heapq
+from typing import Dict, Iterator, List, NamedTuple, Tuple
 
 import numpy as np
 
 
-def balancify_runs(decomposition: "Decomposition", setup) -> str:
-    def balance_runs(runs_required: Dict[str, float], lines: int):
-        """Method to calculate lines loading according to lines amount"""
-        # FIXME Job running time is not counted right now
-        lines_distribution = dict.fromkeys(runs_required.keys(), 1)
-        load = {}
-
-        for i in range(len(runs_required), lines):
-            for k in runs_required.keys():
-                load[k] = runs_required[k] / lines_distribution[k]
-            max_loaded = max(load.items(), key=operator.itemgetter(1))[0]
-            lines_distribution[max_loaded] += 1
-        lines_load = {}
-
-        for key, value in lines_distribution.items():
-            lines_load[key] = ""
-            int_runs_required = int(np.ceil(runs_required[key]))
-            div = int_runs_required // value
-            reminder = int_runs_required % value
-            line_load = "{} x {}".format(div, value - reminder)
-            if reminder > 0:
-                line_load = line_load + " + {} x {}, total - {}".format(
-                    div + 1, reminder, value
-                )
-            lines_load[key] = line_load
-        return lines_load
+class LineLoad(NamedTuple):
+    """Runs of an item spread over its lines.
 
-    result = ["Balancing runs"]
-    for i, table in enumerate(decomposition.steps, start=1):
-        result.append(f"Balancing runs for step {i}:")
-        prod = (
-            table[table["activityID"] == 1]
-            .set_index("typeName")
-            .to_dict()["runs_required"]
-        )
-        reac = (
-            table[table["activityID"] == 11]
+    Attributes:
+        lines - amount of lines of the item
+        runs - runs of every line
+        longer - amount of lines with one extra run
+    """
+
+    lines: int
+    runs: int
+    longer: int
+
+    def __str__(self):
+        line_load = "{} x {}".format(self.runs, self.lines - self.longer)
+        if self.longer > 0:
+            line_load = line_load + " + {} x {}, total - {}".format(
+                self.runs + 1, self.longer, self.lines
+            )
+        return line_load
+
+
+def balance_runs(runs_required: Dict[str, float], lines: int) -> Dict[str, LineLoad]:
+    """Method to calculate lines loading according to lines amount.
+
+    Every item gets a line, the rest of lines goes one by one to the item
+    with the highest load(runs per line), ties go to the first item. Loads
+    are kept in a heap, so a line costs O(log items).
+    """
+    # FIXME Job running time is not counted right now
+    names = list(runs_required.keys())
+    runs = np.array([runs_required[name] for name in names], dtype="float64")
+    distribution = np.ones(len(names), dtype="int64")
+
+    heap = [(-load, i) for i, load in enumerate(runs.tolist())]
+    heapq.heapify(heap)
+    for _ in range(len(names), lines):
+        _, i = heapq.heappop(heap)
+        distribution[i] += 1
+        heapq.heappush(heap, (-(runs[i] / distribution[i]), i))
+
+    total = np.ceil(runs).astype("int64")
+    div, reminder = np.divmod(total, distribution)
+    return {
+        name: LineLoad(lines=int(value), runs=int(d), longer=int(r))
+        for name, value, d, r in zip(names, distribution, div, reminder)
+    }
+
+
+def balance_step(table, setup) -> List[Tuple[str, LineLoad]]:
+    """
+    Returns:
+        Pairs of typeName and its lines loading for a single step.
+    """
+    loads = []
+    for activity, lines in (
+        (1, setup.production_lines),
+        (11, setup.reaction_lines),
+    ):
+        runs_required = (
+            table[table["activityID"] == activity]
             .set_index("typeName")
             .to_dict()["runs_required"]
         )
+        if runs_required:
+            loads.extend(balance_runs(runs_required, lines).items())
+    return loads
+
+
+def balanced_runs(
+    decomposition: "Decomposition", setup
+) -> Iterator[Tuple[int, List[Tuple[str, LineLoad]]]]:
+    """Lines loading of every step, one step at a time.
 
-        if prod:
-            for k, v in balance_runs(prod, setup.production_lines).items():
-                result.append(f"{k} : [{v}]")
-        if reac:
-            for k, v in balance_runs(reac, setup.reaction_lines).items():
-                result.append(f"{k} : [{v}]")
+    Yields:
+        Number of step and pairs of typeName and its lines loading.
+    """
+    for i, table in enumerate(decomposition.steps, start=1):
+        yield i, balance_step(table, setup)
+
+
+def balancify_runs(decomposition: "Decomposition", setup) -> str:
+    result = ["Balancing runs"]
+    for i, loads in balanced_runs(decomposition, setup):
+        result.append(f"Balancing runs for step {i}:")
+        for k, v in loads:
+            result.append(f"{k} : [{v}]")
 
     return "\n".join(result)
@@ -0,0 +1,151 @@
+"""Planning of many independent orders in one pass.
+
+Rows of all orders are propagated level by level together, every row keeps
+the index of its order. So every level costs a single vectorized expansion
+regardless of the amount of orders, while quantities of different orders
+are never summed up: plan of every order equals its own Decomposition.
+"""
+from typing import Hashable, Iterator, List, Mapping, Tuple
+
+import numpy as np
+import pandas as pd
+
+from fetchlib.decompositor import Decompositor
+from fetchlib.engine import ArrayDecomposition
+
+Level = Tuple[np.ndarray, np.ndarray, np.ndarray]
+
+
+class BatchDecomposition:
+    """Decomposition of orders, e.g. contract lists of different customers.
+
+    Plans of single orders are available by their ids, required materials
+    of all orders are summed up.
+    """
+
+    def __init__(
+        self,
+        *,
+        orders: Mapping[Hashable, Mapping[str, int]],
+        decompositor: Decompositor,
+    ):
+        """
+        Args:
+            orders - mapping of order id to the order: typeNames to
+                produce with corresponding quantities
+            decompositor - provides data export and setup
+        Raises:
+            UnknownTypeNames(ValueError) - with suggestions for unknown names
+        """
+        self.decompositor = decompositor
+        self.data_export = decompositor.data_export
+        self.order_ids = list(orders)
+        self._positions = {order_id: i for i, order_id in enumerate(self.order_ids)}
+        # Orders, typeIDs and quantities of every step, sorted by order
+        self.levels: List[Level] = []
+        self._atomic: List[Level] = []
+        self._propagate(*self._initial_level(orders))
+
+    def _initial_level(self, orders) -> Level:
+        names, quantity, order_index = [], [], []
+        for i, order in enumerate(orders.values()):
+            names.extend(order.keys())
+            quantity.extend(order.values())
+            order_index.extend([i] * len(order))
+        resolution = self.data_export.name_index.resolve_many(names)
+        resolution.raise_for_unknown()
+        type_ids = resolution.type_ids
+        order_index = np.array(order_index, dtype="int64")
+
+        # Same items of an order are summed up, the first occurrence keeps
+        # its place as in create_init_table
+        stride = int(type_ids.max()) + 1 if type_ids.size else 1
+        keys, first, inverse = np.unique(
+            order_index * stride + type_ids, return_index=True, return_inverse=True
+        )
+        total = np.zeros(keys.shape[0], dtype="int64")
+        np.add.at(total, inverse, np.array(quantity, dtype="int64"))
+        appearance = np.argsort(first, kind="stable")
+        order_index, type_ids = np.divmod(keys[appearance], stride)
+        total = total[appearance]
+
+        productable = self.data_export.recipe_graph.is_productable(type_ids)
+        return order_index[productable], type_ids[productable], total[productable]
+
+    def _propagate(self, orders: np.ndarray, type_ids: np.ndarray, quantity):
+        while True:
+            self.levels.append((orders, type_ids, quantity))
+            expansion = self.decompositor.expand_orders(orders, type_ids, quantity)
+            self._atomic.append(expansion[:3])
+            orders, type_ids, quantity = expansion[3:]
+            if not type_ids.size:
+                break
+
+    def __len__(self):
+        return len(self.order_ids)
+
+    def __iter__(self) -> Iterator[Hashable]:
+        return iter(self.order_ids)
+
+    def __getitem__(self, order_id: Hashable) -> ArrayDecomposition:
+        """
+        Returns:
+            Plan of a single order.
+        """
+        position = self._positions[order_id]
+        levels = [_select(level, position) for level in self.levels]
+        atomic = [_select(level, position) for level in self._atomic]
+        # Order is finished at its last non-empty step
+        depth = max(
+            [1] + [i + 1 for i, (type_ids, _) in enumerate(levels) if type_ids.size]
+        )
+        return ArrayDecomposition.from_levels(
+            levels=levels[:depth],
+            atomic=atomic[:depth],
+            decompositor=self.decompositor,
+        )
+
+    @property
+    def materials(self) -> pd.DataFrame:
+        """
+        Returns:
+            Dataframe of elementary materials required for every order with
+            'order', 'typeID', 'typeName' and 'quantity' columns.
+        """
+        orders, type_ids, quantity = (
+            np.concatenate([level[i] for level in self._atomic]) for i in range(3)
+        )
+        table = pd.DataFrame(
+            {"order": orders, "typeID": type_ids, "quantity": quantity}
+        )
+        table = table.groupby(["order", "typeID"], as_index=False)["quantity"].sum()
+        ids = np.empty(len(self.order_ids), dtype="object")
+        for i, order_id in enumerate(self.order_ids):
+            ids[i] = order_id
+        return pd.DataFrame(
+            {
+                "order": ids[table["order"].to_numpy()],
+                "typeID": table["typeID"].to_numpy(),
+                "typeName": self.data_export.type_names(table["typeID"].to_numpy()),
+                "quantity": table["quantity"].to_numpy(),
+            }
+        )
+
+    @property
+    def required_materials(self) -> pd.Series:
+        """
+        Returns:
+            Elementary materials required for all orders, indexed by
+            typeName.
+        """
+        return self.materials.groupby(["typeName"])["quantity"].sum()
+
+    def __repr__(self):
+        return f"BatchDecomposition(orders: {len(self)}, levels: {len(self.levels)})"
+
+
+def _select(level: Level, position: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Rows of the order in level sorted by order."""
+    orders, type_ids, quantity = level
+    start, stop = np.searchsorted(orders, [position, position + 1])
+    return type_ids[start:stop], quantity[start:stop]
@@ -1,3 +1,4 @@
+import hashlib
 from dataclasses import dataclass, field
 from typing import Iterable, Set
 
@@ -20,6 +21,7 @@ class BlueprintCollection:
 
     def __init__(self, prints: Iterable[Blueprint]):
         self._prints = {}
+        self._fingerprint = None
         for blueprint in prints:
             self._prints[blueprint.name] = blueprint
 
@@ -34,6 +36,22 @@ class BlueprintCollection:
         """
         for blueprint in prints:
             self._prints[blueprint.name] = blueprint
+        self._fingerprint = None
+
+    @property
+    def fingerprint(self) -> str:
+        """
+        Returns:
+            Digest of blueprints, independent of the order of addition.
+            Computed once until the collection changes.
+        """
+        # Collections pickled before fingerprints have no such attribute
+        if self.__dict__.get("_fingerprint") is None:
+            state = repr(sorted(repr(blueprint) for blueprint in self))
+            self._fingerprint = hashlib.blake2b(
+                state.encode(), digest_size=16
+            ).hexdigest()
+        return self._fingerprint
 
     def __len__(self):
         return len(self._prints)
@@ -0,0 +1,166 @@
+"""Block-parallel bz2 decompression in the style of pbzip2/lbzip2.
+
+Blocks of bz2 stream start with 48-bit magic and are not aligned to bytes.
+Every block is cut out of the archive, wrapped into a single-block stream
+and decompressed independently in a process pool. Block and stream CRCs are
+verified by bz2 itself, so the result is identical to the sequential path.
+"""
+import bz2
+import logging
+import mmap
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+from typing import Iterator, List, Optional, Tuple
+
+BLOCK_MAGIC = 0x314159265359
+EOS_MAGIC = 0x177245385090
+MAGIC_BITS = 48
+MAGIC_MASK = (1 << MAGIC_BITS) - 1
+CRC_BITS = 32
+READ_SIZE = 100 * 1024
+
+logger = logging.getLogger(__name__)
+
+
+def _find_magic(data: bytes, magic: int) -> Iterator[int]:
+    """Yield bit offsets of magic in data, in no particular order."""
+    for shift in range(8):
+        # Magic shifted by `shift` bits spans 7 bytes, 5 of them are fixed
+        window = (magic << (8 - shift)).to_bytes(7, "big")
+        needle = window[1:6]
+        position = data.find(needle, 1)
+        while position != -1:
+            start = position - 1
+            chunk = data[start : start + 7]
+            if len(chunk) == 7:
+                value = int.from_bytes(chunk, "big") >> (8 - shift)
+                if value & MAGIC_MASK == magic:
+                    yield start * 8 + shift
+            position = data.find(needle, position + 1)
+
+
+def find_blocks(data: bytes) -> List[Tuple[int, int]]:
+    """
+    Returns:
+        List of (start, end) bit offsets of compressed blocks. Block starts at
+        its magic and ends at the next block or end of stream magic.
+    """
+    starts = sorted(set(_find_magic(data, BLOCK_MAGIC)))
+    ends = sorted(set(_find_magic(data, EOS_MAGIC)))
+    markers = sorted([(offset, True) for offset in starts] + [(o, False) for o in ends])
+    blocks = []
+    for (offset, is_block), (next_offset, _) in zip(markers, markers[1:]):
+        if is_block:
+            blocks.append((offset, next_offset))
+    return blocks
+
+
+def _read_bits(data: bytes, start: int, end: int) -> int:
+    first, last = start // 8, (end + 7) // 8
+    value = int.from_bytes(data[first:last], "big")
+    value >>= last * 8 - end
+    return value & ((1 << (end - start)) - 1)
+
+
+def wrap_block(data: bytes, start: int, end: int) -> bytes:
+    """Build a single-block bz2 stream from block data[start:end] (in bits)."""
+    size = end - start
+    block = _read_bits(data, start, end)
+    crc = _read_bits(data, start + MAGIC_BITS, start + MAGIC_BITS + CRC_BITS)
+    # For a single block stream combined CRC is equal to the block CRC
+    value = (((block << MAGIC_BITS) | EOS_MAGIC) << CRC_BITS) | crc
+    size += MAGIC_BITS + CRC_BITS
+    padding = -size % 8
+    return b"BZh9" + (value << padding).to_bytes((size + padding) // 8, "big")
+
+
+def _decompress_block(source: str, start: int, end: int) -> bytes:
+    with open(source, "rb") as handle:
+        handle.seek(start // 8)
+        data = handle.read((end + 7) // 8 - start // 8)
+    offset = start // 8 * 8
+    return bz2.decompress(wrap_block(data, start - offset, end - offset))
+
+
+def sequential_decompress(source: Path, dest: Path) -> Path:
+    """Decompress (possibly multistream) bz2 archive in a single thread."""
+    with open(source, "rb") as archive, open(dest, "wb") as output:
+        decompressor = bz2.BZ2Decompressor()
+        for data in iter(lambda: archive.read(READ_SIZE), b""):
+            while data:
+                if decompressor.eof:
+                    data = decompressor.unused_data + data
+                    decompressor = bz2.BZ2Decompressor()
+                output.write(decompressor.decompress(data))
+                data = decompressor.unused_data if decompressor.eof else b""
+        if not decompressor.eof:
+            raise EOFError(f"Compressed file {source} ended before the end marker")
+    return dest
+
+
+def parallel_decompress(
+    source: Path, dest: Path, workers: Optional[int] = None
+) -> Path:
+    """Decompress bz2 archive using process pool.
+
+    Raises:
+        ValueError - if blocks could not be located in archive
+        OSError - if any of the blocks is corrupted
+    """
+    with open(source, "rb") as handle:
+        with mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            blocks = find_blocks(data)
+    if not blocks:
+        raise ValueError(f"No bz2 blocks found in {source}")
+
+    workers = workers or os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=workers) as pool, open(dest, "wb") as output:
+        # Bounded amount of blocks in flight keeps memory usage flat
+        pending = deque()
+        for start, end in blocks:
+            pending.append(pool.submit(_decompress_block, str(source), start, end))
+            if len(pending) >= workers * 2:
+                output.write(pending.popleft().result())
+        while pending:
+            output.write(pending.popleft().result())
+    return dest
+
+
+def decompress_file(source: Path, dest: Path, workers: Optional[int] = None) -> Path:
+    """Decompress bz2 archive, in parallel when possible.
+
+    Falls back to sequential decompression if archive could not be split
+    into blocks or any of the blocks failed(e.g. magic found inside
+    compressed data by accident). Result is written atomically.
+
+    Args:
+        source - bz2 archive
+        dest - path of decompressed file
+        workers - size of process pool, amount of CPUs by default.
+            1 means sequential decompression.
+    """
+    source, dest = Path(source), Path(dest)
+    tmp = dest.with_name(f"{dest.name}.tmp-{os.getpid()}")
+    try:
+        done = False
+        if workers != 1:
+            try:
+                parallel_decompress(source, tmp, workers)
+                done = True
+            except (OSError, ValueError, BrokenProcessPool) as error:
+                logger.warning(
+                    "Parallel decompression of %s failed(%s), "
+                    "falling back to sequential",
+                    source,
+                    error,
+                )
+        if not done:
+            sequential_decompress(source, tmp)
+        os.replace(tmp, dest)
+    finally:
+        if tmp.exists():
+            tmp.unlink()
+    return dest
@@ -0,0 +1,220 @@
+"""Per-instance cache of data export tables and derived data.
+
+Values are stored on the owner instance, so they are released together with
+it. Every entry is tied to the data version of the owner: once the version
+changes all entries are dropped. Size of every entry is accounted in bytes
+and least recently used entries are evicted when the budget is exceeded.
+"""
+import sys
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from functools import wraps
+from typing import Any, Callable, Hashable, Iterable, Optional
+
+import numpy as np
+import pandas as pd
+
+
+@dataclass
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    invalidations: int = 0
+    entries: int = 0
+    nbytes: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        requests = self.hits + self.misses
+        return self.hits / requests if requests else 0.0
+
+
+def sizeof(value) -> int:
+    """
+    Returns:
+        Approximate size of value in bytes. Memory mapped arrays are
+        accounted with their full size.
+    """
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(index=True, deep=True).sum())
+    if isinstance(value, pd.Series):
+        return int(value.memory_usage(index=True, deep=True))
+    if isinstance(value, np.ndarray):
+        return int(value.nbytes)
+    if isinstance(getattr(value, "nbytes", None), (int, np.integer)):
+        return int(value.nbytes)
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return sys.getsizeof(value) + sum(sizeof(item) for item in value)
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(
+            sizeof(key) + sizeof(item) for key, item in value.items()
+        )
+    return sys.getsizeof(value)
+
+
+class Cache:
+    """Thread-safe LRU cache with memory budget and version tracking."""
+
+    def __init__(
+        self,
+        budget: Optional[int] = None,
+        version: Optional[Callable[[], Hashable]] = None,
+    ):
+        """
+        Args:
+            budget - max total size of entries in bytes, None for unlimited
+            version - callable returning current data version, entries
+                are dropped once it changes
+        """
+        self.budget = budget
+        self._version_source = version
+        self._version = version() if version is not None else None
+        self._entries = OrderedDict()
+        self._computing = {}
+        self._nbytes = 0
+        self._lock = threading.RLock()
+        self._stats = CacheStats()
+
+    def __contains__(self, key) -> bool:
+        with self._lock:
+            self._check_version()
+            return key in self._entries
+
+    def __len__(self):
+        return len(self._entries)
+
+    @property
+    def nbytes(self) -> int:
+        return self._nbytes
+
+    @property
+    def stats(self) -> CacheStats:
+        with self._lock:
+            return CacheStats(
+                hits=self._stats.hits,
+                misses=self._stats.misses,
+                evictions=self._stats.evictions,
+                invalidations=self._stats.invalidations,
+                entries=len(self._entries),
+                nbytes=self._nbytes,
+            )
+
+    def get(self, key: Hashable, compute: Callable[[], Any]) -> Any:
+        """
+        Returns:
+            Cached value of key, computed and stored on miss.
+        """
+        with self._lock:
+            self._check_version()
+            if key in self._entries:
+                return self._hit(key)
+            computing = self._computing.setdefault(key, threading.RLock())
+        # Computation may use the cache itself(derived tables), so only the
+        # key being computed is locked, concurrent requests of it wait
+        with computing:
+            with self._lock:
+                self._check_version()
+                if key in self._entries:
+                    return self._hit(key)
+                self._stats.misses += 1
+                version = self._version
+            try:
+                value = compute()
+                with self._lock:
+                    if self._version == version:
+                        self._store(key, value)
+            finally:
+                # Failed computation is retried by the next request
+                with self._lock:
+                    self._computing.pop(key, None)
+        return value
+
+    def _hit(self, key):
+        self._entries.move_to_end(key)
+        self._stats.hits += 1
+        return self._entries[key][0]
+
+    def put(self, key: Hashable, value: Any):
+        with self._lock:
+            self._check_version()
+            self._store(key, value)
+
+    def invalidate(self, keys: Iterable[Hashable], version: Any = None):
+        """Drop entries of keys.
+
+        Entries keyed by tuples(name, *arguments) are dropped together with
+        their name.
+        Args:
+            version - new data version, rest of entries is kept and tied to
+                it(e.g. after partial refresh of the data)
+        """
+        with self._lock:
+            keys = set(keys)
+            for key in list(self._entries):
+                name = key[0] if isinstance(key, tuple) and key else key
+                if key in keys or name in keys:
+                    self._drop(key)
+                    self._stats.invalidations += 1
+            if version is not None:
+                self._version = version
+
+    def clear(self):
+        with self._lock:
+            self.invalidate(list(self._entries))
+
+    def _check_version(self):
+        if self._version_source is None:
+            return
+        version = self._version_source()
+        if version != self._version:
+            self.clear()
+            self._version = version
+
+    def _store(self, key, value):
+        if key in self._entries:
+            self._drop(key)
+        nbytes = sizeof(value)
+        if self.budget is not None and nbytes > self.budget:
+            return
+        self._entries[key] = (value, nbytes)
+        self._nbytes += nbytes
+        while self.budget is not None and self._nbytes > self.budget:
+            oldest = next(iter(self._entries))
+            self._drop(oldest)
+            self._stats.evictions += 1
+
+    def _drop(self, key):
+        _, nbytes = self._entries.pop(key)
+        self._nbytes -= nbytes
+
+
+class CacheOwnerMixin:
+    """Provides lazily created per-instance cache.
+
+    Budget is taken from cache_budget attribute, version from
+    version attribute of the instance.
+    """
+
+    cache_budget: Optional[int] = None
+
+    @property
+    def cache(self) -> Cache:
+        try:
+            return self.__dict__["_cache"]
+        except KeyError:
+            pass
+        cache = Cache(budget=self.cache_budget, version=lambda: self.version)
+        return self.__dict__.setdefault("_cache", cache)
+
+
+def cached_property(method: Callable) -> property:
+    """Read-only property which value is stored in the cache of instance."""
+    name = method.__name__
+
+    @wraps(method)
+    def getter(self):
+        return self.cache.get(name, lambda: method(self))
+
+    return property(getter)
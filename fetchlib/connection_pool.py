@@ -0,0 +1,127 @@
+"""Pool of read-only SQLite connections shared between threads."""
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator, List, Optional
+from urllib.parse import quote
+
+from fetchlib.snapshot import source_fingerprint
+
+MMAP_SIZE = 1024**3
+CACHE_SIZE_KIB = 64 * 1024
+
+
+def read_only_uri(path: Path, immutable: bool = True) -> str:
+    uri = f"file:{quote(str(Path(path).resolve()))}?mode=ro"
+    return uri + "&immutable=1" if immutable else uri
+
+
+class ConnectionPool:
+    """Thread-safe pool of read-only connections to a database file.
+
+    Every thread checks out its own connection, nested checkouts in the same
+    thread reuse it. Connections are opened with immutable flag, which
+    disables locking and change detection of SQLite. Instead pool compares
+    fingerprint(size and mtime) of the file on checkout and reopens
+    connections once the file changes.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        size: Optional[int] = None,
+        immutable: bool = True,
+        mmap_size: int = MMAP_SIZE,
+        cache_size_kib: int = CACHE_SIZE_KIB,
+        init_script: Optional[str] = None,
+    ):
+        """
+        Args:
+            path - database file
+            size - max amount of connections, amount of CPUs by default.
+                Threads over the limit wait for a free connection.
+            immutable - open database with immutable flag
+            mmap_size - size of memory mapped I/O per connection in bytes
+            cache_size_kib - size of page cache per connection in KiB
+            init_script - SQL executed on every new connection, e.g. to
+                create temp tables
+        """
+        self.path = Path(path)
+        self.size = size or os.cpu_count() or 1
+        self.immutable = immutable
+        self.mmap_size = mmap_size
+        self.cache_size_kib = cache_size_kib
+        self.init_script = init_script
+        self._idle: List[sqlite3.Connection] = []
+        self._slots = threading.BoundedSemaphore(self.size)
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._source = None
+        self._generation = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(
+            read_only_uri(self.path, self.immutable),
+            uri=True,
+            check_same_thread=False,
+        )
+        conn.execute(f"pragma mmap_size = {int(self.mmap_size)}")
+        conn.execute(f"pragma cache_size = {-int(self.cache_size_kib)}")
+        conn.execute("pragma temp_store = memory")
+        if self.init_script:
+            conn.executescript(self.init_script)
+        return conn
+
+    def _check_source(self):
+        """Drop idle connections if the file has changed."""
+        source = source_fingerprint(self.path)
+        with self._lock:
+            if source != self._source:
+                self._source = source
+                self._generation += 1
+                idle, self._idle = self._idle, []
+            else:
+                idle = []
+        for conn in idle:
+            conn.close()
+
+    @contextmanager
+    def connection(self) -> Iterator[sqlite3.Connection]:
+        """Check out connection for the current thread."""
+        held = getattr(self._local, "conn", None)
+        if held is not None:
+            yield held
+            return
+
+        self._check_source()
+        self._slots.acquire()
+        try:
+            with self._lock:
+                conn = self._idle.pop() if self._idle else None
+                generation = self._generation
+            if conn is None:
+                conn = self._connect()
+            self._local.conn = conn
+            try:
+                yield conn
+            finally:
+                self._local.conn = None
+                with self._lock:
+                    reusable = generation == self._generation
+                    if reusable:
+                        self._idle.append(conn)
+                if not reusable:
+                    conn.close()
+        finally:
+            self._slots.release()
+
+    def close(self):
+        """Close idle connections, checked out ones are closed on release."""
+        with self._lock:
+            self._generation += 1
+            self._source = None
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            conn.close()
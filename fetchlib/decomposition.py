@@ -1,51 +1,122 @@
-from typing import List
+from typing import Iterator, List
 
+import numpy as np
 import pandas as pd
 
 
 class Decomposition:
-    """Decomposition is a recursive object which contain steps(what to produce)
-    atomic(elementary materials required for this step) and Decomposition object
-    for non-atomic(productable) items required for this step
+    """Decomposition contains steps(what to produce) and elementary materials
+    required for them.
+
+    Steps are produced by decompositor one level at a time by a generator,
+    elementary materials of every produced level are summed up in running
+    arrays, so tables of atomic materials are not kept.
     """
 
-    def __init__(self, *, step, decompositor):
+    def __init__(self, *, step, decompositor, lazy=None, keep_steps=True):
         """
         Args:
             step - dataframe we want to decompose
             decompositor - strategy of decomposition
+            lazy - produce levels on demand: on iteration, access to steps
+                or required_materials. By default decomposition is lazy
+                only if steps are not kept
+            keep_steps - keep produced steps for steps and repeated
+                iteration, otherwise every step is dropped once it is
+                consumed and decomposition may be iterated only once
+        Raises:
+            ValueError - steps are neither kept nor lazy, so they could not
+                be iterated at all
         """
+        if lazy is None:
+            lazy = not keep_steps
+        if not lazy and not keep_steps:
+            raise ValueError("Steps which are not kept have to be produced lazily")
 
         self.step = step
-        self.atomic, next_step = decompositor(step=step)
-        if not self._finalize_condition(next_step):
-            self.child = Decomposition(step=next_step, decompositor=decompositor)
-        else:
-            self.child = None
-
-    @property
-    def is_final(self):
-        return self.child is None
+        self.decompositor = decompositor
+        self.keep_steps = keep_steps
+        # Amount of levels produced so far
+        self.depth = 0
+        # Condition is bound now, lazy levels may be produced much later
+        self._finalize = self._finalize_condition
+        self._steps: List = []
+        self._levels = self._generate()
+        self._material_ids = np.array([], dtype="int64")
+        self._material_names = np.array([], dtype="object")
+        self._material_quantity = np.array([], dtype="int64")
+        if not lazy:
+            self._produce_all()
 
     @classmethod
     def _finalize_condition(cls, next_step):
         return next_step.shape[0] == 0
 
-    def _required_materials(self):
-        if self.is_final:
-            return self.atomic
-        else:
-            return pd.concat([self.atomic, self.child._required_materials()])
+    def _generate(self):
+        step = self.step
+        while True:
+            atomic, next_step = self.decompositor(step=step)
+            self._add_materials(atomic)
+            self.depth += 1
+            yield step
+            if self._finalize(next_step):
+                return
+            step = next_step
 
-    def __iter__(self):
-        def gen_helper():
-            init = self
-            while init.child:
-                yield init.step
-                init = init.child
-            yield init.step
+    def _produce(self) -> bool:
+        """Produce the next level.
 
-        return gen_helper()
+        Returns:
+            False if all levels are already produced.
+        """
+        step = next(self._levels, None)
+        if step is None:
+            return False
+        if self.keep_steps:
+            self._steps.append(step)
+        return True
+
+    def _produce_all(self):
+        while self._produce():
+            pass
+
+    def _add_materials(self, atomic: pd.DataFrame):
+        """Add atomic materials of a level to the running sums."""
+        type_ids = np.concatenate(
+            [self._material_ids, atomic["typeID"].to_numpy(dtype="int64")]
+        )
+        names = np.concatenate(
+            [self._material_names, atomic["typeName"].to_numpy(dtype="object")]
+        )
+        quantity = np.concatenate(
+            [self._material_quantity, atomic["quantity"].to_numpy(dtype="int64")]
+        )
+        order = np.argsort(type_ids, kind="stable")
+        type_ids = type_ids[order]
+        if not type_ids.size:
+            return
+        starts = np.flatnonzero(np.concatenate(([True], type_ids[1:] != type_ids[:-1])))
+        self._material_ids = type_ids[starts]
+        self._material_names = names[order][starts]
+        self._material_quantity = np.add.reduceat(quantity[order], starts)
+
+    def __iter__(self) -> Iterator:
+        """Steps from the initial one, produced lazily.
+
+        Raises:
+            RuntimeError - steps are not kept and were already consumed
+        """
+        if self.keep_steps:
+            return self._iter_kept()
+        if self.depth:
+            raise RuntimeError("Steps are not kept, decomposition is iterated once")
+        return self._levels
+
+    def _iter_kept(self):
+        position = 0
+        while position < len(self._steps) or self._produce():
+            yield self._steps[position]
+            position += 1
 
     @property
     def required_materials(self):
@@ -54,7 +125,10 @@ class Decomposition:
             Dataframe of elementary materials required for production
             defined by Decomposition.
         """
-        table = self._required_materials()
+        self._produce_all()
+        table = pd.DataFrame(
+            {"typeName": self._material_names, "quantity": self._material_quantity}
+        )
         return table.groupby(["typeName"])["quantity"].sum()
 
     @property
@@ -63,10 +137,13 @@ class Decomposition:
         Returns:
             List of dataframes with production instructions to implement production
             defined by Decomposition.
+        Raises:
+            RuntimeError - steps are not kept
         """
-        if not self.is_final:
-            return self.child.steps + [self.step]
-        return [self.step]
+        if not self.keep_steps:
+            raise RuntimeError("Steps are not kept, use iteration instead")
+        self._produce_all()
+        return self._steps[::-1]
 
     @classmethod
     def empty_atomic(cls):
@@ -74,7 +151,7 @@ class Decomposition:
         return dataframe
 
     def __repr__(self):
-        return f"Decomposition(steps: {self.step}, atomics: {self.atomic})"
+        return f"Decomposition(steps: {self.step}, levels: {self.depth})"
 
     def __str__(self):
         result = ["Required materials:"]
@@ -1,118 +1,308 @@
-from typing import Tuple
+import hashlib
+from typing import Optional, Tuple
 
 import numpy as np
 import pandas as pd
 
+from fetchlib.cache import Cache
+
+MEMO_BUDGET = 256 * 1024**2
+
+
+def accumulate(type_ids: np.ndarray, quantity: np.ndarray) -> Tuple[np.ndarray, ...]:
+    """Sum quantity per typeID.
+
+    Rows are sorted once and runs of equal typeIDs are reduced, sums stay
+    exact int64.
+    Returns:
+        Pair of arrays: sorted unique typeIDs and int64 sums.
+    """
+    order = np.argsort(type_ids, kind="stable")
+    keys = type_ids[order]
+    quantity = np.asarray(quantity, dtype="int64")[order]
+    if not keys.size:
+        return keys, quantity
+    starts = np.flatnonzero(np.concatenate(([True], keys[1:] != keys[:-1])))
+    return keys[starts], np.add.reduceat(quantity, starts)
+
 
 class Decompositor:
     """Callable detemines the strategy of decomposition.
 
-    Used in pair with Decomposition
+    Used in pair with Decomposition. Expansions of steps may be memoized in
+    a cache shared between decompositors: key of an entry is the demand of
+    a step(typeIDs and quantities), expansion fingerprint of setup and
+    version of data export. Decomposition of a demand seen before, e.g. the
+    same order planned again after a change of lines or a component
+    requested in the same amount, replays all of its levels from the memo.
+
+    Keys are whole level demands rather than single components: quantities
+    of a component are summed over all its consumers before runs are
+    rounded, so expansions of single rows do not compose into exact plans
+    cheaper than computing them.
     """
 
-    def __init__(self, data_export, setup):
+    def __init__(self, data_export, setup, memo: Optional[Cache] = None):
+        """
+        Args:
+            data_export - source of recipes
+            setup - industry setup used for production
+            memo - cache of step expansions, see new_memo
+        """
         self.data_export = data_export
         self.setup = setup
+        self.memo = memo
 
     def __call__(self, step: pd.DataFrame):
-        types = self.data_export.types
+        atomic_ids, atomic_quantity, next_ids, next_quantity = self.expand(
+            step["typeID"].to_numpy(dtype="int64"),
+            step["quantity"].to_numpy(dtype="int64"),
+        )
+        return (
+            self.data_export.atomic_materials(
+                pd.DataFrame({"typeID": atomic_ids, "quantity": atomic_quantity})
+            ),
+            self.data_export.pretify_step(
+                pd.DataFrame({"typeID": next_ids, "quantity": next_quantity})
+            ),
+        )
 
-        cleared = step[["typeID", "quantity"]]
-        base_collection = self.setup.efficiency_impact
+    def expand(
+        self, type_ids: np.ndarray, quantity: np.ndarray
+    ) -> Tuple[np.ndarray, ...]:
+        """Materials required to produce quantity of type_ids.
 
-        # FIXME enginiering complex effect is not counted
-        collection = self.data_export.append_type_id(base_collection)
-        merged = cleared.merge(collection, on="typeID", how="left").fillna(
-            value={"me_impact": 1.0, "te_impact": 1.0, "run": 2**10}
+        Returned arrays may be shared through the memo and are read-only.
+        Returns:
+            Tuple of arrays: sorted atomic typeIDs and their quantities,
+            sorted productable typeIDs(the next step) and their quantities.
+        """
+        type_ids = np.asarray(type_ids, dtype="int64")
+        quantity = np.asarray(quantity, dtype="int64")
+        if self.memo is None:
+            return self._expand(type_ids, quantity)
+        return self.memo.get(
+            self.memo_key(type_ids, quantity),
+            lambda: self._shared(self._expand(type_ids, quantity)),
+        )
+
+    def memo_key(self, type_ids: np.ndarray, quantity: np.ndarray) -> tuple:
+        """Key of the demand, independent of the order of rows.
+
+        Lines and skills of setup do not change expansions and are not a
+        part of the key.
+        """
+        order = np.lexsort((quantity, type_ids))
+        demand = hashlib.blake2b(digest_size=16)
+        demand.update(type_ids[order].tobytes())
+        demand.update(quantity[order].tobytes())
+        return (
+            demand.hexdigest(),
+            self.setup.expansion_fingerprint,
+            self.data_export.version,
         )
 
-        # Add info to table to understand what we would need pn the next steps
+    @staticmethod
+    def _shared(arrays: Tuple[np.ndarray, ...]) -> Tuple[np.ndarray, ...]:
+        for array in arrays:
+            array.setflags(write=False)
+        return arrays
 
-        appended = self.data_export.append_everything(merged)
+    def _expand(self, type_ids: np.ndarray, quantity: np.ndarray):
+        orders = np.zeros(type_ids.shape[0], dtype="int64")
+        expansion = self.expand_orders(orders, type_ids, quantity)
+        _, atomic_ids, atomic_quantity, _, next_ids, next_quantity = expansion
+        return atomic_ids, atomic_quantity, next_ids, next_quantity
 
-        to_remove = types[types["typeName"].isin(self.setup.non_productables)]["typeID"]
-        filtered = appended[~appended.isin(to_remove)]
+    def expand_orders(
+        self, orders: np.ndarray, type_ids: np.ndarray, quantity: np.ndarray
+    ) -> Tuple[np.ndarray, ...]:
+        """Expansion of several independent demands in one pass.
 
-        table = filtered
-        table["quantity"], table["runs_required"] = self.count_required(table)
+        Args:
+            orders - non-negative index of the order of every row, materials
+                of different orders are never summed up
+        Returns:
+            Tuple of six arrays: orders, typeIDs and quantities of atomic
+            materials, then orders, typeIDs and quantities of the next step.
+            Both parts are sorted by order and typeID.
+        """
+        graph = self.data_export.recipe_graph
+        orders = np.asarray(orders, dtype="int64")
+        type_ids = np.asarray(type_ids, dtype="int64")
+        quantity = np.asarray(quantity, dtype="int64")
+        me_impact, run = self.efficiency(type_ids)
 
-        summed = table.groupby(table.index).sum(numeric_only=True)
-        quantity_table = (
-            summed[["quantity"]]
-            .reset_index()
-            .rename({"index": "typeID"}, axis="columns")
+        # Expand step to the recipe inputs with O(1) lookups in recipe graph
+        parents, material_ids, quantity_materials = graph.expand(type_ids)
+        activity, output_quantity = graph.recipes(type_ids)
+        run_price, _ = count_required_arrays(
+            quantity=quantity[parents],
+            quantity_product=output_quantity[parents],
+            run=run[parents],
+            quantity_materials=quantity_materials,
+            me_impact=me_impact[parents],
+            activity=activity[parents],
         )
-        atomic = quantity_table[
-            ~quantity_table["typeID"].isin(self.data_export.products["productTypeID"])
-            | quantity_table["typeID"].isin(to_remove)
-        ]
-        new_step = quantity_table[
-            quantity_table["typeID"].isin(self.data_export.products["productTypeID"])
-            & ~quantity_table["typeID"].isin(to_remove)
-        ]
 
+        # Pair of order and typeID is packed into a single sortable key
+        stride = int(material_ids.max()) + 1 if material_ids.size else 1
+        keys, material_quantity = accumulate(
+            orders[parents] * stride + material_ids, run_price
+        )
+        material_orders, material_ids = np.divmod(keys, stride)
+        atomic = self.is_atomic(material_ids)
         return (
-            self.data_export.atomic_materials(atomic),
-            self.data_export.pretify_step(new_step),
+            material_orders[atomic],
+            material_ids[atomic],
+            material_quantity[atomic],
+            material_orders[~atomic],
+            material_ids[~atomic],
+            material_quantity[~atomic],
+        )
+
+    @property
+    def non_productable_ids(self) -> np.ndarray:
+        """
+        Returns:
+            Sorted typeIDs of non-productables of setup, resolved once per
+            set of names and kept in the cache of data export.
+        """
+        names = tuple(sorted(self.setup.non_productables))
+        return self.data_export.cache.get(
+            ("non_productable_ids", names), lambda: self._resolve(names)
+        )
+
+    def _resolve(self, names) -> np.ndarray:
+        type_ids = self.data_export.type_ids(list(names))
+        type_ids = np.unique(type_ids[type_ids >= 0])
+        type_ids.setflags(write=False)
+        return type_ids
+
+    def is_atomic(self, type_ids: np.ndarray) -> np.ndarray:
+        """
+        Returns:
+            Mask of type_ids which are bought instead of being produced.
+        """
+        graph = self.data_export.recipe_graph
+        return ~graph.is_productable(type_ids) | np.isin(
+            type_ids, self.non_productable_ids
+        )
+
+    def efficiency(self, type_ids: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Returns:
+            Pair of arrays aligned with type_ids: material efficiency impact
+            and max runs of blueprint.
+        """
+        # FIXME enginiering complex effect is not counted
+        me_impact, _, run = self.setup.efficiency_arrays(self.data_export).take(
+            type_ids
         )
+        return me_impact, run
+
+    def time_efficiency(self, type_ids: np.ndarray) -> np.ndarray:
+        """
+        Returns:
+            Array of time efficiency impacts aligned with type_ids.
+        """
+        _, te_impact, _ = self.setup.efficiency_arrays(self.data_export).take(type_ids)
+        return te_impact
 
     @classmethod
     def count_required(
         cls,
         step: pd.DataFrame,
-    ) -> Tuple[pd.DataFrame, pd.DataFrame]:
-        def price_in_materials(x):
-            ideal_run_size = np.ceil(x.quantity / x.quantity_product)
-            single_line_run_size = int(np.minimum(ideal_run_size, x.run))
-            paralel_jobs_required = np.ceil(
-                (x.quantity / (single_line_run_size * x.quantity_product))
-            ).astype("int32")
-            # For production
-            if x.activityID == 1:
-                single_line_run_price = int(
-                    np.ceil(x.quantity_materials * single_line_run_size * x.me_impact)
-                )
-                single_line_run_price = np.maximum(
-                    single_line_run_price, single_line_run_size
-                )
-
-                trim_size = (
-                    x.quantity
-                    - single_line_run_size * paralel_jobs_required * x.quantity_product
-                )
-                trim_price = int(
-                    np.ceil(
-                        x.quantity_materials
-                        * trim_size
-                        * x.me_impact
-                        / x.quantity_product
-                    )
-                )
-                trim_price = np.maximum(trim_price, trim_size)
-
-                run_price = (single_line_run_price * paralel_jobs_required) + trim_price
-
-            # For reaction
-            elif x.activityID == 11:
-                r_req = int(np.ceil((x.quantity / x.quantity_product)))
-                run_price = x.quantity_materials * r_req
-            else:
-                raise Exception("Unknown reaction ID")
-            return run_price
-
-        def runs_required(x):
-            run_size = np.minimum(x.quantity, x.run)
-            jobs_required = (np.ceil(x.quantity / run_size)).astype("int32")
-            # count for production
-            if x.activityID == 1:
-                r_req = int(np.ceil(jobs_required * run_size / x.quantity_product))
-            # count for reaction
-            elif x.activityID == 11:
-                r_req = int(np.ceil((x.quantity / x.quantity_product)))
-            else:
-                r_req = 0
-            return r_req
-
-        run_price = step.apply(price_in_materials, axis=1)
-
-        return run_price, runs_required
+    ) -> Tuple[pd.Series, pd.Series]:
+        """Vectorized count of materials and runs required for step.
+
+        Args:
+            step - dataframe with 'quantity', 'quantity_product', 'run',
+                'activityID', 'quantity_materials' and 'me_impact' columns.
+        Returns:
+            Pair of int64 series aligned with step: price of the runs in
+            materials and amount of runs required.
+        """
+        run_price, runs_required = count_required_arrays(
+            quantity=step["quantity"].to_numpy(),
+            quantity_product=step["quantity_product"].to_numpy(),
+            run=step["run"].to_numpy(),
+            quantity_materials=step["quantity_materials"].to_numpy(),
+            me_impact=step["me_impact"].to_numpy(),
+            activity=step["activityID"].to_numpy(),
+        )
+        return (
+            pd.Series(run_price, index=step.index),
+            pd.Series(runs_required, index=step.index),
+        )
+
+
+def new_memo(budget: Optional[int] = MEMO_BUDGET) -> Cache:
+    """
+    Returns:
+        Cache of step expansions to share between decompositors, least
+        recently used entries are evicted once budget in bytes is exceeded.
+    """
+    return Cache(budget=budget)
+
+
+def _ceil_int(values) -> np.ndarray:
+    return np.ceil(values).astype("int64")
+
+
+def count_required_arrays(
+    *, quantity, quantity_product, run, quantity_materials, me_impact, activity
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Column-wise implementation of Decompositor.count_required.
+
+    Every argument is an array of the same length, one item per material row.
+
+    Returns:
+        Pair of int64 arrays: price of the runs in materials and amount
+        of runs required.
+    """
+    quantity = np.asarray(quantity, dtype="float64")
+    quantity_product = np.asarray(quantity_product, dtype="float64")
+    run = np.asarray(run, dtype="float64")
+    quantity_materials = np.asarray(quantity_materials, dtype="float64")
+    me_impact = np.asarray(me_impact, dtype="float64")
+    activity = np.asarray(activity)
+
+    production = activity == 1
+    reaction = activity == 11
+    if not np.all(production | reaction):
+        raise ValueError("Unknown reaction ID")
+
+    # Price in materials
+    ideal_run_size = np.ceil(quantity / quantity_product)
+    single_line_run_size = np.minimum(ideal_run_size, run).astype("int64")
+    paralel_jobs_required = _ceil_int(
+        quantity / (single_line_run_size * quantity_product)
+    )
+
+    single_line_run_price = np.maximum(
+        _ceil_int(quantity_materials * single_line_run_size * me_impact),
+        single_line_run_size,
+    )
+    trim_size = (
+        quantity - single_line_run_size * paralel_jobs_required * quantity_product
+    )
+    trim_price = np.maximum(
+        _ceil_int(quantity_materials * trim_size * me_impact / quantity_product),
+        trim_size,
+    ).astype("int64")
+    production_price = single_line_run_price * paralel_jobs_required + trim_price
+
+    reaction_runs = _ceil_int(quantity / quantity_product)
+    reaction_price = (quantity_materials * reaction_runs).astype("int64")
+
+    run_price = np.where(production, production_price, reaction_price)
+
+    # Runs required
+    run_size = np.minimum(quantity, run)
+    jobs_required = _ceil_int(quantity / run_size)
+    production_runs = _ceil_int(jobs_required * run_size / quantity_product)
+
+    runs_required = np.where(production, production_runs, reaction_runs)
+
+    return run_price, runs_required
@@ -0,0 +1,318 @@
+import bz2
+import hashlib
+import os
+import queue
+import threading
+from pathlib import Path
+from typing import Optional
+
+import requests
+
+from fetchlib.bz2_parallel import decompress_file
+
+CHUNK_SIZE = 1024 * 1024
+QUEUE_SIZE = 16
+RETRIES = 3
+TIMEOUT = 60
+
+
+class DownloadError(Exception):
+    pass
+
+
+def get_human_size(size, precision=2):
+    """Display size in human readable str"""
+    suffixes = ["B", "KB", "MB", "GB", "TB"]
+    suffixIndex = 0
+    while size > 1024 and suffixIndex < 4:
+        suffixIndex += 1  # increment the index of the suffix
+        size = size / 1024.0  # apply the division
+    return "%.*f%s" % (precision, size, suffixes[suffixIndex])
+
+
+def fetch_md5(url: str) -> Optional[str]:
+    """Fetch published md5 checksum of url(url + '.md5') if there is one."""
+    try:
+        res = requests.get(url + ".md5", timeout=TIMEOUT)
+    except requests.RequestException:
+        return None
+    if res.status_code != 200 or not res.text.split():
+        return None
+    return res.text.split()[0].lower()
+
+
+def _validator_path(archive: Path) -> Path:
+    return archive.with_name(archive.name + ".validator")
+
+
+def _validator(res) -> Optional[str]:
+    """Strong ETag or Last-Modified of response usable in If-Range."""
+    etag = res.headers.get("ETag")
+    if etag and not etag.startswith("W/"):
+        return etag
+    return res.headers.get("Last-Modified")
+
+
+class _Producer(threading.Thread):
+    """Downloads url into archive file, resuming it with Range requests.
+
+    Validator(ETag or Last-Modified) of the archive is kept next to it and
+    sent as If-Range, so an archive changed on the server is downloaded
+    from scratch instead of being appended to bytes of the old one. Archive
+    without validator is never resumed.
+
+    Every downloaded chunk is also passed to the consumer through chunks queue.
+    """
+
+    def __init__(
+        self,
+        url,
+        archive: Path,
+        chunks: queue.Queue,
+        retries: int,
+        replayed: threading.Event,
+    ):
+        super().__init__(daemon=True)
+        self.url = url
+        self.archive = archive
+        self.chunks = chunks
+        self.retries = retries
+        self.replayed = replayed
+        self.expected_size = None
+        self.error = None
+
+    def run(self):
+        try:
+            self._download()
+        except Exception as err:
+            self.error = err
+        finally:
+            self.chunks.put(None)
+
+    def _download(self):
+        attempts = 0
+        while True:
+            offset = self.archive.stat().st_size if self.archive.exists() else 0
+            if self.expected_size is not None and offset >= self.expected_size:
+                return
+            try:
+                self._request(offset)
+                return
+            except requests.RequestException as err:
+                attempts += 1
+                if attempts > self.retries:
+                    raise DownloadError(f"Cannot download {self.url}: {err}")
+
+    def _request(self, offset: int):
+        headers = {}
+        validator_path = _validator_path(self.archive)
+        if offset and validator_path.exists():
+            headers = {
+                "Range": f"bytes={offset}-",
+                "If-Range": validator_path.read_text(),
+            }
+        with requests.get(
+            self.url, headers=headers, stream=True, timeout=TIMEOUT
+        ) as res:
+            if res.status_code == 416 and offset:
+                # Archive is already complete
+                self.expected_size = offset
+                return
+            if res.status_code not in (200, 206):
+                raise DownloadError(
+                    f"Cannot download {self.url}: HTTP {res.status_code}"
+                )
+            if res.status_code == 200 and offset:
+                # Archive changed, has no validator or server ignored Range,
+                # consumer has to start from scratch
+                offset = 0
+                self.replayed.wait()
+                self.chunks.put(b"")
+            self.expected_size = self._total_size(res, offset)
+            if validator := _validator(res):
+                validator_path.write_text(validator)
+            else:
+                validator_path.unlink(missing_ok=True)
+
+            with open(self.archive, "r+b" if offset else "wb") as handle:
+                handle.seek(offset)
+                handle.truncate()
+                for data in res.iter_content(CHUNK_SIZE):
+                    handle.write(data)
+                    handle.flush()
+                    self.chunks.put(data)
+
+        size = self.archive.stat().st_size
+        if self.expected_size is not None and size < self.expected_size:
+            raise requests.ConnectionError(
+                f"Connection closed at {size} of {self.expected_size} bytes"
+            )
+
+    @staticmethod
+    def _total_size(res, offset) -> Optional[int]:
+        if content_range := res.headers.get("Content-Range"):
+            total = content_range.rsplit("/", 1)[-1]
+            return int(total) if total.isdigit() else None
+        if length := res.headers.get("Content-Length"):
+            return offset + int(length)
+        return None
+
+
+class _Consumer(threading.Thread):
+    """Decompresses chunks coming from producer into output file.
+
+    Without output chunks are only counted and hashed.
+    """
+
+    def __init__(self, archive: Path, offset: int, chunks: queue.Queue, output):
+        super().__init__(daemon=True)
+        self.archive = archive
+        self.offset = offset
+        self.chunks = chunks
+        self.output = output
+        self.replayed = threading.Event()
+        self.error = None
+        self._reset()
+
+    def _reset(self):
+        self.error = None
+        self.decompressor = bz2.BZ2Decompressor()
+        self.md5 = hashlib.md5()
+        self.size = 0
+        if self.output is not None:
+            self.output.seek(0)
+            self.output.truncate()
+
+    def run(self):
+        try:
+            self._replay()
+        except Exception as err:
+            self.error = err
+        # Queue is drained after errors, so producer would not block forever.
+        # Restart of the download(e.g. archive changed) clears the error.
+        while (data := self.chunks.get()) is not None:
+            if data == b"":
+                self._reset()
+            elif self.error is None:
+                try:
+                    self._feed(data)
+                except Exception as err:
+                    self.error = err
+
+    def _replay(self):
+        """Feed bytes downloaded by the previous attempts from disk."""
+        try:
+            if self.offset == 0:
+                return
+            with open(self.archive, "rb") as handle:
+                while self.offset > 0:
+                    data = handle.read(min(CHUNK_SIZE, self.offset))
+                    if not data:
+                        break
+                    self.offset -= len(data)
+                    self._feed(data)
+        finally:
+            self.replayed.set()
+
+    def _feed(self, data: bytes):
+        self.md5.update(data)
+        self.size += len(data)
+        while data and self.output is not None:
+            if self.decompressor.eof:
+                # Multistream archive, e.g. produced by pbzip2
+                data = self.decompressor.unused_data + data
+                self.decompressor = bz2.BZ2Decompressor()
+            self.output.write(self.decompressor.decompress(data))
+            data = self.decompressor.unused_data if self.decompressor.eof else b""
+
+    @property
+    def complete(self) -> bool:
+        return self.output is None or self.decompressor.eof
+
+
+def download_and_decompress(
+    url: str,
+    dest: Path,
+    *,
+    archive: Optional[Path] = None,
+    md5: Optional[str] = None,
+    retries: int = RETRIES,
+    workers: Optional[int] = None,
+) -> Path:
+    """Download bz2 archive from url and decompress it into dest.
+
+    Download and decompression are pipelined: producer thread downloads the
+    archive while consumer thread decompresses it. Archive is kept on disk
+    until success, so an interrupted download is resumed with Range request
+    if the archive on the server has not changed since(If-Range).
+    Result is written into temporary file and atomically renamed to dest.
+
+    Args:
+        url - url of bz2 archive
+        dest - path of decompressed file
+        archive - path of downloaded archive, dest + '.bz2' by default
+        md5 - expected md5 checksum of archive
+        retries - amount of retries after connection errors
+        workers - if set, archive is decompressed by block-parallel
+            decompression with that many processes once downloaded instead
+            of being decompressed on the fly
+    Returns:
+        dest
+    """
+    dest = Path(dest)
+    archive = Path(archive or dest.with_name(dest.name + ".bz2"))
+    dest.parent.mkdir(parents=True, exist_ok=True)
+    archive.parent.mkdir(parents=True, exist_ok=True)
+    tmp = dest.with_name(f"{dest.name}.tmp-{os.getpid()}")
+
+    if not _validator_path(archive).exists():
+        # Version of the bytes is unknown, they could not be resumed
+        archive.unlink(missing_ok=True)
+    offset = archive.stat().st_size if archive.exists() else 0
+    chunks = queue.Queue(maxsize=QUEUE_SIZE)
+    try:
+        with open(tmp, "wb") as output:
+            consumer = _Consumer(
+                archive, offset, chunks, output if workers is None else None
+            )
+            producer = _Producer(url, archive, chunks, retries, consumer.replayed)
+            consumer.start()
+            producer.start()
+            while producer.is_alive():
+                producer.join(0.2)
+                print(
+                    "\rDownloading file ... [%s]             "
+                    % get_human_size(consumer.size),
+                    end="",
+                )
+            consumer.join()
+
+        if error := producer.error or consumer.error:
+            print("\rDownloading file ... [FAILED]             ")
+            if isinstance(error, DownloadError):
+                raise error
+            raise DownloadError(str(error)) from error
+        if producer.expected_size not in (None, consumer.size):
+            raise DownloadError(
+                f"Size mismatch: expected {producer.expected_size}, "
+                f"got {consumer.size} bytes"
+            )
+        if not consumer.complete:
+            raise DownloadError(f"Archive {archive} is truncated")
+        if md5 is not None and consumer.md5.hexdigest() != md5.lower():
+            archive.unlink()
+            _validator_path(archive).unlink(missing_ok=True)
+            raise DownloadError(f"Checksum mismatch for {archive}")
+
+        if workers is None:
+            os.replace(tmp, dest)
+        else:
+            decompress_file(archive, dest, workers)
+    finally:
+        if tmp.exists():
+            tmp.unlink()
+
+    archive.unlink()
+    _validator_path(archive).unlink(missing_ok=True)
+    print("\rDownloading file: {}  [SUCCESS]             ".format(dest))
+    return dest
@@ -0,0 +1,235 @@
+"""Decomposition engines.
+
+Two engines produce the same steps and required materials:
+
+    pandas - Decomposition, every level goes through Decompositor
+    numpy - ArrayDecomposition, levels are propagated over the recipe graph
+        on typeID arrays and pandas tables are built only for rendering
+
+Engine topological groups items by their topological level instead of the
+depth of recursion: TopologicalDecomposition builds every item at its
+deepest position below the ordered items, after all of its consumers, so
+demand of a shared component is summed up and rounded once.
+"""
+from typing import Iterator, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+from fetchlib.decomposition import Decomposition
+from fetchlib.decompositor import Decompositor, accumulate
+
+ENGINE_PANDAS = "pandas"
+ENGINE_NUMPY = "numpy"
+ENGINE_TOPOLOGICAL = "topological"
+ENGINES = (ENGINE_PANDAS, ENGINE_NUMPY, ENGINE_TOPOLOGICAL)
+
+
+class ArrayDecomposition:
+    """Decomposition computed on typeID arrays.
+
+    Has the interface of Decomposition: steps, required_materials,
+    iteration over steps from the final product and string rendering.
+    """
+
+    def __init__(self, *, step: pd.DataFrame, decompositor: Decompositor):
+        """
+        Args:
+            step - initial step, e.g. result of create_init_table
+            decompositor - provides data export and setup
+        """
+        self.decompositor = decompositor
+        self.data_export = decompositor.data_export
+        self.levels: List[Tuple[np.ndarray, np.ndarray]] = []
+        self._atomic: List[Tuple[np.ndarray, np.ndarray]] = []
+        self._initial = step
+        self._steps = None
+        self._propagate(
+            step["typeID"].to_numpy(dtype="int64"),
+            step["quantity"].to_numpy(),
+        )
+
+    def _propagate(self, type_ids: np.ndarray, quantity: np.ndarray):
+        while True:
+            self.levels.append((type_ids, quantity))
+            atomic_ids, atomic_quantity, type_ids, quantity = self.decompositor.expand(
+                type_ids, quantity
+            )
+            self._atomic.append((atomic_ids, atomic_quantity))
+            if not type_ids.size:
+                break
+
+    @classmethod
+    def from_levels(
+        cls,
+        *,
+        levels: List[Tuple[np.ndarray, np.ndarray]],
+        atomic: List[Tuple[np.ndarray, np.ndarray]],
+        decompositor: Decompositor,
+    ) -> "ArrayDecomposition":
+        """Wrap levels propagated elsewhere, e.g. by BatchDecomposition.
+
+        Args:
+            levels - typeIDs and quantities of every step, the initial first
+            atomic - typeIDs and quantities of atomic materials of every step
+        """
+        decomposition = cls.__new__(cls)
+        decomposition.decompositor = decompositor
+        decomposition.data_export = decompositor.data_export
+        decomposition.levels = levels
+        decomposition._atomic = atomic
+        decomposition._initial = None
+        decomposition._steps = None
+        return decomposition
+
+    def _render_steps(self) -> List[pd.DataFrame]:
+        graph = self.data_export.recipe_graph
+        # Initial step is rendered by data export, exactly as in Decomposition
+        rendered = self.levels if self._initial is None else self.levels[1:]
+        sizes = [type_ids.shape[0] for type_ids, _ in rendered]
+        type_ids = np.concatenate(
+            [ids for ids, _ in rendered] + [np.array([], dtype="int64")]
+        )
+        names = np.split(self.data_export.type_names(type_ids), np.cumsum(sizes)[:-1])
+        activity, output_quantity = graph.recipes(type_ids)
+        activity = np.split(activity, np.cumsum(sizes)[:-1])
+        output_quantity = np.split(output_quantity, np.cumsum(sizes)[:-1])
+
+        steps = [] if self._initial is None else [self._initial]
+        for i, (ids, quantity) in enumerate(rendered):
+            steps.append(
+                pd.DataFrame(
+                    {
+                        "typeName": names[i],
+                        "quantity": quantity,
+                        "runs_required": quantity / output_quantity[i],
+                        "activityID": activity[i],
+                        "typeID": ids,
+                    },
+                    index=ids,
+                )
+            )
+        return steps[::-1]
+
+    @property
+    def steps(self) -> List[pd.DataFrame]:
+        """
+        Returns:
+            List of dataframes with production instructions, the final
+            product comes last.
+        """
+        if self._steps is None:
+            self._steps = self._render_steps()
+        return self._steps
+
+    @property
+    def required_materials(self) -> pd.Series:
+        type_ids = np.concatenate([ids for ids, _ in self._atomic])
+        quantity = np.concatenate([quantity for _, quantity in self._atomic])
+        table = self.data_export.atomic_materials(
+            pd.DataFrame({"typeID": type_ids, "quantity": quantity})
+        )
+        return table.groupby(["typeName"])["quantity"].sum()
+
+    def __iter__(self) -> Iterator[pd.DataFrame]:
+        return iter(self.steps[::-1])
+
+    __str__ = Decomposition.__str__
+
+    def __repr__(self):
+        return f"ArrayDecomposition(levels: {len(self.levels)})"
+
+
+class TopologicalDecomposition(ArrayDecomposition):
+    """ArrayDecomposition with steps grouped by topological level.
+
+    Level of an item is the longest chain of productable items from the
+    ordered items down to it. Item is produced only when demand of all of
+    its consumers is known, so every item appears in a single step.
+    """
+
+    def _propagate(self, type_ids: np.ndarray, quantity: np.ndarray):
+        depth_ids, depth = self._levels(type_ids)
+        pending_ids = np.array([], dtype="int64")
+        pending = np.array([], dtype="int64")
+        type_ids, quantity = accumulate(type_ids, quantity)
+        level = 0
+        while True:
+            # Items with deeper consumers wait until the demand is complete
+            ready = depth[np.searchsorted(depth_ids, type_ids)] <= level
+            if not ready.all():
+                if level == 0:
+                    # Ordered item is a component of another ordered item
+                    self._initial = None
+                pending_ids = np.concatenate([pending_ids, type_ids[~ready]])
+                pending = np.concatenate([pending, quantity[~ready]])
+                type_ids, quantity = type_ids[ready], quantity[ready]
+            if level == 0 and self._initial is not None:
+                type_ids, quantity = self._initial_order(type_ids, quantity)
+
+            self.levels.append((type_ids, quantity))
+            (
+                atomic_ids,
+                atomic_quantity,
+                next_ids,
+                next_quantity,
+            ) = self._expand_level(type_ids, quantity)
+            self._atomic.append((atomic_ids, atomic_quantity))
+            type_ids, quantity = accumulate(
+                np.concatenate([pending_ids, next_ids]),
+                np.concatenate([pending, next_quantity]),
+            )
+            pending_ids, pending = pending_ids[:0], pending[:0]
+            level += 1
+            if not type_ids.size:
+                break
+
+    def _expand_level(self, type_ids: np.ndarray, quantity: np.ndarray):
+        """Materials of a level, as returned by Decompositor.expand."""
+        return self.decompositor.expand(type_ids, quantity)
+
+    def _initial_order(self, type_ids: np.ndarray, quantity: np.ndarray):
+        """Rows of the initial step in the order of the initial table."""
+        initial = self._initial["typeID"].to_numpy(dtype="int64")
+        return initial, quantity[np.searchsorted(type_ids, initial)]
+
+    def _levels(self, type_ids: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Topological level of every item reachable from type_ids.
+
+        Item is reached at every depth where Decomposition would produce
+        it, the deepest one is its level.
+        Returns:
+            Pair of arrays: sorted typeIDs and their levels.
+        """
+        graph = self.data_export.recipe_graph
+        reached_ids, reached = [], []
+        frontier, depth = np.unique(type_ids), 0
+        while frontier.size:
+            reached_ids.append(frontier)
+            reached.append(np.full(frontier.shape[0], depth, dtype="int64"))
+            _, material_ids, _ = graph.expand(frontier[graph.is_productable(frontier)])
+            frontier = np.unique(material_ids)
+            frontier = frontier[~self.decompositor.is_atomic(frontier)]
+            depth += 1
+        reached_ids = np.concatenate(reached_ids)
+        reached = np.concatenate(reached)
+        # Sorted by typeID and depth, the last row of every typeID is kept
+        order = np.lexsort((reached, reached_ids))
+        reached_ids, reached = reached_ids[order], reached[order]
+        last = np.concatenate((reached_ids[1:] != reached_ids[:-1], [True]))
+        return reached_ids[last], reached[last]
+
+
+def decompose(*, step: pd.DataFrame, decompositor: Decompositor, engine=ENGINE_PANDAS):
+    """Decompose step with selected engine.
+
+    Args:
+        engine - ENGINE_PANDAS, ENGINE_NUMPY or ENGINE_TOPOLOGICAL
+    """
+    if engine == ENGINE_PANDAS:
+        return Decomposition(step=step, decompositor=decompositor)
+    if engine == ENGINE_NUMPY:
+        return ArrayDecomposition(step=step, decompositor=decompositor)
+    if engine == ENGINE_TOPOLOGICAL:
+        return TopologicalDecomposition(step=step, decompositor=decompositor)
+    raise ValueError(f"Unknown engine: {engine}, expected one of {ENGINES}")
@@ -0,0 +1,204 @@
+"""Incremental re-planning after changes of Setup.
+
+Plan is grouped by topological level(see TopologicalDecomposition) and
+keeps its dependency graph: for every step the edges from items to their
+materials with the price of every edge in materials, and the step of every
+material. Efficiency of setup changes only quantities, never the set of
+items of a step, so after a change only edges of items which efficiency or
+demand moved are priced again. Their deltas are added to the materials and
+to the steps producing them, items with changed demand are repriced on
+their steps and so on down to raw materials.
+
+Changes of non-productables or of the data export change the structure of
+the plan, such plans are recomputed from the initial step.
+"""
+from dataclasses import dataclass
+from typing import List, Tuple
+
+import numpy as np
+
+from fetchlib.decompositor import count_required_arrays
+from fetchlib.engine import TopologicalDecomposition
+
+
+@dataclass
+class _Edges:
+    """Dependency graph of a single step.
+
+    Attributes:
+        me_impact, run - efficiency items of the step were priced with
+        activity, output_quantity - recipes of items of the step
+        parents - row of the item of every edge
+        materials - row of the material of every edge in material_ids
+        quantity_materials - recipe quantity of every edge
+        run_price - price of every edge in materials
+        material_ids, material_quantity - sorted materials of the step
+        atomic - mask of atomic material_ids, the rest is the next step
+    """
+
+    me_impact: np.ndarray
+    run: np.ndarray
+    activity: np.ndarray
+    output_quantity: np.ndarray
+    parents: np.ndarray
+    materials: np.ndarray
+    quantity_materials: np.ndarray
+    run_price: np.ndarray
+    material_ids: np.ndarray
+    material_quantity: np.ndarray
+    atomic: np.ndarray
+
+
+class IncrementalDecomposition(TopologicalDecomposition):
+    """TopologicalDecomposition which follows changes of its setup by replan."""
+
+    def __init__(self, *, step, decompositor):
+        """
+        Args:
+            step - initial step, e.g. result of create_init_table
+            decompositor - provides data export and setup
+        """
+        self.step = step
+        super().__init__(step=step, decompositor=decompositor)
+
+    def _propagate(self, type_ids: np.ndarray, quantity: np.ndarray):
+        self._edges: List[_Edges] = []
+        self._structure = self._structure_key()
+        super()._propagate(type_ids, quantity)
+        self._targets = self._link()
+
+    def _expand_level(self, type_ids: np.ndarray, quantity: np.ndarray):
+        edges = self._price(type_ids, np.asarray(quantity, dtype="int64"))
+        self._edges.append(edges)
+        atomic = edges.atomic
+        return (
+            edges.material_ids[atomic],
+            edges.material_quantity[atomic],
+            edges.material_ids[~atomic],
+            edges.material_quantity[~atomic],
+        )
+
+    def _link(self) -> List[Tuple[np.ndarray, np.ndarray]]:
+        """Step producing every material which is not atomic.
+
+        Every item is produced in a single step, so it is found by typeID.
+        Returns:
+            For every step pair of arrays aligned with its materials which
+            are not atomic: level and row of the material.
+        """
+        type_ids = np.concatenate([ids for ids, _ in self.levels])
+        levels = np.repeat(
+            np.arange(len(self.levels)), [ids.shape[0] for ids, _ in self.levels]
+        )
+        rows = np.concatenate([np.arange(ids.shape[0]) for ids, _ in self.levels])
+        order = np.argsort(type_ids, kind="stable")
+        type_ids = type_ids[order]
+        targets = []
+        for edges in self._edges:
+            found = order[np.searchsorted(type_ids, edges.material_ids[~edges.atomic])]
+            targets.append((levels[found], rows[found]))
+        return targets
+
+    def _structure_key(self) -> tuple:
+        non_productables = np.unique(self.decompositor.non_productable_ids)
+        return (self.data_export.version, non_productables.tobytes())
+
+    def _price(self, type_ids: np.ndarray, quantity: np.ndarray) -> _Edges:
+        graph = self.data_export.recipe_graph
+        me_impact, run = self.decompositor.efficiency(type_ids)
+        activity, output_quantity = graph.recipes(type_ids)
+        parents, material_ids, quantity_materials = graph.expand(type_ids)
+        run_price, _ = count_required_arrays(
+            quantity=quantity[parents],
+            quantity_product=output_quantity[parents],
+            run=run[parents],
+            quantity_materials=quantity_materials,
+            me_impact=me_impact[parents],
+            activity=activity[parents],
+        )
+        unique_ids, inverse = np.unique(material_ids, return_inverse=True)
+        material_quantity = np.zeros(unique_ids.shape[0], dtype="int64")
+        np.add.at(material_quantity, inverse, run_price)
+        return _Edges(
+            me_impact=me_impact,
+            run=run,
+            activity=activity,
+            output_quantity=output_quantity,
+            parents=parents,
+            materials=inverse,
+            quantity_materials=quantity_materials,
+            run_price=run_price,
+            material_ids=unique_ids,
+            material_quantity=material_quantity,
+            atomic=self.decompositor.is_atomic(unique_ids),
+        )
+
+    def replan(self) -> np.ndarray:
+        """Update plan after changes of setup of decompositor.
+
+        Steps and required materials reflect the current setup afterwards,
+        exactly as a plan computed from scratch.
+        Returns:
+            Sorted unique typeIDs of items which were priced again.
+        """
+        self._steps = None
+        if self._structure_key() != self._structure:
+            self._initial = self.step
+            self.levels, self._atomic = [], []
+            self._propagate(
+                self.step["typeID"].to_numpy(dtype="int64"),
+                self.step["quantity"].to_numpy(),
+            )
+            return np.unique(np.concatenate([ids for ids, _ in self.levels]))
+
+        repriced = []
+        moved = [np.zeros(ids.shape[0], dtype="bool") for ids, _ in self.levels]
+        for level, edges in enumerate(self._edges):
+            type_ids, quantity = self.levels[level]
+            me_impact, run = self.decompositor.efficiency(type_ids)
+            dirty = moved[level] | (me_impact != edges.me_impact) | (run != edges.run)
+            edges.me_impact, edges.run = me_impact, run
+            delta = self._reprice(edges, quantity, dirty)
+            repriced.append(type_ids[dirty])
+
+            edges.material_quantity = edges.material_quantity + delta
+            atomic = edges.atomic
+            self._atomic[level] = (
+                edges.material_ids[atomic],
+                edges.material_quantity[atomic],
+            )
+            # Demand of a material moves on the step producing it
+            delta = delta[~atomic]
+            target_levels, target_rows = self._targets[level]
+            for target in np.unique(target_levels[delta != 0]).tolist():
+                changed = (target_levels == target) & (delta != 0)
+                target_ids, target_quantity = self.levels[target]
+                target_quantity = target_quantity.copy()
+                target_quantity[target_rows[changed]] += delta[changed]
+                self.levels[target] = (target_ids, target_quantity)
+                moved[target][target_rows[changed]] = True
+        return np.unique(np.concatenate(repriced))
+
+    @staticmethod
+    def _reprice(edges: _Edges, quantity: np.ndarray, dirty: np.ndarray) -> np.ndarray:
+        """Price edges of dirty items again.
+
+        Returns:
+            Change of quantity of every material of the step.
+        """
+        delta = np.zeros(edges.material_ids.shape[0], dtype="int64")
+        rows = np.flatnonzero(dirty[edges.parents])
+        if not rows.size:
+            return delta
+        parents = edges.parents[rows]
+        run_price, _ = count_required_arrays(
+            quantity=quantity[parents],
+            quantity_product=edges.output_quantity[parents],
+            run=edges.run[parents],
+            quantity_materials=edges.quantity_materials[rows],
+            me_impact=edges.me_impact[parents],
+            activity=edges.activity[parents],
+        )
+        np.add.at(delta, edges.materials[rows], run_price - edges.run_price[rows])
+        edges.run_price[rows] = run_price
+        return delta
@@ -0,0 +1,230 @@
+import sys
+from bisect import bisect_left
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+SUGGESTIONS = 3
+HISTOGRAM_BINS = 64
+
+
+class UnknownTypeNames(ValueError):
+    """Raised when some of typeNames could not be resolved.
+
+    Attributes:
+        suggestions - mapping of unknown name to the list of close typeNames
+    """
+
+    def __init__(self, suggestions: Dict[str, List[str]]):
+        self.suggestions = suggestions
+        hints = [
+            f"{name} (did you mean: {', '.join(close)}?)"
+            for name, close in suggestions.items()
+            if close
+        ]
+        message = f"No such products in database: {set(suggestions)}"
+        if hints:
+            message += ". " + "; ".join(hints)
+        super().__init__(message)
+
+
+def char_histogram(name: str) -> np.ndarray:
+    histogram = np.zeros(HISTOGRAM_BINS, dtype="int16")
+    np.add.at(histogram, [ord(char) % HISTOGRAM_BINS for char in name], 1)
+    return histogram
+
+
+def edit_distances(name: str, candidates: List[str]) -> np.ndarray:
+    """Levenshtein distances between name and every candidate.
+
+    Dynamic programming runs over characters of name and positions of
+    candidates, every cell is computed for all candidates at once.
+    Returns:
+        Array of distances aligned with candidates.
+    """
+    lengths = np.array([len(candidate) for candidate in candidates], dtype="int64")
+    width = int(lengths.max()) if len(candidates) else 0
+    codes = np.full((len(candidates), width), -1, dtype="int32")
+    for row, candidate in enumerate(candidates):
+        codes[row, : len(candidate)] = [ord(char) for char in candidate]
+
+    previous = np.tile(np.arange(width + 1, dtype="int64"), (len(candidates), 1))
+    for i, char in enumerate(name, start=1):
+        substitution = previous[:, :-1] + (codes != ord(char))
+        best = np.minimum(substitution, previous[:, 1:] + 1)
+        current = np.empty_like(previous)
+        current[:, 0] = i
+        for j in range(1, width + 1):
+            current[:, j] = np.minimum(best[:, j - 1], current[:, j - 1] + 1)
+        previous = current
+    return previous[np.arange(len(candidates)), lengths]
+
+
+@dataclass
+class Resolution:
+    """Result of NameIndex.resolve_many.
+
+    Attributes:
+        names - canonical typeNames aligned with the input, None for unknown
+        type_ids - typeIDs aligned with the input, -1 for unknown
+        suggestions - close typeNames for every unknown input name
+    """
+
+    names: List[Optional[str]]
+    type_ids: np.ndarray
+    suggestions: Dict[str, List[str]] = field(default_factory=dict)
+
+    @property
+    def unknown(self) -> List[str]:
+        return list(self.suggestions)
+
+    def raise_for_unknown(self):
+        if self.suggestions:
+            raise UnknownTypeNames(self.suggestions)
+
+
+class NameIndex:
+    """Index of typeNames for input parsing.
+
+    Exact lookups go through a hash map, case-insensitive ones through a map
+    of casefolded names. Casefolded names are also kept sorted, so prefix
+    search is a binary search. Fuzzy search computes edit distance only for
+    names passing character histogram filter: every edit changes histogram
+    by at most 2, so names with distant histograms are skipped.
+    """
+
+    def __init__(self, names: Iterable[str], type_ids: Iterable[int]):
+        """
+        Args:
+            names - typeNames, the first occurrence of duplicated name wins
+            type_ids - typeIDs aligned with names
+        """
+        self._ids = {}
+        self._folded = {}
+        for name, type_id in zip(names, type_ids):
+            if not isinstance(name, str):
+                continue
+            self._ids.setdefault(name, int(type_id))
+            self._folded.setdefault(name.casefold(), name)
+        self._sorted = sorted(self._folded)
+        self._histograms = np.array(
+            [char_histogram(name) for name in self._sorted], dtype="int16"
+        ).reshape(-1, HISTOGRAM_BINS)
+
+    @classmethod
+    def from_types(cls, types: pd.DataFrame) -> "NameIndex":
+        return cls(types["typeName"], types["typeID"])
+
+    def __len__(self):
+        return len(self._ids)
+
+    @property
+    def nbytes(self) -> int:
+        names = sum(sys.getsizeof(name) for name in self._ids)
+        folded = sum(sys.getsizeof(name) for name in self._sorted)
+        tables = sys.getsizeof(self._ids) + sys.getsizeof(self._folded)
+        return names + folded + tables + self._histograms.nbytes
+
+    def __contains__(self, name) -> bool:
+        return name in self._ids
+
+    def type_id(self, name: str) -> int:
+        """
+        Returns:
+            typeID of exactly matching name, -1 if there is no such name.
+        """
+        return self._ids.get(name, -1)
+
+    def resolve(self, name: str) -> Optional[str]:
+        """
+        Returns:
+            Canonical typeName matching name exactly or ignoring case and
+            surrounding whitespace, None if there is no such name.
+        """
+        if name in self._ids:
+            return name
+        return self._folded.get(name.strip().casefold())
+
+    def prefix(self, prefix: str, limit: int = 10) -> List[str]:
+        """
+        Returns:
+            Up to limit typeNames starting with prefix, ignoring case.
+        """
+        prefix = prefix.strip().casefold()
+        result = []
+        for folded in self._sorted[bisect_left(self._sorted, prefix) :]:
+            if not folded.startswith(prefix) or len(result) >= limit:
+                break
+            result.append(self._folded[folded])
+        return result
+
+    def suggest(
+        self, name: str, limit: int = SUGGESTIONS, max_distance: Optional[int] = None
+    ) -> List[str]:
+        """Fuzzy search of typeNames.
+
+        Args:
+            max_distance - max edit distance, grows with length of name
+                by default
+        Returns:
+            Up to limit typeNames closest to name, ignoring case.
+        """
+        folded = name.strip().casefold()
+        if max_distance is None:
+            max_distance = max(2, len(folded) // 4)
+        difference = np.abs(self._histograms - char_histogram(folded)).sum(axis=1)
+        candidates = [
+            self._sorted[position]
+            for position in np.flatnonzero(difference <= 2 * max_distance)
+        ]
+        if not candidates:
+            return []
+        distances = edit_distances(folded, candidates)
+        order = np.argsort(distances, kind="stable")[:limit]
+        return [
+            self._folded[candidates[position]]
+            for position in order
+            if distances[position] <= max_distance
+        ]
+
+    def resolve_many(self, names: Iterable[str]) -> Resolution:
+        """Resolve batch of names, e.g. lines of multibuy.
+
+        Fuzzy search runs only for names which are not known even ignoring
+        case, so its cost depends on amount of typos only.
+        """
+        names = list(names)
+        resolved = [self.resolve(name) for name in names]
+        suggestions = {
+            name: self.suggest(name)
+            for name, canonical in zip(names, resolved)
+            if canonical is None
+        }
+        type_ids = np.array(
+            [self._ids[name] if name is not None else -1 for name in resolved],
+            dtype="int64",
+        )
+        return Resolution(resolved, type_ids, suggestions)
+
+
+def parse_multibuy(text: str) -> List[Tuple[str, int]]:
+    """Parse EVE multibuy text: one 'typeName quantity' per line.
+
+    Quantity may be written as '1,000' or 'x1000', line without quantity
+    means single item. Empty lines are skipped.
+    Returns:
+        List of (name, quantity) pairs in order of lines.
+    """
+    pairs = []
+    for line in text.splitlines():
+        if not line.strip():
+            continue
+        *words, amount = line.split()
+        amount = amount.lstrip("xX").replace(",", "")
+        if words and amount.isdigit():
+            pairs.append((" ".join(words), int(amount)))
+        else:
+            pairs.append((" ".join(line.split()), 1))
+    return pairs
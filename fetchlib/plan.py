@@ -0,0 +1,195 @@
+"""Compact result of planning.
+
+Plan keeps steps and elementary materials as structured NumPy arrays, so
+columns are typed views of a single buffer, record view costs nothing and
+arrays are stored as .npy files which are loaded memory-mapped. Names are
+not stored with plans: NameTable of a data export is saved once and shared
+by all plans loaded with it.
+"""
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from fetchlib.timing import _job_counts, _nodes
+
+STEP_DTYPE = np.dtype(
+    [
+        ("typeID", "<i4"),
+        ("level", "<i2"),
+        ("activity", "<i2"),
+        ("quantity", "<i8"),
+        ("runs", "<i8"),
+        ("jobs", "<i8"),
+    ]
+)
+MATERIAL_DTYPE = np.dtype([("typeID", "<i4"), ("quantity", "<i8")])
+
+
+class NameTable:
+    """Sorted typeIDs with their typeNames."""
+
+    __slots__ = ("type_ids", "names")
+
+    def __init__(self, type_ids: np.ndarray, names: np.ndarray):
+        order = np.argsort(type_ids, kind="stable")
+        self.type_ids = np.asarray(type_ids, dtype="<i4")[order]
+        self.names = np.asarray(names, dtype="str")[order]
+
+    @classmethod
+    def from_data_export(cls, data_export, type_ids=None) -> "NameTable":
+        """
+        Args:
+            type_ids - typeIDs to keep, all types of data export by default
+        """
+        if type_ids is None:
+            types = data_export.types
+            return cls(types["typeID"].to_numpy(), types["typeName"].to_numpy())
+        type_ids = np.unique(np.asarray(type_ids, dtype="int64"))
+        return cls(type_ids, data_export.type_names(type_ids))
+
+    def __getitem__(self, type_ids: np.ndarray) -> np.ndarray:
+        """
+        Raises:
+            KeyError - for typeIDs missing in the table
+        """
+        type_ids = np.asarray(type_ids, dtype="int64")
+        positions = np.searchsorted(self.type_ids, type_ids)
+        found = positions < self.type_ids.shape[0]
+        found[found] = self.type_ids[positions[found]] == type_ids[found]
+        if not found.all():
+            raise KeyError(f"Unknown typeIDs: {type_ids[~found].tolist()}")
+        return self.names[positions]
+
+    def __len__(self):
+        return self.type_ids.shape[0]
+
+    def save(self, directory: Path):
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        np.save(directory / "type_ids.npy", self.type_ids)
+        np.save(directory / "names.npy", self.names)
+
+    @classmethod
+    def load(cls, directory: Path, mmap_mode: Optional[str] = "r") -> "NameTable":
+        directory = Path(directory)
+        table = cls.__new__(cls)
+        table.type_ids = np.load(directory / "type_ids.npy", mmap_mode=mmap_mode)
+        table.names = np.load(directory / "names.npy", mmap_mode=mmap_mode)
+        return table
+
+
+class Plan:
+    """Steps and elementary materials of a decomposition.
+
+    Attributes:
+        rows - one row of STEP_DTYPE per item of every step, level 0 is the
+            final product
+        materials - elementary materials of MATERIAL_DTYPE sorted by typeID
+        names - NameTable covering typeIDs of rows and materials
+    """
+
+    __slots__ = ("rows", "materials", "names")
+
+    def __init__(self, rows: np.ndarray, materials: np.ndarray, names: NameTable):
+        self.rows = rows
+        self.materials = materials
+        self.names = names
+
+    @classmethod
+    def from_decomposition(
+        cls, decomposition, names: Optional[NameTable] = None
+    ) -> "Plan":
+        """
+        Args:
+            decomposition - Decomposition or ArrayDecomposition
+            names - shared name table, built for the plan by default
+        """
+        decompositor = decomposition.decompositor
+        data_export = decompositor.data_export
+        nodes = _nodes(decomposition.steps)
+        runs, _, jobs = _job_counts(nodes, decompositor)
+        rows = np.empty(nodes.shape[0], dtype=STEP_DTYPE)
+        rows["typeID"] = nodes["typeID"].to_numpy()
+        rows["level"] = nodes["level"].to_numpy()
+        rows["activity"] = nodes["activityID"].to_numpy()
+        rows["quantity"] = nodes["quantity"].to_numpy()
+        rows["runs"] = runs
+        rows["jobs"] = jobs
+
+        required = decomposition.required_materials
+        material_ids = data_export.type_ids(required.index)
+        order = np.argsort(material_ids, kind="stable")
+        materials = np.empty(required.shape[0], dtype=MATERIAL_DTYPE)
+        materials["typeID"] = material_ids[order]
+        materials["quantity"] = required.to_numpy()[order]
+
+        if names is None:
+            names = NameTable.from_data_export(
+                data_export, np.concatenate([rows["typeID"], materials["typeID"]])
+            )
+        return cls(rows, materials, names)
+
+    @property
+    def records(self) -> np.recarray:
+        """Record view of rows, columns are accessible as attributes."""
+        return self.rows.view(np.recarray)
+
+    @property
+    def nbytes(self) -> int:
+        return self.rows.nbytes + self.materials.nbytes
+
+    @property
+    def steps(self) -> pd.DataFrame:
+        """
+        Returns:
+            Dataframe of rows with 'typeName' column.
+        """
+        table = pd.DataFrame(self.rows)
+        table.insert(1, "typeName", self.names[self.rows["typeID"]])
+        return table
+
+    @property
+    def required_materials(self) -> pd.Series:
+        """
+        Returns:
+            Elementary materials indexed by typeName, as required_materials
+            of Decomposition.
+        """
+        table = pd.DataFrame(
+            {
+                "typeName": self.names[self.materials["typeID"]],
+                "quantity": self.materials["quantity"],
+            }
+        )
+        return table.groupby(["typeName"])["quantity"].sum()
+
+    def save(self, directory: Path):
+        """Save arrays as .npy files, names are saved separately."""
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        np.save(directory / "rows.npy", self.rows)
+        np.save(directory / "materials.npy", self.materials)
+
+    @classmethod
+    def load(
+        cls, directory: Path, names: NameTable, mmap_mode: Optional[str] = "r"
+    ) -> "Plan":
+        """
+        Args:
+            names - name table the plan was saved with
+            mmap_mode - mode of np.load, arrays are memory-mapped by default
+        """
+        directory = Path(directory)
+        return cls(
+            np.load(directory / "rows.npy", mmap_mode=mmap_mode),
+            np.load(directory / "materials.npy", mmap_mode=mmap_mode),
+            names,
+        )
+
+    def __len__(self):
+        return self.rows.shape[0]
+
+    def __repr__(self):
+        return f"Plan(rows: {len(self)}, materials: {self.materials.shape[0]})"
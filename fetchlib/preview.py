@@ -0,0 +1,339 @@
+"""Preview of required materials with linear algebra.
+
+Ignoring rounding, materials required for a run are linear in the
+quantity ordered: item with quantity Q needs c * Q of its material, where
+for recipe quantity qm, output quantity q and ME impact me
+
+    production  c = max(qm * me, 1) / q
+    reaction    c = qm / q
+
+Bill of materials B = (I - A)^-1 of the matrix A of such coefficients maps
+an order to elementary materials with a single sparse mat-vec. Recipe
+graph is a DAG, so rows of B are composed level by level from the rows of
+inputs.
+
+Rounding of Decompositor only adds materials: if quantity of the item is
+at most U, every input requires at least c * Q and less than c * Q + e:
+
+    production  e = d * excess + jobs + 1, d = max(qm * me, 1) - min(qm * me, q)
+                excess, jobs = 1, 1 if ceil(U / q) <= run(max runs)
+                excess, jobs = run, ceil(U / (q * run)) otherwise
+    reaction    e = qm
+
+So estimate B x is a lower bound of exact quantities. Upper bound is
+propagated through the steps of the decomposition, which are known without
+rounding, adding e on every input: it takes a few vectorized operations
+per step and no rounding.
+"""
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from fetchlib.decompositor import Decompositor
+from fetchlib.engine import ArrayDecomposition
+from fetchlib.static_data_export import dense_positions, lookup_positions
+
+
+def _coalesce(rows: np.ndarray, columns: np.ndarray, *values: np.ndarray):
+    """Sum values of equal (row, column) pairs.
+
+    Returns:
+        Rows, columns and summed values sorted by row and column.
+    """
+    stride = int(columns.max()) + 1 if columns.size else 1
+    keys = rows * stride + columns
+    order = np.argsort(keys, kind="stable")
+    keys = keys[order]
+    if not keys.size:
+        return (rows, columns, *values)
+    starts = np.flatnonzero(np.concatenate(([True], keys[1:] != keys[:-1])))
+    rows, columns = np.divmod(keys[starts], stride)
+    return (
+        rows,
+        columns,
+        *(np.add.reduceat(value[order], starts) for value in values),
+    )
+
+
+@dataclass
+class BillOfMaterials:
+    """Sparse operator B over productable items.
+
+    Row of item is stored as starts[row]:starts[row] + lengths[row] slice
+    of columns(typeIDs of elementary materials) and values.
+
+    Attributes:
+        positions - dense typeID -> row
+        type_ids - typeIDs of rows
+    """
+
+    positions: np.ndarray
+    type_ids: np.ndarray
+    starts: np.ndarray
+    lengths: np.ndarray
+    columns: np.ndarray
+    values: np.ndarray
+
+    @property
+    def nbytes(self) -> int:
+        return sum(
+            array.nbytes
+            for array in (
+                self.positions,
+                self.type_ids,
+                self.starts,
+                self.lengths,
+                self.columns,
+                self.values,
+            )
+        )
+
+    @classmethod
+    def compile(cls, decompositor: Decompositor) -> "BillOfMaterials":
+        data_export = decompositor.data_export
+        graph = data_export.recipe_graph
+        type_ids = np.unique(data_export.products["productTypeID"].to_numpy("int64"))
+        type_ids = type_ids[graph.is_productable(type_ids)]
+        edges = _Edges.expand(decompositor, type_ids)
+        operator = cls(
+            positions=dense_positions(type_ids),
+            type_ids=type_ids,
+            starts=np.zeros(type_ids.shape[0], dtype="int64"),
+            lengths=np.zeros(type_ids.shape[0], dtype="int64"),
+            columns=np.array([], dtype="int64"),
+            values=np.array([], dtype="float64"),
+        )
+        child = lookup_positions(operator.positions, edges.material_ids)
+        height = _heights(edges.parents, child, edges.expanded, type_ids.shape[0])
+
+        edge_height = height[edges.parents]
+        for level in range(int(height.max(initial=-1)) + 1):
+            atomic = np.flatnonzero((edge_height == level) & ~edges.expanded)
+            composed = np.flatnonzero((edge_height == level) & edges.expanded)
+            # Rows of decomposed inputs are already compiled, they are
+            # gathered and scaled by the coefficients
+            entries, count = operator._entries(child[composed])
+            rows, columns, values = _coalesce(
+                np.concatenate(
+                    [edges.parents[atomic], np.repeat(edges.parents[composed], count)]
+                ),
+                np.concatenate([edges.material_ids[atomic], operator.columns[entries]]),
+                np.concatenate(
+                    [
+                        edges.coefficient[atomic],
+                        np.repeat(edges.coefficient[composed], count)
+                        * operator.values[entries],
+                    ]
+                ),
+            )
+            unique_rows, first, count = np.unique(
+                rows, return_index=True, return_counts=True
+            )
+            operator.starts[unique_rows] = operator.columns.shape[0] + first
+            operator.lengths[unique_rows] = count
+            operator.columns = np.concatenate([operator.columns, columns])
+            operator.values = np.concatenate([operator.values, values])
+        return operator
+
+    def _entries(self, rows: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Returns:
+            Positions of entries of rows in columns/values and amount of
+            entries of every row.
+        """
+        count = self.lengths[rows]
+        entries = np.repeat(self.starts[rows] - np.cumsum(count) + count, count)
+        return entries + np.arange(entries.shape[0]), count
+
+    def apply(
+        self, type_ids: np.ndarray, quantity: np.ndarray
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Sparse mat-vec of the order with B.
+
+        Args:
+            type_ids - productable typeIDs
+        Returns:
+            Pair of arrays: sorted typeIDs of elementary materials and their
+            quantities.
+        """
+        rows = lookup_positions(self.positions, type_ids)
+        if (rows < 0).any():
+            raise ValueError("Only productable items have bill of materials")
+        entries, count = self._entries(rows)
+        _, columns, total = _coalesce(
+            np.zeros(entries.shape[0], dtype="int64"),
+            self.columns[entries],
+            np.repeat(np.asarray(quantity, dtype="float64"), count)
+            * self.values[entries],
+        )
+        return columns, total
+
+
+@dataclass
+class _Edges:
+    """Recipe inputs of items with their coefficients."""
+
+    parents: np.ndarray
+    material_ids: np.ndarray
+    expanded: np.ndarray
+    coefficient: np.ndarray
+    production: np.ndarray
+    spread: np.ndarray
+    output_quantity: np.ndarray
+    run: np.ndarray
+    quantity_materials: np.ndarray
+
+    @classmethod
+    def expand(cls, decompositor: Decompositor, type_ids: np.ndarray) -> "_Edges":
+        graph = decompositor.data_export.recipe_graph
+        me_impact, run = decompositor.efficiency(type_ids)
+        activity, output_quantity = graph.recipes(type_ids)
+        parents, material_ids, quantity_materials = graph.expand(type_ids)
+
+        output_quantity = output_quantity[parents].astype("float64")
+        production = activity[parents] == 1
+        per_run = quantity_materials * me_impact[parents]
+        coefficient = np.where(production, np.maximum(per_run, 1), quantity_materials)
+        return cls(
+            parents=parents,
+            material_ids=material_ids,
+            expanded=~decompositor.is_atomic(material_ids),
+            coefficient=coefficient / output_quantity,
+            production=production,
+            spread=np.maximum(per_run, 1) - np.minimum(per_run, output_quantity),
+            output_quantity=output_quantity,
+            run=run[parents],
+            quantity_materials=quantity_materials.astype("float64"),
+        )
+
+    def upper(self, quantity: np.ndarray) -> np.ndarray:
+        """
+        Args:
+            quantity - upper bound of quantity of every item
+        Returns:
+            Upper bound of quantity required of every input.
+        """
+        quantity = quantity[self.parents]
+        runs = np.ceil(quantity / self.output_quantity)
+        single_job = runs <= self.run
+        excess = np.where(single_job, 1, self.run)
+        jobs = np.where(single_job, 1, np.ceil(runs / self.run))
+        rounding = np.where(
+            self.production,
+            self.spread * excess + jobs + 1,
+            self.quantity_materials,
+        )
+        return self.coefficient * quantity + rounding
+
+
+def _heights(parents, child, expanded, size) -> np.ndarray:
+    """Longest chain of decomposed inputs below every item."""
+    height = np.zeros(size, dtype="int64")
+    parents, child = parents[expanded], child[expanded]
+    for _ in range(size + 1):
+        updated = np.zeros(size, dtype="int64")
+        np.maximum.at(updated, parents, height[child] + 1)
+        if np.array_equal(updated, height):
+            return height
+        height = updated
+    raise ValueError("Recipe graph has a cycle")
+
+
+def bill_of_materials(decompositor: Decompositor) -> BillOfMaterials:
+    """
+    Returns:
+        Bill of materials of setup of decompositor, compiled once per
+        expansion fingerprint of setup and kept in the cache of data export.
+    """
+    data_export = decompositor.data_export
+    return data_export.cache.get(
+        ("bill_of_materials", decompositor.setup.expansion_fingerprint),
+        lambda: BillOfMaterials.compile(decompositor),
+    )
+
+
+@dataclass
+class Preview:
+    """Preview of elementary materials indexed by typeName.
+
+    Attributes:
+        estimate - quantities without rounding, a lower bound
+        upper - upper bound of quantities with rounding
+        exact - quantities of Decomposition, computed by exact pass only
+    """
+
+    estimate: pd.Series
+    upper: pd.Series
+    exact: Optional[pd.Series] = None
+
+    @property
+    def error_bound(self) -> pd.Series:
+        """Max difference between exact quantities and estimate."""
+        return self.upper - self.estimate
+
+    @property
+    def correction(self) -> Optional[pd.Series]:
+        """Exact quantities minus estimate, None without exact pass."""
+        if self.exact is None:
+            return None
+        return self.exact - self.estimate
+
+
+def preview(
+    order: Dict[str, int], decompositor: Decompositor, exact: bool = False
+) -> Preview:
+    """Estimate elementary materials of order.
+
+    Args:
+        order - typeNames to produce with corresponding quantities
+        exact - also decompose order exactly
+    Raises:
+        UnknownTypeNames(ValueError) - with suggestions for unknown names
+    """
+    data_export = decompositor.data_export
+    step = data_export.create_init_table(**order)
+    type_ids = step["typeID"].to_numpy(dtype="int64")
+    quantity = step["quantity"].to_numpy(dtype="float64")
+
+    operator = bill_of_materials(decompositor)
+    estimate = _named(data_export, *operator.apply(type_ids, quantity))
+
+    upper_ids: List[np.ndarray] = []
+    upper: List[np.ndarray] = []
+    while type_ids.size:
+        edges = _Edges.expand(decompositor, type_ids)
+        required = edges.upper(quantity)
+        upper_ids.append(edges.material_ids[~edges.expanded])
+        upper.append(required[~edges.expanded])
+        type_ids, quantity = _sum_by_id(
+            edges.material_ids[edges.expanded], required[edges.expanded]
+        )
+    upper = _named(
+        data_export,
+        np.concatenate(upper_ids + [np.array([], dtype="int64")]),
+        np.concatenate(upper + [np.array([])]),
+    ).reindex(estimate.index, fill_value=0.0)
+
+    result = Preview(estimate=estimate, upper=upper)
+    if exact:
+        decomposition = ArrayDecomposition(step=step, decompositor=decompositor)
+        result.exact = decomposition.required_materials.reindex(
+            estimate.index, fill_value=0
+        )
+    return result
+
+
+def _sum_by_id(type_ids: np.ndarray, quantity: np.ndarray):
+    _, type_ids, quantity = _coalesce(
+        np.zeros(type_ids.shape[0], dtype="int64"), type_ids, quantity
+    )
+    return type_ids, quantity
+
+
+def _named(data_export, type_ids: np.ndarray, quantity: np.ndarray) -> pd.Series:
+    table = pd.DataFrame(
+        {"typeName": data_export.type_names(type_ids), "quantity": quantity}
+    )
+    return table.groupby("typeName")["quantity"].sum()
@@ -0,0 +1,162 @@
+from pathlib import Path
+from typing import Tuple
+
+import numpy as np
+import pandas as pd
+
+from fetchlib.snapshot import load_columns, save_columns
+
+NO_BLUEPRINT = -1
+
+
+class RecipeGraph:
+    """Recipe graph compiled into dense arrays indexed by typeID.
+
+    For every productable typeID graph stores producing blueprint, activity
+    and output quantity. Inputs of the recipe are stored in CSR format:
+    material_ids[indptr[typeID]:indptr[typeID + 1]] are materialTypeIDs and
+    material_quantities of the same slice are required quantities per run.
+    """
+
+    ARRAYS = (
+        "blueprint",
+        "activity",
+        "output_quantity",
+        "indptr",
+        "material_ids",
+        "material_quantities",
+    )
+
+    def __init__(
+        self,
+        *,
+        blueprint,
+        activity,
+        output_quantity,
+        indptr,
+        material_ids,
+        material_quantities,
+    ):
+        self.blueprint = blueprint
+        self.activity = activity
+        self.output_quantity = output_quantity
+        self.indptr = indptr
+        self.material_ids = material_ids
+        self.material_quantities = material_quantities
+
+    @property
+    def size(self) -> int:
+        """Upper bound (exclusive) of typeIDs known to the graph."""
+        return self.blueprint.shape[0]
+
+    @property
+    def nbytes(self) -> int:
+        return sum(getattr(self, name).nbytes for name in self.ARRAYS)
+
+    def __repr__(self):
+        productable = int((np.asarray(self.blueprint) != NO_BLUEPRINT).sum())
+        return (
+            f"RecipeGraph(productable: {productable}, "
+            f"edges: {self.material_ids.shape[0]})"
+        )
+
+    @classmethod
+    def from_tables(
+        cls, products: pd.DataFrame, materials: pd.DataFrame
+    ) -> "RecipeGraph":
+        """
+        Args:
+            products - table shaped as AbstractDataExport.products
+            materials - table shaped as AbstractDataExport.materials
+        """
+        product_ids = products["productTypeID"].to_numpy(dtype="int64")
+        material_type_ids = materials["materialTypeID"].to_numpy(dtype="int64")
+        size = int(max(product_ids.max(initial=0), material_type_ids.max(initial=0)))
+        size += 1
+
+        blueprint = np.full(size, NO_BLUEPRINT, dtype="int64")
+        activity = np.zeros(size, dtype="int64")
+        output_quantity = np.ones(size, dtype="int64")
+        blueprint[product_ids] = products["typeID"].to_numpy(dtype="int64")
+        activity[product_ids] = products["activityID"].to_numpy(dtype="int64")
+        output_quantity[product_ids] = products["quantity"].to_numpy(dtype="int64")
+
+        edges = products[["typeID", "productTypeID"]].merge(
+            materials[["typeID", "materialTypeID", "quantity"]],
+            on="typeID",
+            how="inner",
+        )
+        edges = edges.sort_values("productTypeID", kind="stable")
+        edge_products = edges["productTypeID"].to_numpy(dtype="int64")
+
+        indptr = np.zeros(size + 1, dtype="int64")
+        np.cumsum(np.bincount(edge_products, minlength=size), out=indptr[1:])
+
+        return cls(
+            blueprint=blueprint,
+            activity=activity,
+            output_quantity=output_quantity,
+            indptr=indptr,
+            material_ids=edges["materialTypeID"].to_numpy(dtype="int64"),
+            material_quantities=edges["quantity"].to_numpy(dtype="int64"),
+        )
+
+    @classmethod
+    def from_data_export(cls, data_export) -> "RecipeGraph":
+        return cls.from_tables(data_export.products, data_export.materials)
+
+    def save(self, directory: Path):
+        save_columns(
+            Path(directory), {name: getattr(self, name) for name in self.ARRAYS}
+        )
+
+    @classmethod
+    def load(cls, directory: Path, mmap: bool = True) -> "RecipeGraph":
+        return cls(**load_columns(Path(directory), cls.ARRAYS, mmap))
+
+    def _clip(self, type_ids) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Returns:
+            typeIDs clipped to the graph size and mask of known typeIDs.
+        """
+        type_ids = np.asarray(type_ids, dtype="int64")
+        known = (type_ids >= 0) & (type_ids < self.size)
+        return np.where(known, type_ids, 0), known
+
+    def is_productable(self, type_ids) -> np.ndarray:
+        clipped, known = self._clip(type_ids)
+        return known & (self.blueprint[clipped] != NO_BLUEPRINT)
+
+    def recipes(self, type_ids) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Returns:
+            Pair of arrays aligned with type_ids: activityID and output
+            quantity of the recipe(0 and 1 for non-productable items).
+        """
+        clipped, known = self._clip(type_ids)
+        return (
+            np.where(known, self.activity[clipped], 0),
+            np.where(known, self.output_quantity[clipped], 1),
+        )
+
+    def degree(self, type_ids) -> np.ndarray:
+        """Amount of different inputs of the recipe for every typeID."""
+        clipped, known = self._clip(type_ids)
+        return np.where(known, self.indptr[clipped + 1] - self.indptr[clipped], 0)
+
+    def expand(self, type_ids) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Gather recipe inputs for typeIDs.
+
+        Returns:
+            Triple of arrays with one item per input: position of the parent
+            in type_ids, materialTypeID and quantity per run.
+        """
+        clipped, _ = self._clip(type_ids)
+        degree = self.degree(type_ids)
+        parents = np.repeat(np.arange(degree.shape[0]), degree)
+        starts = np.repeat(self.indptr[clipped], degree)
+        offsets = np.arange(parents.shape[0]) - np.repeat(
+            np.cumsum(degree) - degree, degree
+        )
+        edges = starts + offsets
+        return parents, self.material_ids[edges], self.material_quantities[edges]
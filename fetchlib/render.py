@@ -0,0 +1,113 @@
+"""Streaming output of plans.
+
+Steps are written one after another as the decomposition produces them,
+from the final product down to the deepest components, so output starts
+with the first level and lazy decompositions which do not keep their steps
+are written in bounded memory. Every table is written in chunks of rows:
+
+    steps - production instructions numbered in the order they are
+        produced, each followed by its balancing if setup is given
+    required materials - elementary materials of the plan, known once all
+        steps are produced
+
+JSON Lines output has one object per row with 'section' key.
+"""
+import csv
+import json
+from typing import TextIO
+
+import pandas as pd
+
+from fetchlib import LineLoad, balance_step
+
+FORMAT_TSV = "tsv"
+FORMAT_CSV = "csv"
+FORMAT_JSONL = "jsonl"
+FORMATS = (FORMAT_TSV, FORMAT_CSV, FORMAT_JSONL)
+SEPARATORS = {FORMAT_TSV: "\t", FORMAT_CSV: ","}
+CHUNK_ROWS = 10000
+
+
+def write_plan(
+    decomposition,
+    file: TextIO,
+    fmt: str = FORMAT_TSV,
+    setup=None,
+    chunksize: int = CHUNK_ROWS,
+):
+    """Write plan to file-like object step by step.
+
+    Args:
+        decomposition - Decomposition or any decomposition engine result,
+            it is iterated once
+        fmt - FORMAT_TSV, FORMAT_CSV or FORMAT_JSONL
+        setup - setup with lines to write balancing of runs
+        chunksize - amount of rows of a table formatted at once
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown format: {fmt}, expected one of {FORMATS}")
+    if fmt == FORMAT_JSONL:
+        writer = _JsonLinesWriter(file, chunksize)
+    else:
+        writer = _TextWriter(file, SEPARATORS[fmt], chunksize)
+
+    for i, table in enumerate(decomposition, start=1):
+        writer.step(i, table)
+        if setup is not None:
+            writer.balancing(i, balance_step(table, setup))
+    writer.materials(decomposition.required_materials)
+
+
+class _TextWriter:
+    """Sections with headers of str(decomposition) and tables as CSV."""
+
+    def __init__(self, file: TextIO, sep: str, chunksize: int):
+        self.file = file
+        self.sep = sep
+        self.chunksize = chunksize
+
+    def materials(self, materials: pd.Series):
+        self.file.write("Required materials:\n")
+        materials.to_csv(self.file, sep=self.sep, chunksize=self.chunksize)
+        self.file.write("\n")
+
+    def step(self, number: int, table: pd.DataFrame):
+        self.file.write(f"Step {number} is: \n")
+        table.to_csv(self.file, index=False, sep=self.sep, chunksize=self.chunksize)
+        self.file.write("\n")
+
+    def balancing(self, number: int, loads):
+        self.file.write(f"Balancing runs for step {number}:\n")
+        writer = csv.writer(self.file, delimiter=self.sep, lineterminator="\n")
+        writer.writerow(["typeName", "lines"])
+        writer.writerows((name, str(load)) for name, load in loads)
+        self.file.write("\n")
+
+
+class _JsonLinesWriter:
+    def __init__(self, file: TextIO, chunksize: int):
+        self.file = file
+        self.chunksize = chunksize
+
+    def _records(self, table: pd.DataFrame, **fields):
+        for start in range(0, table.shape[0], self.chunksize):
+            chunk = table.iloc[start : start + self.chunksize]
+            self.file.write(
+                "".join(
+                    json.dumps({**fields, **record}) + "\n"
+                    for record in chunk.to_dict("records")
+                )
+            )
+
+    def materials(self, materials: pd.Series):
+        self._records(materials.reset_index(), section="materials")
+
+    def step(self, number: int, table: pd.DataFrame):
+        self._records(table, section="step", step=number)
+
+    def balancing(self, number: int, loads):
+        table = pd.DataFrame(
+            [(name, *load) for name, load in loads],
+            columns=["typeName", *LineLoad._fields],
+        )
+        self._records(table, section="balancing", step=number)
@@ -162,15 +162,21 @@ class RigSet(RigEffect):
         te_impact - part of time required after rigset application
         me_impact - part of materials required after rigset application
         """
+        me_impacts = self.represent_me(space_type)
+        te_impacts = self.represent_te(space_type)
+        contents = {
+            production_class: data_export.get_class_contents(production_class)
+            for production_class in set(me_impacts) | set(te_impacts)
+        }
         me_dictionary = {
             typename: [1 - impact]
-            for production_class, impact in self.represent_me(space_type).items()
-            for typename in data_export.get_class_contents(production_class)
+            for production_class, impact in me_impacts.items()
+            for typename in contents[production_class]
         }
         te_dictionary = {
             typename: [1 - impact]
-            for production_class, impact in self.represent_te(space_type).items()
-            for typename in data_export.get_class_contents(production_class)
+            for production_class, impact in te_impacts.items()
+            for typename in contents[production_class]
         }
         me_df = pd.DataFrame.from_dict(
             me_dictionary, orient="index", columns=["me_impact"]
@@ -0,0 +1,225 @@
+"""Job scheduling of Decomposition over production and reaction lines.
+
+Every item(node) of every step is split into jobs of at most max runs of
+its blueprint. As in balancify_runs, runs are spread evenly over lines:
+node gets whole rounds of jobs over all lines of its activity, so jobs of
+a node are equal up to a run. Job lasts base time * runs * te_impact.
+Node may start when all nodes producing its inputs are finished.
+
+Jobs are scheduled by list scheduling: whenever a line is free, it takes
+the ready job of its activity with the highest priority. Priority is the
+rank of the node, its longest job plus the longest chain of consumers
+after it, ties go to longer jobs(LPT). Production and reaction lines are
+separate pools.
+
+Makespan is at least the lower bound: the longest chain of the longest
+jobs of nodes, and the work of every pool divided by its lines.
+"""
+import heapq
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from fetchlib.decomposition import Decomposition
+from fetchlib.timing import (
+    PRODUCTION,
+    REACTION,
+    _inputs,
+    _job_counts,
+    _nodes,
+    format_duration,
+)
+
+MAX_JOBS = 10**6
+
+
+@dataclass
+class Schedule:
+    """
+    Attributes:
+        jobs - one row per job: typeID, typeName, level, activityID, runs,
+            line(number of line of the activity), start and finish
+        utilization - one row per activityID: lines, busy(total time of
+            jobs), utilization(busy time of lines during makespan)
+        lower_bound - no schedule is shorter
+    """
+
+    jobs: pd.DataFrame
+    utilization: pd.DataFrame
+    lower_bound: float
+
+    @property
+    def makespan(self) -> float:
+        if self.jobs.empty:
+            return 0.0
+        return float(self.jobs["finish"].max())
+
+    def __str__(self):
+        result = [
+            f"Makespan: {format_duration(self.makespan)}, "
+            f"lower bound: {format_duration(self.lower_bound)}"
+        ]
+        names = {PRODUCTION: "Production", REACTION: "Reaction"}
+        for activity, row in self.utilization.iterrows():
+            result.append(
+                f"{names.get(activity, activity)} lines: {int(row['lines'])}, "
+                f"utilization: {row['utilization']:.1%}"
+            )
+        return "\n".join(result)
+
+
+def schedule(
+    decomposition: Decomposition, lines: Optional[Dict[int, int]] = None
+) -> Schedule:
+    """Schedule jobs of decomposition.
+
+    Args:
+        lines - amount of lines per activityID, lines of setup by default
+    Raises:
+        ValueError - plan has more than MAX_JOBS jobs
+    """
+    decompositor = decomposition.decompositor
+    data_export, setup = decompositor.data_export, decompositor.setup
+    if lines is None:
+        lines = {
+            PRODUCTION: setup.production_lines,
+            REACTION: setup.reaction_lines,
+        }
+
+    nodes = _nodes(decomposition.steps)
+    type_ids = nodes["typeID"].to_numpy(dtype="int64")
+    activity = nodes["activityID"].to_numpy(dtype="int64")
+    runs, _, min_jobs = _job_counts(nodes, decompositor)
+    pool = np.array([max(lines.get(a, 1), 1) for a in activity], dtype="int64")
+    jobs = np.minimum(runs, -(-min_jobs // pool) * pool)
+    if jobs.sum() > MAX_JOBS:
+        raise ValueError(f"Plan has {jobs.sum()} jobs, at most {MAX_JOBS} expected")
+    run_time = data_export.base_times(type_ids) * decompositor.time_efficiency(type_ids)
+
+    job_node = np.repeat(np.arange(nodes.shape[0]), jobs)
+    index = np.arange(job_node.shape[0]) - np.repeat(np.cumsum(jobs) - jobs, jobs)
+    div, reminder = np.divmod(runs, np.maximum(jobs, 1))
+    job_runs = div[job_node] + (index < reminder[job_node])
+    duration = run_time[job_node] * job_runs
+
+    parents, inputs = _inputs(nodes, data_export.recipe_graph)
+    longest = np.zeros(nodes.shape[0], dtype="float64")
+    np.maximum.at(longest, job_node, duration)
+    rank = _ranks(nodes["level"].to_numpy(), parents, inputs, longest)
+
+    start, finish, line = _list_schedule(
+        job_node=job_node,
+        activity=activity,
+        duration=duration,
+        priority=rank[job_node],
+        parents=parents,
+        inputs=inputs,
+        lines=lines,
+    )
+    table = nodes.iloc[job_node][["typeID", "typeName", "level", "activityID"]]
+    table = table.reset_index(drop=True).assign(
+        runs=job_runs, line=line, start=start, finish=finish
+    )
+    table = table.sort_values(["start", "activityID", "line"], kind="stable")
+    return Schedule(
+        jobs=table.reset_index(drop=True),
+        utilization=_utilization(table, duration, activity[job_node], lines),
+        lower_bound=_lower_bound(rank, duration, activity[job_node], lines),
+    )
+
+
+def _ranks(levels, parents, inputs, longest) -> np.ndarray:
+    """Longest chain of the longest jobs from every node to the final product."""
+    rank = longest.copy()
+    after = np.zeros(longest.shape[0], dtype="float64")
+    # Consumers are on lower levels, so their ranks are known first
+    for level in np.unique(levels):
+        rows = np.flatnonzero(levels == level)
+        rank[rows] = longest[rows] + after[rows]
+        edges = np.flatnonzero(levels[parents] == level)
+        np.maximum.at(after, inputs[edges], rank[parents[edges]])
+    return rank
+
+
+def _list_schedule(*, job_node, activity, duration, priority, parents, inputs, lines):
+    """Non-delay list scheduling with precedence constraints.
+
+    Returns:
+        Arrays aligned with jobs: start, finish and line.
+    """
+    size = activity.shape[0]
+    job_node = job_node.tolist()
+    jobs_left = np.bincount(job_node, minlength=size)
+    jobs_of_node: List[List[int]] = [[] for _ in range(size)]
+    for job, node in enumerate(job_node):
+        jobs_of_node[node].append(job)
+    inputs_left = np.zeros(size, dtype="int64")
+    consumers: List[List[int]] = [[] for _ in range(size)]
+    for consumer, node in set(zip(parents.tolist(), inputs.tolist())):
+        inputs_left[consumer] += 1
+        consumers[node].append(consumer)
+
+    activity, duration, priority = (
+        values.tolist() for values in (activity, duration, priority)
+    )
+    start = np.zeros(len(duration), dtype="float64")
+    finish = np.zeros(len(duration), dtype="float64")
+    line = np.zeros(len(duration), dtype="int64")
+    pools = {a: max(lines.get(a, 1), 1) for a in set(activity)}
+    free = {a: list(range(1, count + 1)) for a, count in pools.items()}
+    ready: Dict[int, list] = {a: [] for a in pools}
+    events: list = []
+
+    def release(node, time):
+        if not jobs_left[node]:
+            complete(node, time)
+        for job in jobs_of_node[node]:
+            heapq.heappush(ready[activity[node]], (-priority[job], -duration[job], job))
+
+    def complete(node, time):
+        for consumer in consumers[node]:
+            inputs_left[consumer] -= 1
+            if not inputs_left[consumer]:
+                release(consumer, time)
+
+    for node in np.flatnonzero(inputs_left == 0).tolist():
+        release(node, 0.0)
+    time = 0.0
+    while True:
+        for a, queue in ready.items():
+            while queue and free[a]:
+                _, _, job = heapq.heappop(queue)
+                line[job] = heapq.heappop(free[a])
+                start[job], finish[job] = time, time + duration[job]
+                heapq.heappush(events, (finish[job], job))
+        if not events:
+            break
+        time, job = heapq.heappop(events)
+        node = job_node[job]
+        heapq.heappush(free[activity[node]], line[job])
+        jobs_left[node] -= 1
+        if not jobs_left[node]:
+            complete(node, time)
+    return start, finish, line
+
+
+def _utilization(table, duration, activity, lines) -> pd.DataFrame:
+    makespan = float(table["finish"].max()) if not table.empty else 0.0
+    rows = []
+    for a in np.unique(activity).tolist():
+        count = max(lines.get(a, 1), 1)
+        busy = float(duration[activity == a].sum())
+        rows.append((a, count, busy, busy / (count * makespan) if makespan else 0.0))
+    return pd.DataFrame(
+        rows, columns=["activityID", "lines", "busy", "utilization"]
+    ).set_index("activityID")
+
+
+def _lower_bound(rank, duration, activity, lines) -> float:
+    bound = float(rank.max(initial=0.0))
+    for a in np.unique(activity).tolist():
+        work = float(duration[activity == a].sum())
+        bound = max(bound, work / max(lines.get(a, 1), 1))
+    return bound
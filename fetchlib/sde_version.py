@@ -0,0 +1,98 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Dict, Mapping, Optional, Set
+
+import requests
+
+MANIFEST_SUFFIX = ".manifest.json"
+TIMEOUT = 60
+FETCH_SIZE = 10_000
+
+
+@dataclass
+class VersionManifest:
+    """Installed version of the SDE.
+
+    etag and last_modified identify the downloaded archive, tables maps
+    table name to the hash of its content.
+    """
+
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    tables: Dict[str, str] = field(default_factory=dict)
+
+    @property
+    def version(self) -> str:
+        """Identifier of the content, changes only if any table changed."""
+        content = json.dumps(self.tables, sort_keys=True)
+        return hashlib.sha1(content.encode()).hexdigest()[:16]
+
+    def is_outdated(self, remote: Mapping[str, Optional[str]]) -> bool:
+        """Check if remote archive differs from the installed one.
+
+        Args:
+            remote - result of remote_version
+        """
+        if remote.get("etag") and self.etag:
+            return remote["etag"] != self.etag
+        if remote.get("last_modified") and self.last_modified:
+            return remote["last_modified"] != self.last_modified
+        return True
+
+    def changed_tables(self, tables: Mapping[str, str]) -> Set[str]:
+        """
+        Args:
+            tables - mapping of table name to content hash
+        Returns:
+            Names of tables with different content.
+        """
+        return {
+            name for name, value in tables.items() if self.tables.get(name) != value
+        }
+
+    @classmethod
+    def load(cls, path: Path) -> "VersionManifest":
+        try:
+            with open(path) as file:
+                return cls(**json.load(file))
+        except (OSError, ValueError, TypeError):
+            return cls()
+
+    def save(self, path: Path):
+        path = Path(path)
+        tmp = path.with_name(f"{path.name}.tmp-{os.getpid()}-{threading.get_ident()}")
+        with open(tmp, "w") as file:
+            json.dump(asdict(self), file, indent=2)
+        os.replace(tmp, path)
+
+
+def remote_version(url: str) -> Dict[str, Optional[str]]:
+    """Cheap check of the remote archive version with HEAD request."""
+    res = requests.head(url, allow_redirects=True, timeout=TIMEOUT)
+    res.raise_for_status()
+    return {
+        "etag": res.headers.get("ETag"),
+        "last_modified": res.headers.get("Last-Modified"),
+    }
+
+
+def table_hash(conn: sqlite3.Connection, query: str) -> str:
+    """Hash of the query result which does not depend on the order of rows."""
+    columns = conn.execute(f"select * from ({query}) limit 0").description
+    order = ", ".join(str(i) for i in range(1, len(columns) + 1))
+    cursor = conn.execute(f"select * from ({query}) order by {order}")
+    digest = hashlib.sha1()
+    while rows := cursor.fetchmany(FETCH_SIZE):
+        digest.update(repr(rows).encode())
+    return digest.hexdigest()
+
+
+def table_hashes(
+    conn: sqlite3.Connection, queries: Mapping[str, str]
+) -> Dict[str, str]:
+    return {name: table_hash(conn, query) for name, query in queries.items()}
@@ -1,6 +1,9 @@
+import hashlib
 import pickle
-from typing import Iterable, Optional, Set
+from dataclasses import dataclass
+from typing import Iterable, Optional, Set, Tuple
 
+import numpy as np
 import pandas as pd
 
 from fetchlib.blueprint import Blueprint, BlueprintCollection
@@ -14,6 +17,13 @@ DEFAULT_NON_PRODUCTABLES = {
     "Helium Fuel Block",
     "Hydrogen Fuel Block",
 }
+DEFAULT_RUNS = 2**10
+# Columns of EfficiencyArrays with values for types without impact
+DEFAULTS = {"me_impact": 1.0, "te_impact": 1.0, "run": DEFAULT_RUNS}
+
+
+def _digest(state: list) -> str:
+    return hashlib.blake2b(repr(state).encode(), digest_size=16).hexdigest()
 
 
 class Setup:
@@ -44,8 +54,66 @@ class Setup:
         return self._non_productables
 
     @property
-    def efficiency_impact(self) -> pd.DataFrame:
+    def efficiency_fingerprint(self) -> str:
+        """
+        Returns:
+            Digest of everything affecting efficiency of production, equal
+            setups have equal fingerprints regardless of the order of changes.
+        """
+        return _digest(self._efficiency_state())
+
+    @property
+    def fingerprint(self) -> str:
+        """
+        Returns:
+            Digest of everything affecting production plans.
+        """
+        state = self._efficiency_state() + [
+            self.skills,
+            sorted(self.non_productables),
+            self.reaction_lines,
+            self.production_lines,
+        ]
+        return _digest(state)
+
+    @property
+    def expansion_fingerprint(self) -> str:
         """
+        Returns:
+            Digest of everything affecting expansion of an item into its
+            materials: efficiency and non-productables, but not lines or
+            skills.
+        """
+        return _digest(self._efficiency_state() + [sorted(self.non_productables)])
+
+    def _efficiency_state(self) -> list:
+        return [
+            self.citadel_type,
+            self.space_type,
+            sorted(repr(rig_effect) for rig_effect in self.rig_set),
+            self.collection.fingerprint,
+        ]
+
+    def efficiency_arrays(
+        self, data_export: AbstractDataExport = sde
+    ) -> "EfficiencyArrays":
+        """Efficiency impact compiled into arrays indexed by typeID.
+
+        Arrays are kept in the cache of data export under efficiency
+        fingerprint, so they are compiled once per content of setup and
+        dropped together with the data they were built from.
+        """
+        return data_export.cache.get(
+            ("efficiency_arrays", self.efficiency_fingerprint),
+            lambda: EfficiencyArrays.from_impact(
+                self.efficiency_impact(data_export), data_export
+            ),
+        )
+
+    def efficiency_impact(self, data_export: AbstractDataExport = sde) -> pd.DataFrame:
+        """
+        Args:
+            data_export - data export used to resolve production classes
         Returns:
             pandas DataFrame indexed by typeName containing info
             about combined blueprint and rig impact. For example:
@@ -53,7 +121,7 @@ class Setup:
                     te_impact me_impact runs
             Raven        0.85      0.56  10
         """
-        rig_df = self.rig_set.to_dataframe(self.space_type, sde)
+        rig_df = self.rig_set.to_dataframe(self.space_type, data_export)
         bp_df = self.collection.to_dataframe
 
         res = rig_df.join(bp_df, how="outer", rsuffix="_x", lsuffix="_y").fillna(1)
@@ -63,10 +131,64 @@ class Setup:
         return res[["te_impact", "me_impact", "run"]]
 
 
+@dataclass(frozen=True)
+class EfficiencyArrays:
+    """Efficiency impact of setup indexed by typeID.
+
+    Types without impact have me_impact and te_impact of 1.0 and max runs
+    of DEFAULT_RUNS.
+    """
+
+    me_impact: np.ndarray
+    te_impact: np.ndarray
+    run: np.ndarray
+
+    @classmethod
+    def from_impact(
+        cls, impact: pd.DataFrame, data_export: AbstractDataExport
+    ) -> "EfficiencyArrays":
+        """
+        Args:
+            impact - result of Setup.efficiency_impact, the first row of
+                duplicated typeName wins
+        """
+        type_ids = data_export.type_ids(impact.index)
+        known = type_ids >= 0
+        type_ids = type_ids[known][::-1]
+        size = int(type_ids.max()) + 1 if type_ids.size else 0
+        arrays = {}
+        for column, default in DEFAULTS.items():
+            values = np.full(size, default, dtype="float64")
+            # Reversed assignment leaves the first occurrence of typeID
+            values[type_ids] = impact[column].to_numpy(dtype="float64")[known][::-1]
+            arrays[column] = np.where(np.isnan(values), default, values)
+        return cls(**arrays)
+
+    @property
+    def nbytes(self) -> int:
+        return self.me_impact.nbytes + self.te_impact.nbytes + self.run.nbytes
+
+    def take(self, type_ids) -> Tuple[np.ndarray, ...]:
+        """
+        Returns:
+            Tuple of arrays aligned with type_ids: material efficiency
+            impact, time efficiency impact and max runs of blueprint.
+        """
+        type_ids = np.asarray(type_ids, dtype="int64")
+        known = (type_ids >= 0) & (type_ids < self.run.shape[0])
+        positions = type_ids[known]
+        result = []
+        for column, default in DEFAULTS.items():
+            values = np.full(type_ids.shape, default, dtype="float64")
+            values[known] = getattr(self, column)[positions]
+            result.append(values)
+        return tuple(result)
+
+
 class SetupManager:
     """Class, responsible for Setup creation/serealization/management"""
 
-    def __init__(self, data_export: AbstractDataExport):
+    def __init__(self, data_export: AbstractDataExport = sde):
         self.data_export = data_export
 
     def get(self, name: str) -> Setup:
@@ -124,10 +246,7 @@ class SetupManager:
             time_efficiency - te in [0.0, 0.2]
             runs - max runs of blueprint
         """
-
-        if name not in self.data_export.productable_type_names.values:
-            raise ValueError(f"Unknown typename: {name}")
-
+        name = self.resolve_productable(name)
         setup.collection.add(Blueprint(name=name, **kwargs))
 
     def set_lines_amount(
@@ -143,6 +262,16 @@ class SetupManager:
             self.production_lines = production_lines
 
     def add_non_productable_to_setup(self, setup, name):
-        if name not in self.data_export.productable_type_names.values:
-            raise ValueError(f"Unknown typename: {name}")
+        name = self.resolve_productable(name)
         setup._non_productables.add(name)
+
+    def resolve_productable(self, name: str) -> str:
+        """
+        Returns:
+            Canonical typeName of productable item, matched ignoring case.
+        Raises:
+            UnknownTypeNames(ValueError) - with suggestions for unknown name
+        """
+        resolution = self.data_export.productable_name_index.resolve_many([name])
+        resolution.raise_for_unknown()
+        return resolution.names[0]
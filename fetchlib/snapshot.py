@@ -0,0 +1,185 @@
+import hashlib
+import json
+import os
+import shutil
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Dict, Mapping
+
+import numpy as np
+import pandas as pd
+
+SNAPSHOT_SUFFIX = ".snapshot"
+MANIFEST_NAME = "manifest.json"
+FORMAT_VERSION = 1
+
+
+def source_fingerprint(path: Path) -> Dict[str, int]:
+    """Cheap fingerprint of the source database file."""
+    stat = Path(path).stat()
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+def query_hash(query: str) -> str:
+    normalized = " ".join(query.split())
+    return hashlib.sha1(normalized.encode()).hexdigest()
+
+
+def save_columns(directory: Path, columns: Mapping[str, np.ndarray]):
+    """Store every column as a separate .npy file inside directory."""
+    directory.mkdir(parents=True, exist_ok=True)
+    for name, values in columns.items():
+        np.save(directory / f"{name}.npy", np.ascontiguousarray(values))
+
+
+def load_columns(directory: Path, names, mmap: bool = True) -> Dict[str, np.ndarray]:
+    """Load columns stored by save_columns, memory mapped when possible."""
+    result = {}
+    for name in names:
+        path = directory / f"{name}.npy"
+        try:
+            result[name] = np.load(path, mmap_mode="r" if mmap else None)
+        except ValueError:
+            # Empty arrays could not be memory mapped
+            result[name] = np.load(path)
+    return result
+
+
+def _encode_column(series: pd.Series):
+    """
+    Returns:
+        Pair of typed numpy array and null mask (None if there are no nulls).
+    """
+    if series.dtype != object:
+        return series.to_numpy(), None
+    nulls = series.isna().to_numpy()
+    values = series.where(~nulls, "").astype(str).to_numpy()
+    width = max((len(value) for value in values), default=1) or 1
+    return values.astype(f"<U{width}"), (nulls if nulls.any() else None)
+
+
+def _decode_column(values: np.ndarray, nulls) -> np.ndarray:
+    if values.dtype.kind != "U":
+        return values
+    decoded = values.astype(object)
+    if nulls is not None:
+        decoded[np.asarray(nulls)] = None
+    return decoded
+
+
+class Snapshot:
+    """Compact columnar copy of the tables used by fetchlib.
+
+    Snapshot is stored next to the source database as a directory of
+    per-column .npy files and is loaded with memory mapping.
+    """
+
+    def __init__(self, db_path: Path, queries: Mapping[str, str]):
+        """
+        Args:
+            db_path - source sqlite3 database
+            queries - mapping of table name to query producing the table
+        """
+        self.db_path = Path(db_path)
+        self.queries = dict(queries)
+        self.directory = self.db_path.with_name(self.db_path.name + SNAPSHOT_SUFFIX)
+
+    @property
+    def manifest_path(self) -> Path:
+        return self.directory / MANIFEST_NAME
+
+    def read_manifest(self) -> dict:
+        try:
+            with open(self.manifest_path) as file:
+                return json.load(file)
+        except (OSError, ValueError):
+            return {}
+
+    def is_fresh(self) -> bool:
+        """Check if snapshot corresponds to the source database and queries."""
+        manifest = self.read_manifest()
+        if manifest.get("format") != FORMAT_VERSION:
+            return False
+        if manifest.get("source") != source_fingerprint(self.db_path):
+            return False
+        tables = manifest.get("tables", {})
+        return set(tables) == set(self.queries) and all(
+            tables[name]["query"] == query_hash(query)
+            for name, query in self.queries.items()
+        )
+
+    def compile(self, conn: sqlite3.Connection, tables=None, keep=()):
+        """(Re)build snapshot from the source database.
+
+        Args:
+            conn - connection to the source database
+            tables - names of tables to rebuild, all of them by default.
+                Other tables are carried over from the current snapshot.
+            keep - names of derived artifacts stored inside snapshot
+                directory which are carried over as well
+        """
+        manifest = self.read_manifest()
+        previous = manifest.get("tables", {})
+        if manifest.get("format") != FORMAT_VERSION or tables is None:
+            tables, previous = set(self.queries), {}
+        tmp = self.directory.with_name(
+            f"{self.directory.name}.tmp-{os.getpid()}-{threading.get_ident()}"
+        )
+        shutil.rmtree(tmp, ignore_errors=True)
+        tmp.mkdir(parents=True)
+
+        for name in keep:
+            if (self.directory / name).exists():
+                os.replace(self.directory / name, tmp / name)
+
+        entries = {}
+        for name, query in self.queries.items():
+            reusable = (
+                previous.get(name, {}).get("query") == query_hash(query)
+                and (self.directory / name).exists()
+            )
+            if name not in tables and reusable:
+                os.replace(self.directory / name, tmp / name)
+                entries[name] = previous[name]
+                continue
+            table = pd.read_sql_query(query, conn)
+            columns, nulls = {}, []
+            for column in table.columns:
+                values, mask = _encode_column(table[column])
+                columns[column] = values
+                if mask is not None:
+                    columns[f"{column}.null"] = mask
+                    nulls.append(column)
+            save_columns(tmp / name, columns)
+            entries[name] = {
+                "query": query_hash(query),
+                "columns": list(table.columns),
+                "nulls": nulls,
+                "rows": int(table.shape[0]),
+            }
+
+        with open(tmp / MANIFEST_NAME, "w") as file:
+            json.dump(
+                {
+                    "format": FORMAT_VERSION,
+                    "source": source_fingerprint(self.db_path),
+                    "tables": entries,
+                },
+                file,
+            )
+        shutil.rmtree(self.directory, ignore_errors=True)
+        os.replace(tmp, self.directory)
+
+    def load(self, name: str, mmap: bool = True) -> pd.DataFrame:
+        """Load table from snapshot."""
+        entry = self.read_manifest()["tables"][name]
+        nulls = [f"{column}.null" for column in entry["nulls"]]
+        arrays = load_columns(self.directory / name, entry["columns"] + nulls, mmap)
+        return pd.DataFrame(
+            {
+                column: _decode_column(arrays[column], arrays.get(f"{column}.null"))
+                for column in entry["columns"]
+            },
+            columns=entry["columns"],
+        )
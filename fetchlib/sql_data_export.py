@@ -0,0 +1,287 @@
+import json
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import Iterator, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+from fetchlib.cache import cached_property
+from fetchlib.connection_pool import ConnectionPool
+from fetchlib.name_index import NameIndex
+from fetchlib.snapshot import source_fingerprint
+from fetchlib.static_data_export import DB_NAME, TABLE_QUERIES, StaticDataExport
+from fetchlib.utils import PATH
+
+SIDECAR_SUFFIX = ".index.db"
+# Bumped when tables or indexes of sidecar change
+SIDECAR_FORMAT = 2
+
+# Covering indexes for the lookups made during decomposition
+SIDECAR_INDEXES = (
+    "create index materials_by_type on materials"
+    "(typeID, activityID, materialTypeID, quantity)",
+    "create index products_by_product on products"
+    "(productTypeID, typeID, activityID, quantity)",
+    "create index types_by_id on types(typeID, typeName)",
+    "create index types_by_name on types(typeName, typeID)",
+    "create index types_by_market_group on types(marketGroupID, typeName)",
+    "create index activities_by_type on activities(typeID, activityID, time)",
+)
+
+# Per-connection tables with typeIDs/typeNames of the current lookup
+SIDECAR_TEMP_TABLES = """
+    create temp table step (position integer, typeID integer);
+    create temp table names (position integer, typeName text);
+    """
+
+RECIPES_Q = """
+    select
+        s.position, p.activityID, p.quantity
+    from
+        temp.step s join products p
+    on
+        p.productTypeID = s.typeID
+    """
+
+EXPAND_Q = """
+    select
+        s.position, m.materialTypeID, m.quantity
+    from
+        temp.step s
+        join products p on p.productTypeID = s.typeID
+        join materials m on m.typeID = p.typeID
+    order by
+        s.position
+    """
+
+TYPE_NAMES_Q = """
+    select
+        s.position, t.typeName
+    from
+        temp.step s join types t
+    on
+        t.typeID = s.typeID
+    """
+
+BASE_TIMES_Q = """
+    select
+        s.position, a.time
+    from
+        temp.step s
+        join products p on p.productTypeID = s.typeID
+        join activities a on a.typeID = p.typeID and a.activityID = p.activityID
+    """
+
+TYPE_IDS_Q = """
+    select
+        n.position, min(t.typeID)
+    from
+        temp.names n join types t
+    on
+        t.typeName = n.typeName
+    group by
+        n.position
+    """
+
+PRODUCTABLE_Q = """
+    select
+        p.productTypeID, t.typeName
+    from
+        products p join types t
+    on
+        t.typeID = p.productTypeID
+    """
+
+
+class SqlRecipeGraph:
+    """Recipe lookups pushed down to SQLite.
+
+    Has the same lookup interface as RecipeGraph, but fetches only the rows
+    for the requested typeIDs.
+    """
+
+    def __init__(self, data_export: "SqliteDataExport"):
+        self.data_export = data_export
+
+    def recipes(self, type_ids) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Returns:
+            Pair of arrays aligned with type_ids: activityID and output
+            quantity of the recipe(0 and 1 for non-productable items).
+        """
+        rows = self.data_export.fetch_for_ids(RECIPES_Q, type_ids)
+        activity = np.zeros(len(type_ids), dtype="int64")
+        output_quantity = np.ones(len(type_ids), dtype="int64")
+        if rows:
+            positions, activities, quantities = np.array(rows, dtype="int64").T
+            activity[positions] = activities
+            output_quantity[positions] = quantities
+        return activity, output_quantity
+
+    def is_productable(self, type_ids) -> np.ndarray:
+        activity, _ = self.recipes(type_ids)
+        return activity != 0
+
+    def expand(self, type_ids) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Gather recipe inputs for typeIDs.
+
+        Returns:
+            Triple of arrays with one item per input: position of the parent
+            in type_ids, materialTypeID and quantity per run.
+        """
+        rows = self.data_export.fetch_for_ids(EXPAND_Q, type_ids)
+        if not rows:
+            empty = np.array([], dtype="int64")
+            return empty, empty.copy(), empty.copy()
+        parents, material_ids, quantities = np.array(rows, dtype="int64").T
+        return parents, material_ids, quantities
+
+
+class SqliteDataExport(StaticDataExport):
+    """DataExport which pushes product/material/type joins down into SQLite.
+
+    Projected tables and covering indexes live in a sidecar database next to
+    the SDE, which itself is never modified. Only the rows required by the
+    current step are fetched, so memory usage does not depend on SDE size.
+    Full tables are still available as properties, but loaded only on
+    demand. Lookup queries have constant text, so they are compiled once
+    and reused from the statement cache of the connection.
+    """
+
+    def __init__(
+        self, db_path=PATH / DB_NAME, decompress_workers=None, cache_budget=None
+    ):
+        super().__init__(
+            db_path,
+            use_snapshot=False,
+            decompress_workers=decompress_workers,
+            cache_budget=cache_budget,
+        )
+        self.sidecar_path = self.db_path.with_name(self.db_path.name + SIDECAR_SUFFIX)
+        self.sidecar_pool = ConnectionPool(
+            self.sidecar_path, init_script=SIDECAR_TEMP_TABLES
+        )
+        self._sidecar_lock = threading.Lock()
+        self._sidecar_source = None
+
+    def build_sidecar(self):
+        tmp = self.sidecar_path.with_name(
+            f"{self.sidecar_path.name}.tmp-{os.getpid()}-{threading.get_ident()}"
+        )
+        if tmp.exists():
+            tmp.unlink()
+        conn = sqlite3.connect(str(tmp))
+        try:
+            conn.execute("attach database ? as sde", (str(self.db_path),))
+            for name, query in TABLE_QUERIES.items():
+                conn.execute(f"create table main.{name} as {query}")
+            for index in SIDECAR_INDEXES:
+                conn.execute(index)
+            conn.execute("create table main.meta (source text)")
+            conn.execute(
+                "insert into main.meta values (?)",
+                (json.dumps(self._sidecar_meta()),),
+            )
+            conn.commit()
+            conn.execute("detach database sde")
+            conn.execute("analyze")
+        finally:
+            conn.close()
+        os.replace(tmp, self.sidecar_path)
+
+    def _sidecar_is_fresh(self) -> bool:
+        if not self.sidecar_path.exists():
+            return False
+        conn = sqlite3.connect(str(self.sidecar_path))
+        try:
+            (source,) = conn.execute("select source from meta").fetchone()
+        except sqlite3.Error:
+            return False
+        finally:
+            conn.close()
+        return json.loads(source) == self._sidecar_meta()
+
+    def _sidecar_meta(self) -> dict:
+        return {"format": SIDECAR_FORMAT, **source_fingerprint(self.db_path)}
+
+    @contextmanager
+    def sidecar(self) -> Iterator[sqlite3.Connection]:
+        """Check out connection to sidecar database for the current thread.
+
+        Sidecar is (re)built if SDE has changed.
+        """
+        source = source_fingerprint(self.db_path)
+        if self._sidecar_source != source:
+            with self._sidecar_lock:
+                if self._sidecar_source != source:
+                    if not self._sidecar_is_fresh():
+                        self.build_sidecar()
+                    self._sidecar_source = source
+        with self.sidecar_pool.connection() as conn:
+            yield conn
+
+    def fetch_for_ids(self, query: str, type_ids) -> List[tuple]:
+        """Run query joined with temp.step table filled with type_ids."""
+        with self.sidecar() as conn, conn:
+            conn.execute("delete from temp.step")
+            conn.executemany(
+                "insert into temp.step values (?, ?)",
+                enumerate(np.asarray(type_ids, dtype="int64").tolist()),
+            )
+            return conn.execute(query).fetchall()
+
+    @property
+    def recipe_graph(self) -> SqlRecipeGraph:
+        return SqlRecipeGraph(self)
+
+    def type_names(self, type_ids) -> np.ndarray:
+        names = np.full(len(type_ids), None, dtype=object)
+        for position, name in self.fetch_for_ids(TYPE_NAMES_Q, type_ids):
+            names[position] = name
+        return names
+
+    def base_times(self, type_ids) -> np.ndarray:
+        times = np.zeros(len(type_ids), dtype="int64")
+        for position, time in self.fetch_for_ids(BASE_TIMES_Q, type_ids):
+            times[position] = time
+        return times
+
+    def type_ids(self, type_names) -> np.ndarray:
+        type_names = list(type_names)
+        type_ids = np.full(len(type_names), -1, dtype="int64")
+        with self.sidecar() as conn, conn:
+            conn.execute("delete from temp.names")
+            conn.executemany(
+                "insert into temp.names values (?, ?)", enumerate(type_names)
+            )
+            for position, type_id in conn.execute(TYPE_IDS_Q):
+                type_ids[position] = type_id
+        return type_ids
+
+    def _get_types_by_group_ids(self, *group_ids) -> List[str]:
+        placeholders = ", ".join("?" for _ in group_ids)
+        with self.sidecar() as conn:
+            rows = conn.execute(
+                f"select typeName from types where marketGroupID in ({placeholders})",
+                group_ids,
+            ).fetchall()
+        return [name for (name,) in rows]
+
+    @cached_property
+    def name_index(self) -> NameIndex:
+        with self.sidecar() as conn:
+            rows = conn.execute("select typeName, typeID from types").fetchall()
+        return NameIndex(*zip(*rows)) if rows else NameIndex([], [])
+
+    @cached_property
+    def productable_type_names(self) -> pd.Series:
+        with self.sidecar() as conn:
+            table = pd.read_sql_query(PRODUCTABLE_Q, conn)
+        return table.set_index("productTypeID")["typeName"]
+
+    def _read_table(self, name: str) -> pd.DataFrame:
+        with self.sidecar() as conn:
+            return pd.read_sql_query(f"select * from {name}", conn)
@@ -1,25 +1,133 @@
-import bz2
-import sqlite3
+import os
+import shutil
+import threading
+import uuid
 from abc import ABC, abstractproperty
-from functools import cache
 from pathlib import Path
-from typing import List
+from typing import Callable, List, Optional, Set
 
+import numpy as np
 import pandas as pd
-import requests
 
+from fetchlib.cache import CacheOwnerMixin, cached_property
+from fetchlib.connection_pool import ConnectionPool
+from fetchlib.download import download_and_decompress, fetch_md5, get_human_size
+from fetchlib.name_index import NameIndex
+from fetchlib.recipe_graph import RecipeGraph
+from fetchlib.sde_version import (
+    MANIFEST_SUFFIX,
+    VersionManifest,
+    remote_version,
+    table_hashes,
+)
+from fetchlib.snapshot import Snapshot
 from fetchlib.utils import CLASSES_GROUPS, PATH, ProductionClass
 
 DB_NAME = "eve.db"
 OUTPUT_FILENAME = "eve.db.bz2file"
 URL = "https://www.fuzzwork.co.uk/dump/sqlite-latest.sqlite.bz2"
+RECIPE_GRAPH_DIR = "recipe_graph"
+
+# Derived artifacts(cache entries and their on-disk copies) with the
+# tables they are built from
+DERIVED_ARTIFACTS = {
+    RECIPE_GRAPH_DIR: {"products", "materials"},
+    "productable_type_names": {"types", "products"},
+    "types_by_id": {"types"},
+    "types_by_name": {"types"},
+    "type_positions": {"types"},
+    "products_by_product": {"products"},
+    "materials_by_type": {"materials"},
+    "name_index": {"types"},
+    "recipe_times": {"products", "activities"},
+    "productable_name_index": {"types", "products"},
+    "class_contents": {"types"},
+    "efficiency_arrays": {"types"},
+    "bill_of_materials": {"products", "materials", "types"},
+    "non_productable_ids": {"types"},
+}
+
+# Only the columns used by fetchlib are loaded
+TABLE_QUERIES = {
+    "activities": """
+        select
+            a.typeID, activityID, time
+        from
+            industryActivity a join invTypes t
+        on
+            a.typeID = t.typeID
+        where
+            t.published and
+            a.activityID in (1,11)
+        """,
+    "products": """
+        select
+            p.typeID as typeID, activityID, productTypeID, quantity
+        from
+            industryActivityProducts p join invTypes t
+        on p.typeID == t.typeID
+        where
+            t.published and
+            p.activityID in (1,11)
+        """,
+    "types": """
+        select
+            typeID, groupID, typeName, marketGroupID
+        from
+            invTypes
+        """,
+    "materials": """
+        select
+            typeID, activityID, materialTypeID, quantity
+        from
+            industryActivityMaterials
+        where activityID in (1,11)
+        """,
+    "market_groups": """
+        select
+            marketGroupID, parentGroupID, marketGroupName,
+            description, iconID, hasTypes
+        from
+            invMarketGroups
+        """,
+}
+
+
+def dense_positions(ids) -> np.ndarray:
+    """
+    Returns:
+        Array indexed by id with position of the first row having that id,
+        -1 for missing ids.
+    """
+    ids = np.asarray(ids, dtype="int64")
+    size = int(ids.max()) + 1 if ids.size else 0
+    positions = np.full(size, -1, dtype="int64")
+    # Reversed assignment leaves the first occurrence of duplicated ids
+    positions[ids[::-1]] = np.arange(ids.shape[0] - 1, -1, -1)
+    return positions
+
 
+def lookup_positions(positions: np.ndarray, ids) -> np.ndarray:
+    """Vectorized lookup in dense_positions array, -1 for unknown ids."""
+    ids = np.asarray(ids, dtype="int64")
+    known = (ids >= 0) & (ids < positions.shape[0])
+    result = np.full(ids.shape, -1, dtype="int64")
+    result[known] = positions[ids[known]]
+    return result
 
-class AbstractDataExport(ABC):
+
+class AbstractDataExport(CacheOwnerMixin, ABC):
     """DataExport is defined by 5 pandas tables tables(abstractproperty).
     Instance is used in during Decompositor application and Setup creation.
+
+    Tables and data derived from them are kept in per-instance cache(see
+    fetchlib.cache), which is dropped when version changes.
     """
 
+    def __init__(self):
+        # Unique for the lifetime of the process, unlike id() of instance
+        self._instance_version = f"{type(self).__name__}-{uuid.uuid4().hex}"
+
     @abstractproperty
     def products(self):
         raise NotImplementedError
@@ -40,6 +148,11 @@ class AbstractDataExport(ABC):
     def market_groups(self):
         raise NotImplementedError
 
+    @property
+    def version(self) -> str:
+        """Identifier of the data version, derived data is tied to it."""
+        return self._instance_version
+
     def append_type_id(self, collection: pd.DataFrame) -> pd.DataFrame:
         """
         Args:
@@ -48,29 +161,27 @@ class AbstractDataExport(ABC):
             Dataframe with 'typeName' and 'typeID' columns.
         """
         result = collection.join(
-            self.types.set_index("typeName"),
+            self.types_by_name,
         )[["typeID", "run", "me_impact", "te_impact"]]
         return result.reset_index(names="typeName")
 
     def append_products(self, step: pd.DataFrame) -> pd.DataFrame:
         result = step.set_index("typeID").join(
-            self.products.set_index("productTypeID"),
+            self.products_by_product,
             rsuffix="_product",
             how="inner",
         )
         return result
 
     def append_materials(self, table: pd.DataFrame) -> pd.DataFrame:
-        filtrated = self.materials.set_index("typeID")
         result = table.set_index("typeID").join(
-            filtrated, how="inner", rsuffix="_materials"
+            self.materials_by_type, how="inner", rsuffix="_materials"
         )
         return result
 
     def append_prices(self, step: pd.DataFrame) -> pd.DataFrame:
-        types = self.types.set_index("typeID")
         result = step.set_index("materialTypeID").join(
-            types, how="inner", rsuffix="_prices"
+            self.types_by_id, how="inner", rsuffix="_prices"
         )
         return result
 
@@ -80,69 +191,168 @@ class AbstractDataExport(ABC):
         with_prices = self.append_prices(with_materials)
         return with_prices
 
-    def pretify_step(self, table: pd.DataFrame):
-        """Helper for fancyfing step."""
-
-        step = self.append_products(table)[["typeID", "quantity", "activityID"]]
-
-        # Reseting typeID to coresponds item, not item's blueprint
-
-        step["typeID"] = step.index
+    @cached_property
+    def types_by_id(self) -> pd.DataFrame:
+        """Types indexed by typeID."""
+        return self.types.set_index("typeID")
+
+    @cached_property
+    def types_by_name(self) -> pd.DataFrame:
+        """Types indexed by unique typeName, the first row wins."""
+        return self.types.drop_duplicates("typeName").set_index("typeName")
+
+    @cached_property
+    def type_positions(self) -> np.ndarray:
+        """Dense typeID -> row of types array."""
+        return dense_positions(self.types["typeID"])
+
+    @cached_property
+    def products_by_product(self) -> pd.DataFrame:
+        """Products indexed by productTypeID."""
+        return self.products.set_index("productTypeID")
+
+    @cached_property
+    def materials_by_type(self) -> pd.DataFrame:
+        """Materials indexed by blueprint typeID."""
+        return self.materials.set_index("typeID")
+
+    @cached_property
+    def name_index(self) -> NameIndex:
+        """Index of all typeNames."""
+        return NameIndex.from_types(self.types)
+
+    @cached_property
+    def productable_name_index(self) -> NameIndex:
+        """Index of typeNames which could be producted in game."""
+        names = self.productable_type_names
+        return NameIndex(names.values, names.index)
+
+    @cached_property
+    def recipe_graph(self) -> RecipeGraph:
+        """
+        Returns:
+            Recipe graph compiled from products and materials.
+        """
+        return RecipeGraph.from_data_export(self)
 
-        types = self.types.set_index("typeID")
-        step = self.append_products(step).join(types)
-        step["runs_required"] = step["quantity"] / step["quantity_product"]
+    def type_names(self, type_ids) -> np.ndarray:
+        """
+        Returns:
+            Array of typeNames corresponding to type_ids.
+        """
+        positions = lookup_positions(self.type_positions, type_ids)
+        names = self.types["typeName"].to_numpy(dtype=object)[positions]
+        names[positions < 0] = np.nan
+        return names
 
-        # Reseting typeID to coresponds item, not item's blueprint
+    def type_ids(self, type_names) -> np.ndarray:
+        """
+        Returns:
+            Array of typeIDs corresponding to type_names, -1 for unknown names.
+        """
+        types = self.types_by_name
+        positions = types.index.get_indexer(list(type_names))
+        type_ids = types["typeID"].to_numpy(dtype="int64")[positions]
+        type_ids[positions < 0] = -1
+        return type_ids
+
+    @cached_property
+    def recipe_times(self) -> np.ndarray:
+        """Dense productTypeID -> base time(seconds per run) of its recipe."""
+        recipes = self.products.merge(self.activities, on=["typeID", "activityID"])
+        product_ids = recipes["productTypeID"].to_numpy(dtype="int64")
+        size = int(product_ids.max()) + 1 if product_ids.size else 0
+        times = np.zeros(size, dtype="int64")
+        times[product_ids] = recipes["time"].to_numpy(dtype="int64")
+        return times
+
+    def base_times(self, type_ids) -> np.ndarray:
+        """
+        Returns:
+            Array of base times(seconds per run) of recipes producing
+            type_ids, 0 for non-productable items.
+        """
+        type_ids = np.asarray(type_ids, dtype="int64")
+        times = self.recipe_times
+        known = (type_ids >= 0) & (type_ids < times.shape[0])
+        result = np.zeros(type_ids.shape, dtype="int64")
+        result[known] = times[type_ids[known]]
+        return result
 
-        step["typeID"] = step.index
+    def pretify_step(self, table: pd.DataFrame):
+        """Helper for fancyfing step.
 
-        return step[["typeName", "quantity", "runs_required", "activityID", "typeID"]]
+        Non-productable items are dropped from the step.
+        """
+        graph = self.recipe_graph
+        type_ids = table["typeID"].to_numpy(dtype="int64")
+        productable = graph.is_productable(type_ids)
+        type_ids = type_ids[productable]
+        quantity = table["quantity"].to_numpy()[productable]
+        activity, output_quantity = graph.recipes(type_ids)
+
+        return pd.DataFrame(
+            {
+                "typeName": self.type_names(type_ids),
+                "quantity": quantity,
+                "runs_required": quantity / output_quantity,
+                "activityID": activity,
+                "typeID": type_ids,
+            },
+            index=type_ids,
+        )
 
     def atomic_materials(self, atomic: pd.DataFrame) -> pd.DataFrame:
         """Helper for fancyfing atomic."""
-        types = self.types
-        materials = (
-            atomic[["typeID", "quantity"]]
-            .astype({"typeID": "int64"})
-            .groupby("typeID")
-            .sum()
+        type_ids, inverse = np.unique(
+            atomic["typeID"].to_numpy(dtype="int64"), return_inverse=True
+        )
+        quantity = np.zeros(type_ids.shape[0], dtype="int64")
+        np.add.at(quantity, inverse, atomic["quantity"].to_numpy(dtype="int64"))
+        return pd.DataFrame(
+            {
+                "typeID": type_ids,
+                "typeName": self.type_names(type_ids),
+                "quantity": quantity,
+            }
         )
-        materials = materials.join(types.set_index("typeID"), lsuffix="-atom_")[
-            ["typeName", "quantity"]
-        ].astype({"quantity": "int64"})
-        return materials.reset_index()
 
     def create_init_table(self, **kwargs) -> pd.DataFrame:
         """Method to create initial Pandas dataframe.
 
+        Names are matched ignoring case, quantities of the same item are
+        summed up.
+
         Args:
             kwargs: Dict[str, int] - dictionary of items to produce with corresponding quantities.
+        Raises:
+            UnknownTypeNames(ValueError) - with suggestions for unknown names
         """
-        init = pd.DataFrame(kwargs.items(), columns=["typeName", "quantity"]).set_index(
-            "typeName"
-        )
-        types = self.types.set_index("typeName")
-        with_types = init.join(types)[["typeID", "quantity"]]
-        if diff := set(kwargs.keys()) - set(with_types.index):
-            raise ValueError(f"No such products in database: {diff}")
-        prety = self.pretify_step(with_types)
+        resolution = self.name_index.resolve_many(kwargs.keys())
+        resolution.raise_for_unknown()
+        quantity = pd.Series(list(kwargs.values()), dtype="int64")
+        quantity = quantity.groupby(resolution.type_ids, sort=False).sum()
+        init = pd.DataFrame({"typeID": quantity.index, "quantity": quantity.values})
+        prety = self.pretify_step(init)
         return prety
 
-    def get_class_contents(self, production_class: str) -> pd.DataFrame:
+    def get_class_contents(self, production_class: str) -> List[str]:
         """
         Returns:
             List of typeNames which belongs to production_class
         """
         group_ids = list(CLASSES_GROUPS[production_class].values())
-        return self._get_types_by_group_ids(*group_ids)
+        contents = self.cache.get(
+            ("class_contents", production_class),
+            lambda: self._get_types_by_group_ids(*group_ids),
+        )
+        return list(contents)
 
     def _get_types_by_group_ids(self, *group_ids) -> List[str]:
         res = list(self.types[self.types["marketGroupID"].isin(group_ids)]["typeName"])
         return res
 
-    @property
-    @cache
+    @cached_property
     def productable_type_names(self) -> pd.Series:
         """
         Returns:
@@ -157,128 +367,220 @@ class StaticDataExport(AbstractDataExport):
     Used in production code
     """
 
-    def __init__(self, db_path=PATH / DB_NAME):
-        self.db_path = db_path
+    def __init__(
+        self,
+        db_path=PATH / DB_NAME,
+        use_snapshot=True,
+        decompress_workers=None,
+        cache_budget=None,
+    ):
+        """
+        Args:
+            db_path - path to the sqlite3 database
+            use_snapshot - read tables from columnar snapshot instead of sqlite3
+            decompress_workers - amount of processes for block-parallel
+                decompression of downloaded database, None means
+                decompression on the fly
+            cache_budget - max size of cached tables in bytes, None for
+                unlimited
+        """
+        super().__init__()
+        self.cache_budget = cache_budget
+        self.db_path = Path(db_path)
+        self.decompress_workers = decompress_workers
         if not (self.db_path).exists():
             self.__download_db()
-            self.__bunzip2()
-        self.conn = sqlite3.connect(str(self.db_path))
+        self.pool = ConnectionPool(self.db_path)
+        self._lock = threading.RLock()
+        self.use_snapshot = use_snapshot
+        self._snapshot = Snapshot(self.db_path, TABLE_QUERIES)
+        self._manifest = None
 
     def __download_db(self):
-        res = requests.get(URL, stream=True)
-        PATH.mkdir(parents=True, exist_ok=True)
-        output = PATH / OUTPUT_FILENAME
-        if res.status_code != 200:
-            print("Cannot download the file.")
-            print(res.content)
-        try:
-            total_size = 0
-            with open(output, "wb") as handle:
-                for data in res.iter_content(1024 * 1024 * 10):
-                    print(
-                        "\rDownloading file ... [%s]             "
-                        % (get_human_size(total_size)),
-                        end="Path: {}".format(output),
-                    )
-                    handle.write(data)
-                    total_size += len(data)
-
-        except Exception as err:
-            print("\rDownloading file ... [FAILED]             ")
-            print(str(err))
-            return False
-        print("\rDownloading file: {}  [SUCCESS]             ".format(output))
-        return True
-
-    def __bunzip2(self):
-        source_file = Path(PATH, OUTPUT_FILENAME)
-        dest_file = self.db_path
-        try:
-            print("Decompressing file ... ", end="")
-            with open(source_file, "rb") as bz2file:
-                with open(dest_file, "wb") as unzipped_file:
-                    decompressor = bz2.BZ2Decompressor()
-                    for data in iter(lambda: bz2file.read(100 * 1024), b""):
-                        unzipped_file.write(decompressor.decompress(data))
-        except Exception as e:
-            print(str(e))
-
-        print(
-            "Succesfully finished decompression: source: {},  dest: {}".format(
-                source_file, dest_file
-            )
+        remote = remote_version(URL)
+        download_and_decompress(
+            URL,
+            self.db_path,
+            archive=self.db_path.with_name(OUTPUT_FILENAME),
+            md5=fetch_md5(URL),
+            workers=self.decompress_workers,
         )
+        VersionManifest(**remote).save(self.manifest_path)
 
     @property
-    @cache
-    def activities(self):
-        activities_q = """
-            select
-                a.typeID, activityID, time
-            from
-                industryActivity a join invTypes t
-            on
-                a.typeID = t.typeID
-            where
-                t.published and
-                a.activityID in (1,11)
-            """
-
-        table = pd.read_sql_query(activities_q, self.conn)
-        return table
+    def manifest_path(self) -> Path:
+        return self.db_path.with_name(self.db_path.name + MANIFEST_SUFFIX)
 
     @property
-    @cache
-    def products(self):
-        products_q = """
-            select
-                p.typeID as typeID, activityID, productTypeID, quantity
-            from
-                industryActivityProducts p join invTypes t
-            on p.typeID == t.typeID
-            where
-                t.published and
-                p.activityID in (1,11)
-            """
-        table = pd.read_sql_query(products_q, self.conn)
-        return table
+    def manifest(self) -> VersionManifest:
+        """Version manifest of installed database.
+        Table hashes are computed once if they are missing."""
+        if self._manifest is None:
+            with self._lock:
+                if self._manifest is None:
+                    manifest = VersionManifest.load(self.manifest_path)
+                    if set(manifest.tables) != set(TABLE_QUERIES):
+                        with self.pool.connection() as conn:
+                            manifest.tables = table_hashes(conn, TABLE_QUERIES)
+                        manifest.save(self.manifest_path)
+                    self._manifest = manifest
+        return self._manifest
 
     @property
-    @cache
-    def types(self):
-        types_q = """select  * from  invTypes """
-        table = pd.read_sql_query(types_q, self.conn)
-        return table
+    def version(self) -> str:
+        return self.manifest.version
+
+    def check_for_update(self) -> bool:
+        """Cheap check(HEAD request) if a newer SDE is published."""
+        return self.manifest.is_outdated(remote_version(URL))
+
+    def refresh(self, force=False) -> Set[str]:
+        """Download new SDE if it is published.
+
+        Only derived artifacts(snapshot tables, recipe graph, cached
+        properties) built from changed tables are rebuilt.
+
+        Args:
+            force - download SDE even if it seems to be up to date
+        Returns:
+            Names of changed tables.
+        """
+        previous = self.manifest
+        if not force and not self.check_for_update():
+            return set()
+
+        self.__download_db()
+        self.pool.close()
+
+        manifest = VersionManifest.load(self.manifest_path)
+        with self.pool.connection() as conn:
+            manifest.tables = table_hashes(conn, TABLE_QUERIES)
+        changed = previous.changed_tables(manifest.tables)
+        self._rebuild(changed, manifest.version)
+        manifest.save(self.manifest_path)
+        self._manifest = manifest
+        return changed
+
+    def _rebuild(self, changed: Set[str], version: str):
+        outdated = {
+            name for name, sources in DERIVED_ARTIFACTS.items() if sources & changed
+        }
+        if self.use_snapshot:
+            with self.pool.connection() as conn:
+                self._snapshot.compile(
+                    conn, tables=changed, keep=set(DERIVED_ARTIFACTS) - outdated
+                )
+        # Entries built from unchanged tables are carried over to new version
+        self.cache.invalidate(changed | outdated, version=version)
 
     @property
-    @cache
+    def snapshot(self) -> Snapshot:
+        """Columnar snapshot of TABLE_QUERIES, compiled on first use and
+        recompiled automatically when the source database changes."""
+        if not self._snapshot.is_fresh():
+            with self._lock:
+                if not self._snapshot.is_fresh():
+                    self.compile_snapshot()
+        return self._snapshot
+
+    def compile_snapshot(self):
+        with self._lock, self.pool.connection() as conn:
+            self._snapshot.compile(conn)
+
+    def _read_table(self, name: str) -> pd.DataFrame:
+        if self.use_snapshot:
+            return self.snapshot.load(name)
+        with self.pool.connection() as conn:
+            return pd.read_sql_query(TABLE_QUERIES[name], conn)
+
+    @cached_property
+    def recipe_graph(self) -> RecipeGraph:
+        """Recipe graph persisted inside the snapshot directory.
+
+        Compiling the snapshot drops the graph, so it is rebuilt once per
+        version of the database.
+        """
+        if not self.use_snapshot:
+            return super().recipe_graph
+        directory = self.snapshot.directory / RECIPE_GRAPH_DIR
+        try:
+            return RecipeGraph.load(directory)
+        except (OSError, ValueError):
+            pass
+        graph = RecipeGraph.from_data_export(self)
+        tmp = directory.with_name(
+            f"{directory.name}.tmp-{os.getpid()}-{threading.get_ident()}"
+        )
+        shutil.rmtree(tmp, ignore_errors=True)
+        graph.save(tmp)
+        shutil.rmtree(directory, ignore_errors=True)
+        os.replace(tmp, directory)
+        return graph
+
+    @cached_property
+    def activities(self):
+        return self._read_table("activities")
+
+    @cached_property
+    def products(self):
+        return self._read_table("products")
+
+    @cached_property
+    def types(self):
+        return self._read_table("types")
+
+    @cached_property
     def materials(self):
-        materials_q = """
-            select *
-            from
-                industryActivityMaterials
-            where activityID in (1,11)
-            """
+        return self._read_table("materials")
+
+    @cached_property
+    def market_groups(self):
+        return self._read_table("market_groups")
+
+
+class LazyDataExport:
+    """Thread-safe proxy which creates data export on the first real use.
+
+    Allows to import fetchlib without opening(or downloading) the database.
+    """
 
-        table = pd.read_sql_query(materials_q, self.conn)
-        return table
+    def __init__(self, factory: Callable[[], AbstractDataExport]):
+        """
+        Args:
+            factory - callable creating data export
+        """
+        self._factory = factory
+        self._instance = None
+        self._lock = threading.Lock()
 
     @property
-    @cache
-    def market_groups(self):
-        marketgroups_q = """select * from invMarketGroups"""
-        table = pd.read_sql_query(marketgroups_q, self.conn)
-        return table
+    def is_loaded(self) -> bool:
+        return self._instance is not None
+
+    def get(self) -> AbstractDataExport:
+        """
+        Returns:
+            Underlying data export, created if needed.
+        """
+        if self._instance is None:
+            with self._lock:
+                if self._instance is None:
+                    self._instance = self._factory()
+        return self._instance
+
+    def inject(self, data_export: Optional[AbstractDataExport]):
+        """Replace underlying data export. None resets proxy to the factory."""
+        with self._lock:
+            self._instance = data_export
 
+    def __getattr__(self, name):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return getattr(self.get(), name)
 
-def get_human_size(size, precision=2):
-    """Display size in human readable str"""
-    suffixes = ["B", "KB", "MB", "GB", "TB"]
-    suffixIndex = 0
-    while size > 1024 and suffixIndex < 4:
-        suffixIndex += 1  # increment the index of the suffix
-        size = size / 1024.0  # apply the division
-    return "%.*f%s" % (precision, size, suffixes[suffixIndex])
+    def __repr__(self):
+        state = repr(self._instance) if self.is_loaded else "not loaded"
+        return f"LazyDataExport({state})"
 
 
-sde = StaticDataExport()
+sde = LazyDataExport(StaticDataExport)
@@ -0,0 +1,290 @@
+"""Production time estimation of Decomposition.
+
+Every item of every step is a node of the production DAG: item of step
+`level`(steps are counted from the final product) consumes productable
+items of the nearest deeper step holding them, that is `level + 1` for
+steps grouped by depth and any deeper step for topological levels. For
+every node:
+
+    job_duration = base time * runs per job * te_impact
+    work         = base time * runs * te_impact
+    duration     = base time * ceil(runs / lines) * te_impact
+
+where duration is the time of the node when its runs are spread over all
+lines of its activity. Wall time of a step is estimated as the maximum of
+its work divided by lines and the longest node duration, production and
+reaction lines run in parallel.
+"""
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from fetchlib.decomposition import Decomposition
+from fetchlib.engine import ArrayDecomposition, TopologicalDecomposition
+
+PRODUCTION, REACTION = 1, 11
+
+
+def format_duration(seconds: float) -> str:
+    seconds = int(np.ceil(seconds))
+    days, seconds = divmod(seconds, 86400)
+    hours, seconds = divmod(seconds, 3600)
+    minutes, seconds = divmod(seconds, 60)
+    clock = f"{hours:02d}:{minutes:02d}:{seconds:02d}"
+    return f"{days}d {clock}" if days else clock
+
+
+@dataclass
+class ProductionTime:
+    """
+    Attributes:
+        jobs - one row per node: level, typeID, typeName, activityID, runs,
+            jobs, job_duration, work, duration, finish(earliest finish time
+            if every node starts right after its inputs)
+        steps - one row per step(level): production, reaction and wall_time
+        critical_path - nodes of the longest chain of dependent nodes from
+            raw materials to the final product with start and finish times
+    """
+
+    jobs: pd.DataFrame
+    steps: pd.DataFrame
+    critical_path: pd.DataFrame
+
+    @property
+    def total_wall_time(self) -> float:
+        """Time of step by step production."""
+        return float(self.steps["wall_time"].sum())
+
+    @property
+    def critical_path_time(self) -> float:
+        """Lower bound of production time with unlimited lines."""
+        if self.critical_path.empty:
+            return 0.0
+        return float(self.critical_path["finish"].iloc[-1])
+
+    def __str__(self):
+        result = ["Production time:"]
+        for level, row in self.steps.iloc[::-1].iterrows():
+            result.append(
+                f"Step {self.steps.shape[0] - level}: "
+                f"{format_duration(row['wall_time'])}"
+            )
+        result.append(f"Step by step: {format_duration(self.total_wall_time)}")
+        result.append(f"Critical path: {format_duration(self.critical_path_time)}")
+        for _, row in self.critical_path.iterrows():
+            result.append(
+                f"  {row['typeName']}: {format_duration(row['start'])} - "
+                f"{format_duration(row['finish'])}"
+            )
+        return "\n".join(result)
+
+
+def _nodes(steps: List[pd.DataFrame]) -> pd.DataFrame:
+    """Concatenate steps into a single table with level column."""
+    levels = len(steps)
+    tables = [
+        step[["typeID", "typeName", "quantity", "runs_required", "activityID"]]
+        .reset_index(drop=True)
+        .assign(level=levels - 1 - i)
+        for i, step in enumerate(steps)
+    ]
+    return pd.concat(tables, ignore_index=True)
+
+
+def estimate_time(
+    decomposition: Decomposition, lines: Optional[Dict[int, int]] = None
+) -> ProductionTime:
+    """Estimate production time of decomposition.
+
+    Args:
+        lines - amount of lines per activityID, lines of setup by default
+    """
+    decompositor = decomposition.decompositor
+    data_export, setup = decompositor.data_export, decompositor.setup
+    if lines is None:
+        lines = {
+            PRODUCTION: setup.production_lines,
+            REACTION: setup.reaction_lines,
+        }
+
+    nodes = _nodes(decomposition.steps)
+    type_ids = nodes["typeID"].to_numpy(dtype="int64")
+    activity = nodes["activityID"].to_numpy(dtype="int64")
+    base_time = data_export.base_times(type_ids).astype("float64")
+    te_impact = decompositor.time_efficiency(type_ids)
+    activity_lines = np.array([lines.get(a, 1) for a in activity], dtype="int64")
+    activity_lines = np.maximum(activity_lines, 1)
+
+    runs, runs_per_job, job_count = _job_counts(nodes, decompositor)
+    run_time = base_time * te_impact
+    jobs = nodes.assign(
+        runs=runs,
+        jobs=job_count,
+        job_duration=run_time * np.minimum(runs, runs_per_job),
+        work=run_time * runs,
+        duration=run_time * -(-runs // activity_lines),
+        lines=activity_lines,
+    )
+
+    steps = _step_wall_times(jobs)
+    finish, predecessor = _earliest_finish(jobs, data_export.recipe_graph)
+    jobs["finish"] = finish
+    critical_path = _critical_path(jobs, predecessor)
+    return ProductionTime(
+        jobs=jobs.drop(columns=["lines", "runs_required"]),
+        steps=steps,
+        critical_path=critical_path,
+    )
+
+
+def _job_counts(nodes: pd.DataFrame, decompositor):
+    """
+    Returns:
+        Arrays aligned with nodes: runs, runs per job and jobs.
+    """
+    _, max_runs = decompositor.efficiency(nodes["typeID"].to_numpy(dtype="int64"))
+    runs = np.ceil(nodes["runs_required"].to_numpy(dtype="float64"))
+    runs = np.maximum(runs, 0).astype("int64")
+    runs_per_job = np.maximum(np.minimum(runs, max_runs.astype("int64")), 1)
+    return runs, runs_per_job, -(-runs // runs_per_job)
+
+
+def _step_wall_times(jobs: pd.DataFrame) -> pd.DataFrame:
+    grouped = jobs.groupby(["level", "activityID"])
+    per_activity = pd.DataFrame(
+        {
+            "balanced": grouped["work"].sum() / grouped["lines"].first(),
+            "longest": grouped["duration"].max(),
+        }
+    ).max(axis=1)
+    table = per_activity.unstack("activityID").reindex(
+        columns=[PRODUCTION, REACTION], fill_value=0.0
+    )
+    table = table.fillna(0.0).rename(
+        columns={PRODUCTION: "production", REACTION: "reaction"}
+    )
+    table.columns.name = None
+    table["wall_time"] = table.max(axis=1)
+    return table.sort_index()
+
+
+def _inputs(nodes: pd.DataFrame, graph):
+    """Edges from nodes to nodes producing their inputs.
+
+    Input of a node is produced by the node of the material at the nearest
+    deeper level: the next level for steps grouped by depth, the only node
+    of the material for topological levels.
+    Returns:
+        Pair of arrays: row of consumer and row of input of every edge.
+    """
+    type_ids = nodes["typeID"].to_numpy(dtype="int64")
+    levels = nodes["level"].to_numpy(dtype="int64")
+    parents, material_ids, _ = graph.expand(type_ids)
+
+    stride = int(levels.max()) + 2 if levels.size else 1
+    keys = type_ids * stride + levels
+    order = np.argsort(keys, kind="stable")
+    keys = keys[order]
+    position = np.searchsorted(keys, material_ids * stride + levels[parents] + 1)
+    position = np.minimum(position, keys.shape[0] - 1)
+    found = keys[position] // stride == material_ids
+    return parents[found], order[position[found]]
+
+
+def _earliest_finish(jobs: pd.DataFrame, graph):
+    """Longest path through the DAG, one vectorized pass per level.
+
+    Returns:
+        Pair of arrays aligned with jobs: earliest finish time and row of
+        the input which finishes last(-1 if there is no productable input).
+    """
+    finish = np.zeros(jobs.shape[0], dtype="float64")
+    predecessor = np.full(jobs.shape[0], -1, dtype="int64")
+    levels = jobs["level"].to_numpy()
+    duration = jobs["duration"].to_numpy(dtype="float64")
+    consumers, inputs = _inputs(jobs, graph)
+    ready = np.zeros(jobs.shape[0], dtype="float64")
+
+    # Inputs are deeper than their consumers, so they are finished first
+    for level in sorted(set(levels), reverse=True):
+        rows = np.flatnonzero(levels == level)
+        edges = np.flatnonzero(levels[consumers] == level)
+        np.maximum.at(ready, consumers[edges], finish[inputs[edges]])
+        latest = edges[finish[inputs[edges]] == ready[consumers[edges]]]
+        predecessor[consumers[latest]] = inputs[latest]
+        finish[rows] = ready[rows] + duration[rows]
+    return finish, predecessor
+
+
+def _critical_path(jobs: pd.DataFrame, predecessor: np.ndarray) -> pd.DataFrame:
+    columns = ["level", "typeID", "typeName", "activityID", "start", "finish"]
+    top = np.flatnonzero(jobs["level"].to_numpy() == 0)
+    if not top.size:
+        return pd.DataFrame(columns=columns)
+    path = [top[np.argmax(jobs["finish"].to_numpy()[top])]]
+    while predecessor[path[-1]] >= 0:
+        path.append(predecessor[path[-1]])
+    path = jobs.iloc[path[::-1]]
+    return path.assign(start=path["finish"] - path["duration"])[columns].reset_index(
+        drop=True
+    )
+
+
+@dataclass
+class JobsSaved:
+    """Grouping of steps by depth of recursion against topological levels.
+
+    Attributes:
+        jobs - jobs per typeName with 'by_depth', 'topological' and 'saved'
+            columns
+        materials - required materials per typeName with the same columns
+    """
+
+    jobs: pd.DataFrame
+    materials: pd.DataFrame
+
+    @property
+    def total(self) -> int:
+        return int(self.jobs["saved"].sum())
+
+    def __str__(self):
+        result = [
+            f"Jobs: {self.jobs['by_depth'].sum()} by depth, "
+            f"{self.jobs['topological'].sum()} by topological level, "
+            f"{self.total} saved"
+        ]
+        for name, row in self.jobs[self.jobs["saved"] != 0].iterrows():
+            result.append(f"  {name}: {row['by_depth']} -> {row['topological']} jobs")
+        saved = self.materials[self.materials["saved"] != 0]
+        if not saved.empty:
+            result.append("Materials saved:")
+            for name, row in saved.iterrows():
+                result.append(f"  {name}: {row['saved']}")
+        return "\n".join(result)
+
+
+def jobs_saved(step: pd.DataFrame, decompositor) -> JobsSaved:
+    """Compare jobs of Decomposition with topological grouping of steps.
+
+    Args:
+        step - initial step, e.g. result of create_init_table
+    """
+    groupings = {
+        "by_depth": ArrayDecomposition(step=step, decompositor=decompositor),
+        "topological": TopologicalDecomposition(step=step, decompositor=decompositor),
+    }
+    jobs, materials = {}, {}
+    for name, decomposition in groupings.items():
+        nodes = _nodes(decomposition.steps)
+        _, _, job_count = _job_counts(nodes, decompositor)
+        jobs[name] = pd.Series(job_count).groupby(nodes["typeName"].to_numpy()).sum()
+        materials[name] = decomposition.required_materials
+    return JobsSaved(jobs=_saved(jobs), materials=_saved(materials))
+
+
+def _saved(groupings: Dict[str, pd.Series]) -> pd.DataFrame:
+    table = pd.DataFrame(groupings).fillna(0).astype("int64")
+    table.index.name = "typeName"
+    return table.assign(saved=table["by_depth"] - table["topological"])
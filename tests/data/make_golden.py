@@ -0,0 +1,81 @@
+"""Golden decompositions of the synthetic SDE made by the baseline pandas
+implementation, see test_engines_match_golden_decompositions.
+
+Run with the baseline fetchlib(the first commit of the repository) on
+sys.path, synthetic SDE is written by benchmarks/synthetic_sde.py of the
+current tree:
+
+    PYTHONPATH=<baseline checkout> python tests/data/make_golden.py .
+"""
+import importlib.util
+import json
+import sys
+import tempfile
+from pathlib import Path
+
+from fetchlib.blueprint import Blueprint, BlueprintCollection
+from fetchlib.decomposition import Decomposition
+from fetchlib.decompositor import Decompositor
+from fetchlib.setup import Setup
+from fetchlib.static_data_export import StaticDataExport
+
+SDE = dict(raw=40, levels=(30, 60, 60, 20), inputs=(2, 6), skip=0.1)
+COLUMNS = ["typeName", "quantity", "runs_required", "activityID", "typeID"]
+
+
+def setups(top):
+    plain = Setup(path=None)
+    tuned = Setup(path=None)
+    tuned.collection = BlueprintCollection(
+        [Blueprint(name, 0.1, 0.2, runs=5) for name in top[:10]]
+        + [Blueprint(f"Item {i}", 0.05, 0.1, runs=2) for i in range(80, 120)]
+    )
+    tuned._non_productables = {"Item 100", "Item 150"}
+    return {"plain": plain, "tuned": tuned}
+
+
+def orders(top):
+    return {
+        "top": {name: 17 for name in top},
+        "mixed": {**{name: i + 1 for i, name in enumerate(top[:5])}, "Item 120": 9},
+    }
+
+
+def main(tree: Path):
+    spec = importlib.util.spec_from_file_location(
+        "synthetic_sde", tree / "benchmarks" / "synthetic_sde.py"
+    )
+    synthetic_sde = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(synthetic_sde)
+
+    golden = {"sde": SDE, "cases": []}
+    with tempfile.TemporaryDirectory() as directory:
+        db_path = Path(directory) / "eve.db"
+        top = synthetic_sde.write_synthetic_sde(db_path, **SDE)
+        data_export = StaticDataExport(db_path)
+        for setup_name, setup in setups(top).items():
+            for order_name, order in orders(top).items():
+                decomposition = Decomposition(
+                    step=data_export.create_init_table(**order),
+                    decompositor=Decompositor(data_export, setup),
+                )
+                golden["cases"].append(
+                    {
+                        "setup": setup_name,
+                        "order": order_name,
+                        "steps": [
+                            step[COLUMNS].to_dict("list")
+                            for step in decomposition.steps
+                        ],
+                        "required_materials": {
+                            name: int(quantity)
+                            for name, quantity in decomposition.required_materials.items()
+                        },
+                    }
+                )
+    path = tree / "tests" / "data" / "golden_decompositions.json"
+    path.write_text(json.dumps(golden, indent=1) + "\n")
+
+
+if __name__ == "__main__":
+    main(Path(sys.argv[1]).resolve())
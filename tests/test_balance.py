@@ -0,0 +1,29 @@
+import random
+
+import pytest
+
+from benchmarks.bench_balance import balance_runs_linear
+from fetchlib import LineLoad, balance_runs
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_distribution_equals_linear_balancer(seed):
+    rng = random.Random(seed)
+    runs_required = {
+        f"Item {i}": rng.choice([rng.uniform(0, 500), rng.randint(1, 50), 12.0])
+        for i in range(rng.randint(1, 60))
+    }
+    for lines in (1, len(runs_required), len(runs_required) + 7, 400):
+        expected = balance_runs_linear(runs_required, lines)
+        result = balance_runs(runs_required, lines)
+        assert list(result) == list(expected)
+        assert {name: load.lines for name, load in result.items()} == expected
+
+
+def test_line_load():
+    loads = balance_runs({"Tengu": 20, "Loki": 15}, 7)
+    assert loads == {
+        "Tengu": LineLoad(lines=4, runs=5, longer=0),
+        "Loki": LineLoad(lines=3, runs=5, longer=0),
+    }
+    assert str(LineLoad(lines=7, runs=2, longer=6)) == "2 x 1 + 3 x 6, total - 7"
@@ -0,0 +1,82 @@
+import pandas as pd
+import pytest
+
+from benchmarks.synthetic_sde import write_synthetic_sde
+from fetchlib.batch import BatchDecomposition
+from fetchlib.blueprint import Blueprint, BlueprintCollection
+from fetchlib.decomposition import Decomposition
+from fetchlib.decompositor import Decompositor
+from fetchlib.name_index import UnknownTypeNames
+from fetchlib.setup import Setup
+from fetchlib.static_data_export import StaticDataExport
+
+from .test_static_data_export import fde
+
+
+def assert_same_plans(data_export, setup, orders):
+    decompositor = Decompositor(data_export, setup)
+    batch = BatchDecomposition(orders=orders, decompositor=decompositor)
+
+    assert list(batch) == list(orders)
+    total = []
+    for order_id, order in orders.items():
+        table = data_export.create_init_table(**order)
+        expected = Decomposition(step=table, decompositor=decompositor)
+        result = batch[order_id]
+        assert len(expected.steps) == len(result.steps)
+        for expected_step, step in zip(expected.steps, result.steps):
+            pd.testing.assert_frame_equal(expected_step, step)
+        pd.testing.assert_series_equal(
+            expected.required_materials, result.required_materials
+        )
+        materials = batch.materials[batch.materials["order"] == order_id]
+        assert (
+            materials.set_index("typeName")["quantity"]
+            .sort_index()
+            .equals(expected.required_materials)
+        )
+        total.append(expected.required_materials)
+
+    if total:
+        expected_total = pd.concat(total).groupby(level=0).sum()
+        pd.testing.assert_series_equal(
+            expected_total, batch.required_materials, check_names=False
+        )
+
+
+def test_batch_matches_single_orders_on_fake_data_export():
+    setup = Setup(path=None)
+    setup.collection = BlueprintCollection([Blueprint("Tengu", 0.1, 0.2, runs=3)])
+    orders = {
+        "alice": {"Tengu": 20},
+        "bob": {"Tengu": 7, "Fulleroferrocene": 1500},
+        "carol": {"fulleroferrocene": 1},
+        "dave": {},
+    }
+
+    assert_same_plans(fde, setup, orders)
+
+
+def test_batch_matches_single_orders_on_synthetic_sde(tmp_path):
+    top = write_synthetic_sde(
+        tmp_path / "eve.db", raw=40, levels=(30, 60, 60, 20), inputs=(2, 6)
+    )
+    data_export = StaticDataExport(tmp_path / "eve.db")
+    setup = Setup(path=None)
+    setup.collection = BlueprintCollection(
+        [Blueprint(f"Item {i}", 0.05, 0.1, runs=2) for i in range(80, 120)]
+    )
+    setup._non_productables = {"Item 100"}
+    orders = {i: {name: 3 * i + 1 for name in top[i % 5 :: 3]} for i in range(12)}
+    # Intermediate items finish before the others
+    orders["components"] = {"Item 45": 10, "Item 100": 3, "Raw 1": 5}
+
+    assert_same_plans(data_export, setup, orders)
+
+
+def test_batch_unknown_names():
+    with pytest.raises(UnknownTypeNames):
+        BatchDecomposition(
+            orders={1: {"Tengu": 1}, 2: {"Tengoo": 1}},
+            decompositor=Decompositor(fde, Setup(path=None)),
+        )
@@ -0,0 +1,71 @@
+import bz2
+import random
+
+import pytest
+
+from fetchlib.bz2_parallel import decompress_file, find_blocks, parallel_decompress
+
+
+@pytest.fixture(scope="module")
+def payload():
+    random.seed(0)
+    return b"".join(
+        b"%d|%s|SQLite format 3\n" % (i, str(random.random()).encode())
+        for i in range(60_000)
+    )
+
+
+def test_find_blocks(payload, tmp_path):
+    # Level 1 means 100k blocks
+    archive = bz2.compress(payload, 1)
+
+    blocks = find_blocks(archive)
+
+    assert len(blocks) == len(payload) // 100_000 + 1
+    assert blocks[0][0] == 32
+    assert all(start < end for start, end in blocks)
+
+
+@pytest.mark.parametrize("level", [1, 9])
+def test_parallel_is_identical_to_sequential(payload, tmp_path, level):
+    source = tmp_path / "eve.db.bz2"
+    source.write_bytes(bz2.compress(payload, level))
+
+    parallel_decompress(source, tmp_path / "parallel", workers=2)
+    decompress_file(source, tmp_path / "sequential", workers=1)
+
+    assert (tmp_path / "parallel").read_bytes() == payload
+    assert (tmp_path / "sequential").read_bytes() == payload
+
+
+def test_multistream_archive(payload, tmp_path):
+    source = tmp_path / "eve.db.bz2"
+    middle = len(payload) // 2
+    source.write_bytes(
+        bz2.compress(payload[:middle], 1) + bz2.compress(payload[middle:])
+    )
+
+    parallel_decompress(source, tmp_path / "eve.db", workers=2)
+
+    assert (tmp_path / "eve.db").read_bytes() == payload
+
+
+def test_fallback_to_sequential(payload, tmp_path, monkeypatch, caplog):
+    source = tmp_path / "eve.db.bz2"
+    source.write_bytes(bz2.compress(payload, 1))
+    monkeypatch.setattr("fetchlib.bz2_parallel.find_blocks", lambda data: [])
+
+    decompress_file(source, tmp_path / "eve.db", workers=2)
+
+    assert (tmp_path / "eve.db").read_bytes() == payload
+    assert "falling back to sequential" in caplog.text
+    assert [path.name for path in tmp_path.iterdir()] == ["eve.db.bz2", "eve.db"]
+
+
+def test_corrupted_archive(tmp_path):
+    source = tmp_path / "eve.db.bz2"
+    source.write_bytes(b"definitely not bz2")
+
+    with pytest.raises(OSError):
+        decompress_file(source, tmp_path / "eve.db", workers=2)
+    assert not (tmp_path / "eve.db").exists()
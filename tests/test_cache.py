@@ -0,0 +1,124 @@
+import gc
+import weakref
+
+import numpy as np
+import pytest
+
+from fetchlib.cache import Cache, CacheOwnerMixin, cached_property, sizeof
+
+from .test_static_data_export import FakeDataExport
+
+
+class Owner(CacheOwnerMixin):
+    def __init__(self, budget=None):
+        self.cache_budget = budget
+        self.version = 1
+        self.computed = 0
+
+    @cached_property
+    def table(self):
+        self.computed += 1
+        return np.zeros(100, dtype="int64")
+
+
+def test_hits_and_misses():
+    owner = Owner()
+
+    assert owner.table is owner.table
+    assert owner.computed == 1
+    stats = owner.cache.stats
+    assert (stats.hits, stats.misses, stats.entries) == (1, 1, 1)
+    assert stats.nbytes == 800
+    assert stats.hit_rate == 0.5
+
+
+def test_failed_compute_is_retried():
+    cache = Cache()
+
+    def fail():
+        raise ValueError("broken")
+
+    with pytest.raises(ValueError):
+        cache.get("table", fail)
+    assert "table" not in cache
+    assert cache.get("table", lambda: 42) == 42
+    assert cache.get("table", fail) == 42
+    assert not cache._computing
+
+
+def test_cache_is_per_instance():
+    first, second = Owner(), Owner()
+    first.table
+    second.table
+
+    assert first.computed == second.computed == 1
+    reference = weakref.ref(first)
+    del first
+    gc.collect()
+    assert reference() is None
+
+
+def test_version_change_drops_entries():
+    owner = Owner()
+    owner.table
+    owner.version = 2
+    owner.table
+
+    assert owner.computed == 2
+
+
+def test_lru_eviction_under_budget():
+    cache = Cache(budget=2000)
+    for key in "ab":
+        cache.get(key, lambda: np.zeros(100, dtype="int64"))
+    cache.get("a", lambda: None)
+    cache.get("c", lambda: np.zeros(100, dtype="int64"))
+
+    assert "a" in cache and "b" not in cache and "c" in cache
+    assert cache.nbytes == 1600
+    assert cache.stats.evictions == 1
+
+
+def test_value_over_budget_is_not_stored():
+    cache = Cache(budget=100)
+
+    value = cache.get("a", lambda: np.zeros(100, dtype="int64"))
+
+    assert value.shape == (100,)
+    assert "a" not in cache and cache.nbytes == 0
+
+
+def test_invalidate_keeps_other_entries():
+    owner = Owner()
+    owner.cache.put("other", 1)
+    owner.table
+
+    owner.version = 3
+    owner.cache.invalidate(["table"], version=3)
+
+    assert "other" in owner.cache
+    assert "table" not in owner.cache
+    assert owner.cache.stats.invalidations == 1
+
+
+def test_invalidate_drops_entries_with_arguments():
+    owner = Owner()
+    owner.cache.put(("table", "a"), 1)
+    owner.cache.put(("other", "a"), 2)
+
+    owner.cache.invalidate(["table"])
+
+    assert ("table", "a") not in owner.cache
+    assert ("other", "a") in owner.cache
+
+
+def test_data_export_uses_cache():
+    data_export = FakeDataExport()
+    data_export.types_by_id
+    data_export.types_by_id
+
+    assert "types_by_id" in data_export.cache
+    assert data_export.cache.stats.hits >= 1
+    assert data_export.cache.nbytes == sum(
+        sizeof(value) for value, _ in data_export.cache._entries.values()
+    )
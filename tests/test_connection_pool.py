@@ -0,0 +1,84 @@
+import os
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from fetchlib.connection_pool import ConnectionPool
+from fetchlib.decomposition import Decomposition
+from fetchlib.decompositor import Decompositor
+from fetchlib.setup import Setup
+from fetchlib.sql_data_export import SqliteDataExport
+from fetchlib.static_data_export import StaticDataExport
+
+from .test_static_data_export import fde, write_sqlite
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    return write_sqlite(fde, tmp_path / "eve.db")
+
+
+def test_connections_are_read_only(db_path):
+    pool = ConnectionPool(db_path)
+
+    with pool.connection() as conn:
+        assert conn.execute("pragma mmap_size").fetchone()[0] > 0
+        with pytest.raises(sqlite3.OperationalError):
+            conn.execute("delete from invTypes")
+
+
+def test_thread_reuses_its_connection(db_path):
+    pool = ConnectionPool(db_path, size=2)
+
+    with pool.connection() as first, pool.connection() as nested:
+        assert first is nested
+    with pool.connection() as again:
+        assert again is first
+
+
+def test_every_thread_has_own_connection(db_path):
+    pool = ConnectionPool(db_path, size=4)
+    barrier = threading.Barrier(4)
+
+    def checkout(_):
+        with pool.connection() as conn:
+            barrier.wait(timeout=5)
+            conn.execute("select count(*) from invTypes").fetchone()
+            return id(conn)
+
+    with ThreadPoolExecutor(4) as executor:
+        assert len(set(executor.map(checkout, range(4)))) == 4
+
+
+def test_connections_are_reopened_on_change(db_path):
+    pool = ConnectionPool(db_path)
+    with pool.connection() as conn:
+        (count,) = conn.execute("select count(*) from invTypes").fetchone()
+
+    with sqlite3.connect(str(db_path)) as writer:
+        writer.execute("delete from invTypes where typeID = 29984")
+    writer.close()
+    stat = db_path.stat()
+    os.utime(db_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+    with pool.connection() as new:
+        assert new is not conn
+        assert new.execute("select count(*) from invTypes").fetchone() == (count - 1,)
+
+
+@pytest.mark.parametrize("factory", [StaticDataExport, SqliteDataExport])
+def test_concurrent_planning(db_path, factory):
+    data_export = factory(db_path)
+
+    def plan(quantity):
+        decompositor = Decompositor(data_export, Setup(path=None))
+        table = data_export.create_init_table(Tengu=quantity)
+        return Decomposition(step=table, decompositor=decompositor).steps[0]
+
+    with ThreadPoolExecutor(4) as executor:
+        results = list(executor.map(plan, [20] * 8))
+
+    for result in results:
+        assert list(result["quantity"]) == [240]
@@ -1,5 +1,10 @@
+import gc
+import weakref
 from unittest.mock import patch
 
+import pandas as pd
+import pytest
+
 from fetchlib.decomposition import Decomposition
 
 
@@ -11,8 +16,8 @@ def test_decompositon():
 
     def decompositor(step):
         nonlocal atomic_sum
-        atomic, next_step = 1, step - 1
-        atomic_sum += atomic
+        atomic, next_step = Decomposition.empty_atomic(), step - 1
+        atomic_sum += 1
         return atomic, next_step
 
     with patch.object(Decomposition, "_finalize_condition", _final_condition):
@@ -21,3 +26,64 @@ def test_decompositon():
     assert [step for step in iter(decomposition)] == list(range(10, 0, -1))
 
     assert atomic_sum == 10
+
+
+def chain_decompositor(calls):
+    def decompositor(step):
+        calls.append(step["level"].iloc[0])
+        atomic = pd.DataFrame({"typeID": [1, 2], "quantity": [3, 4]}).assign(
+            typeName=["Raw 1", "Raw 2"]
+        )
+        return atomic, pd.DataFrame({"level": step["level"] + 1}).iloc[: 5 - len(calls)]
+
+    return decompositor
+
+
+def test_lazy_decomposition():
+    calls = []
+    decomposition = Decomposition(
+        step=pd.DataFrame({"level": [0]}),
+        decompositor=chain_decompositor(calls),
+        lazy=True,
+    )
+    assert calls == []
+
+    levels = iter(decomposition)
+    next(levels)
+    assert calls == [0]
+    assert [step["level"].iloc[0] for step in decomposition] == [0, 1, 2, 3, 4]
+    assert list(decomposition.required_materials) == [15, 20]
+
+
+def test_consumed_steps_are_dropped():
+    calls = []
+    decomposition = Decomposition(
+        step=pd.DataFrame({"level": [0]}),
+        decompositor=chain_decompositor(calls),
+        keep_steps=False,
+    )
+    assert calls == []
+    alive = []
+    for step in decomposition:
+        alive.append(weakref.ref(step))
+        del step
+        gc.collect()
+        # Only the initial step and the one being consumed stay alive
+        assert sum(ref() is not None for ref in alive) <= 2
+
+    assert decomposition.depth == 5
+    assert list(decomposition.required_materials) == [15, 20]
+    with pytest.raises(RuntimeError):
+        iter(decomposition)
+    with pytest.raises(RuntimeError):
+        decomposition.steps
+
+
+def test_eager_decomposition_must_keep_steps():
+    with pytest.raises(ValueError):
+        Decomposition(
+            step=pd.DataFrame({"level": [0]}),
+            decompositor=chain_decompositor([]),
+            lazy=False,
+            keep_steps=False,
+        )
@@ -0,0 +1,170 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from fetchlib.blueprint import Blueprint, BlueprintCollection
+from fetchlib.decomposition import Decomposition
+from fetchlib.decompositor import Decompositor, new_memo
+from fetchlib.setup import Setup
+
+from .test_static_data_export import fde
+
+
+def row_wise_price_in_materials(x):
+    """Former row-wise implementation of Decompositor.count_required."""
+    ideal_run_size = np.ceil(x.quantity / x.quantity_product)
+    single_line_run_size = int(np.minimum(ideal_run_size, x.run))
+    paralel_jobs_required = np.ceil(
+        (x.quantity / (single_line_run_size * x.quantity_product))
+    ).astype("int64")
+    if x.activityID == 1:
+        single_line_run_price = int(
+            np.ceil(x.quantity_materials * single_line_run_size * x.me_impact)
+        )
+        single_line_run_price = np.maximum(single_line_run_price, single_line_run_size)
+
+        trim_size = (
+            x.quantity
+            - single_line_run_size * paralel_jobs_required * x.quantity_product
+        )
+        trim_price = int(
+            np.ceil(x.quantity_materials * trim_size * x.me_impact / x.quantity_product)
+        )
+        trim_price = np.maximum(trim_price, trim_size)
+
+        run_price = (single_line_run_price * paralel_jobs_required) + trim_price
+    elif x.activityID == 11:
+        r_req = int(np.ceil((x.quantity / x.quantity_product)))
+        run_price = x.quantity_materials * r_req
+    else:
+        raise Exception("Unknown reaction ID")
+    return run_price
+
+
+def row_wise_runs_required(x):
+    run_size = np.minimum(x.quantity, x.run)
+    jobs_required = (np.ceil(x.quantity / run_size)).astype("int64")
+    if x.activityID == 1:
+        r_req = int(np.ceil(jobs_required * run_size / x.quantity_product))
+    elif x.activityID == 11:
+        r_req = int(np.ceil((x.quantity / x.quantity_product)))
+    else:
+        r_req = 0
+    return r_req
+
+
+def random_step(size, seed=0):
+    random = np.random.RandomState(seed)
+    return pd.DataFrame(
+        {
+            "quantity": random.randint(1, 100_000, size=size),
+            "quantity_product": random.choice([1, 40, 100, 200, 5000], size=size),
+            "run": random.choice([1, 10, 300, 2**10, 2**20], size=size),
+            "quantity_materials": random.randint(1, 10_000, size=size),
+            "me_impact": random.choice([1.0, 0.9, 0.958, 0.9 * 0.958], size=size),
+            "activityID": random.choice([1, 11], size=size),
+        },
+        index=random.randint(1, 50_000, size=size),
+    )
+
+
+def test_count_required_matches_row_wise():
+    step = random_step(2000)
+
+    run_price, runs_required = Decompositor.count_required(step)
+
+    expected_price = step.apply(row_wise_price_in_materials, axis=1)
+    expected_runs = step.apply(row_wise_runs_required, axis=1)
+    assert (run_price.values == expected_price.values).all()
+    assert (runs_required.values == expected_runs.values).all()
+    assert run_price.index.equals(step.index)
+    assert run_price.dtype == runs_required.dtype == "int64"
+
+
+def test_count_required_does_not_overflow():
+    step = pd.DataFrame(
+        {
+            "quantity": [3 * 10**10],
+            "quantity_product": [1],
+            "run": [1],
+            "quantity_materials": [10],
+            "me_impact": [1.0],
+            "activityID": [1],
+        }
+    )
+    run_price, runs_required = Decompositor.count_required(step)
+
+    assert run_price.iloc[0] == 3 * 10**11
+    assert runs_required.iloc[0] == 3 * 10**10
+
+
+def test_count_required_unknown_activity():
+    step = random_step(3).assign(activityID=[1, 11, 8])
+    with pytest.raises(ValueError):
+        Decompositor.count_required(step)
+
+
+def test_decomposition_of_fake_data_export():
+    setup = Setup(path=None)
+    table = fde.create_init_table(Tengu=20)
+    decomposition = Decomposition(step=table, decompositor=Decompositor(fde, setup))
+
+    first, second = decomposition.steps
+    assert list(first["typeName"]) == ["Superconducting Gravimetric Amplifier"]
+    assert list(first["quantity"]) == [240]
+    assert list(second["typeName"]) == ["Tengu"]
+    assert decomposition.required_materials.empty
+
+
+def test_memo_reuses_expansions():
+    setup = Setup(path=None)
+    memo = new_memo()
+    table = fde.create_init_table(Tengu=20)
+    plain = Decomposition(step=table, decompositor=Decompositor(fde, setup))
+    first = Decomposition(step=table, decompositor=Decompositor(fde, setup, memo))
+    assert memo.stats.hits == 0 and memo.stats.misses == 2
+
+    # Later request with the same demand is replayed from the memo
+    second = Decomposition(step=table, decompositor=Decompositor(fde, setup, memo))
+    assert memo.stats.hits == 2
+    for decomposition in (first, second):
+        for expected, actual in zip(plain.steps, decomposition.steps):
+            pd.testing.assert_frame_equal(expected, actual)
+
+    # Sub-tree of the request is shared as well
+    component = fde.create_init_table(**{"Superconducting Gravimetric Amplifier": 240})
+    Decomposition(step=component, decompositor=Decompositor(fde, setup, memo))
+    assert memo.stats.hits == 3
+
+
+def test_memo_is_keyed_by_setup():
+    setup = Setup(path=None)
+    memo = new_memo()
+    decompositor = Decompositor(fde, setup, memo)
+    table = fde.create_init_table(Tengu=20)
+    key = decompositor.memo_key(np.array([2, 1]), np.array([20, 10]))
+    assert key == decompositor.memo_key(np.array([1, 2]), np.array([10, 20]))
+
+    Decomposition(step=table, decompositor=decompositor)
+    # Lines and skills do not change expansions
+    setup.production_lines = 7
+    setup.skills = {"Industry": 1}
+    assert decompositor.memo_key(np.array([1, 2]), np.array([10, 20])) == key
+    Decomposition(step=table, decompositor=decompositor)
+    assert memo.stats.hits == 2 and memo.stats.misses == 2
+
+    setup.collection = BlueprintCollection([Blueprint("Tengu", 0.1, 0.2, 1)])
+    Decomposition(step=table, decompositor=decompositor)
+    assert memo.stats.hits == 2 and memo.stats.misses == 4
+    assert key != decompositor.memo_key(np.array([1, 2]), np.array([10, 20]))
+
+    setup._non_productables = {"Superconducting Gravimetric Amplifier"}
+    assert key != decompositor.memo_key(np.array([1, 2]), np.array([10, 20]))
+
+
+def test_memoized_expansions_are_read_only():
+    decompositor = Decompositor(fde, Setup(path=None), new_memo())
+    expansion = decompositor.expand(fde.type_ids(["Tengu"]), np.array([20]))
+
+    assert not any(array.flags.writeable for array in expansion)
+    assert decompositor.expand(fde.type_ids(["Tengu"]), np.array([20])) is expansion
@@ -0,0 +1,148 @@
+import bz2
+import hashlib
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from fetchlib import download
+from fetchlib.download import DownloadError, download_and_decompress
+
+PAYLOAD = b"".join(b"%d SQLite format 3\n" % i for i in range(50_000))
+ARCHIVE = bz2.compress(PAYLOAD)
+
+
+class RangeHandler(BaseHTTPRequestHandler):
+    """Serves ARCHIVE with Range and If-Range support.
+
+    First `broken` responses are cut after `cut` bytes.
+    """
+
+    broken = 0
+    cut = len(ARCHIVE) // 3
+    etag = '"v1"'
+    requests = []
+    validators = []
+
+    def do_GET(self):
+        type(self).requests.append(self.headers.get("Range"))
+        type(self).validators.append(self.headers.get("If-Range"))
+        start = 0
+        if value := self.headers.get("Range"):
+            if self.headers.get("If-Range") in (None, self.etag):
+                start = int(value.split("=")[1].split("-")[0])
+        body = ARCHIVE[start:]
+        self.send_response(206 if start else 200)
+        if start:
+            self.send_header(
+                "Content-Range", f"bytes {start}-{len(ARCHIVE) - 1}/{len(ARCHIVE)}"
+            )
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("ETag", self.etag)
+        self.end_headers()
+        if type(self).broken > 0:
+            type(self).broken -= 1
+            self.wfile.write(body[: self.cut])
+            self.wfile.flush()
+            self.connection.close()
+            return
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    RangeHandler.broken = 0
+    RangeHandler.requests = []
+    RangeHandler.validators = []
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), RangeHandler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}/sqlite-latest.sqlite.bz2"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def test_download_and_decompress(server, tmp_path):
+    dest = tmp_path / "eve.db"
+    md5 = hashlib.md5(ARCHIVE).hexdigest()
+
+    download_and_decompress(server, dest, md5=md5)
+
+    assert dest.read_bytes() == PAYLOAD
+    assert not (tmp_path / "eve.db.bz2").exists()
+    assert [path.name for path in tmp_path.iterdir()] == ["eve.db"]
+
+
+def test_interrupted_download_is_resumed(server, tmp_path, monkeypatch):
+    monkeypatch.setattr(download, "CHUNK_SIZE", 1024)
+    RangeHandler.broken = 1
+    dest = tmp_path / "eve.db"
+
+    download_and_decompress(server, dest)
+
+    assert dest.read_bytes() == PAYLOAD
+    first, second = RangeHandler.requests
+    assert first is None
+    offset = int(second.split("=")[1].rstrip("-"))
+    assert 0 < offset <= RangeHandler.cut
+    assert RangeHandler.validators == [None, '"v1"']
+    assert [path.name for path in tmp_path.iterdir()] == ["eve.db"]
+
+
+def test_partial_archive_is_resumed(server, tmp_path):
+    dest = tmp_path / "eve.db"
+    archive = tmp_path / "eve.db.bz2"
+    archive.write_bytes(ARCHIVE[:1000])
+    (tmp_path / "eve.db.bz2.validator").write_text('"v1"')
+
+    download_and_decompress(server, dest, archive=archive)
+
+    assert dest.read_bytes() == PAYLOAD
+    assert RangeHandler.requests == ["bytes=1000-"]
+    assert RangeHandler.validators == ['"v1"']
+
+
+def test_changed_archive_is_downloaded_from_scratch(server, tmp_path):
+    dest = tmp_path / "eve.db"
+    archive = tmp_path / "eve.db.bz2"
+    archive.write_bytes(b"old version of archive")
+    (tmp_path / "eve.db.bz2.validator").write_text('"v0"')
+
+    download_and_decompress(server, dest, archive=archive)
+
+    assert dest.read_bytes() == PAYLOAD
+    assert RangeHandler.validators == ['"v0"']
+
+
+def test_archive_without_validator_is_not_resumed(server, tmp_path):
+    dest = tmp_path / "eve.db"
+    archive = tmp_path / "eve.db.bz2"
+    archive.write_bytes(b"archive of unknown version")
+
+    download_and_decompress(server, dest, archive=archive)
+
+    assert dest.read_bytes() == PAYLOAD
+    assert RangeHandler.requests == [None]
+
+
+def test_failed_download_does_not_create_db(server, tmp_path):
+    RangeHandler.broken = 10
+    dest = tmp_path / "eve.db"
+
+    with pytest.raises(DownloadError):
+        download_and_decompress(server, dest, retries=1)
+
+    assert not dest.exists()
+    assert (tmp_path / "eve.db.bz2").exists()
+
+
+def test_checksum_mismatch(server, tmp_path):
+    dest = tmp_path / "eve.db"
+
+    with pytest.raises(DownloadError):
+        download_and_decompress(server, dest, md5="0" * 32)
+
+    assert not dest.exists()
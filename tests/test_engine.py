@@ -0,0 +1,151 @@
+import json
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from benchmarks.synthetic_sde import write_synthetic_sde
+from fetchlib.blueprint import Blueprint, BlueprintCollection
+from fetchlib.decompositor import Decompositor, accumulate
+from fetchlib.engine import (
+    ENGINE_NUMPY,
+    ENGINE_PANDAS,
+    ENGINE_TOPOLOGICAL,
+    ArrayDecomposition,
+    TopologicalDecomposition,
+    decompose,
+)
+from fetchlib.setup import Setup
+from fetchlib.static_data_export import StaticDataExport
+
+from .data.make_golden import COLUMNS, orders, setups
+from .test_static_data_export import fde
+
+
+def assert_same_decomposition(data_export, setup, order):
+    table = data_export.create_init_table(**order)
+    expected, result = (
+        decompose(
+            step=table,
+            decompositor=Decompositor(data_export, setup),
+            engine=engine,
+        )
+        for engine in (ENGINE_PANDAS, ENGINE_NUMPY)
+    )
+
+    assert isinstance(result, ArrayDecomposition)
+    assert len(expected.steps) == len(result.steps)
+    for expected_step, step in zip(expected.steps, result.steps):
+        pd.testing.assert_frame_equal(expected_step, step)
+    pd.testing.assert_series_equal(
+        expected.required_materials, result.required_materials
+    )
+    assert str(expected) == str(result)
+    assert [len(step) for step in expected] == [len(step) for step in result]
+
+
+@pytest.mark.parametrize(
+    "order",
+    [{"Tengu": 20}, {"Tengu": 7, "Fulleroferrocene": 1500}, {"Fulleroferrocene": 1}],
+)
+def test_engines_match_on_fake_data_export(order):
+    setup = Setup(path=None)
+    setup.collection = BlueprintCollection([Blueprint("Tengu", 0.1, 0.2, runs=3)])
+
+    assert_same_decomposition(fde, setup, order)
+
+
+def test_engines_match_on_synthetic_sde(tmp_path):
+    top = write_synthetic_sde(
+        tmp_path / "eve.db", raw=40, levels=(30, 60, 60, 20), inputs=(2, 6)
+    )
+    data_export = StaticDataExport(tmp_path / "eve.db")
+    setup = Setup(path=None)
+    setup.collection = BlueprintCollection(
+        [Blueprint(name, 0.1, 0.2, runs=5) for name in top[:10]]
+        + [Blueprint(f"Item {i}", 0.05, 0.1, runs=2) for i in range(80, 120)]
+    )
+    setup._non_productables = {"Item 100", "Item 150"}
+
+    assert_same_decomposition(data_export, setup, {name: 17 for name in top})
+
+
+GOLDEN = Path(__file__).parent / "data" / "golden_decompositions.json"
+
+
+@pytest.mark.parametrize("engine", [ENGINE_PANDAS, ENGINE_NUMPY])
+def test_engines_match_golden_decompositions(tmp_path, engine):
+    """Decompositions made by the baseline pandas implementation, see
+    tests/data/make_golden.py."""
+    golden = json.loads(GOLDEN.read_text())
+    top = write_synthetic_sde(tmp_path / "eve.db", **golden["sde"])
+    data_export = StaticDataExport(tmp_path / "eve.db")
+    setup_by_name, order_by_name = setups(top), orders(top)
+
+    for case in golden["cases"]:
+        decomposition = decompose(
+            step=data_export.create_init_table(**order_by_name[case["order"]]),
+            decompositor=Decompositor(data_export, setup_by_name[case["setup"]]),
+            engine=engine,
+        )
+        assert len(decomposition.steps) == len(case["steps"])
+        for expected, step in zip(case["steps"], decomposition.steps):
+            pd.testing.assert_frame_equal(
+                step[COLUMNS].reset_index(drop=True), pd.DataFrame(expected)
+            )
+        assert decomposition.required_materials.to_dict() == case["required_materials"]
+
+
+def test_topological_levels_build_shared_component_once():
+    setup = Setup(path=None)
+    order = {"Tengu": 1, "Superconducting Gravimetric Amplifier": 1}
+    table = fde.create_init_table(**order)
+    decomposition = decompose(
+        step=table,
+        decompositor=Decompositor(fde, setup),
+        engine=ENGINE_TOPOLOGICAL,
+    )
+
+    assert isinstance(decomposition, TopologicalDecomposition)
+    initial, components = decomposition.steps[::-1]
+    assert list(initial["typeName"]) == ["Tengu"]
+    assert list(components["typeName"]) == ["Superconducting Gravimetric Amplifier"]
+    assert list(components["quantity"]) == [13]
+
+
+def test_topological_levels_on_synthetic_sde(tmp_path):
+    top = write_synthetic_sde(
+        tmp_path / "eve.db", raw=40, levels=(30, 60, 60, 20), inputs=(2, 6), skip=0.1
+    )
+    data_export = StaticDataExport(tmp_path / "eve.db")
+    setup = Setup(path=None)
+    setup.collection = BlueprintCollection(
+        [Blueprint(f"Item {i}", 0.1, 0.2, runs=3) for i in range(40, 200, 2)]
+    )
+    setup._non_productables = {"Item 100"}
+    decompositor = Decompositor(data_export, setup)
+    table = data_export.create_init_table(**{name: 17 for name in top[:5]})
+    by_depth = ArrayDecomposition(step=table, decompositor=decompositor)
+    result = TopologicalDecomposition(step=table, decompositor=decompositor)
+
+    type_ids = np.concatenate([ids for ids, _ in result.levels])
+    assert len(type_ids) == len(np.unique(type_ids))
+    assert len(type_ids) < sum(len(ids) for ids, _ in by_depth.levels)
+    pd.testing.assert_frame_equal(result.steps[-1], table)
+    materials = result.required_materials
+    assert (materials <= by_depth.required_materials[materials.index]).all()
+
+
+def test_unknown_engine():
+    table = fde.create_init_table(Tengu=1)
+    with pytest.raises(ValueError):
+        decompose(
+            step=table, decompositor=Decompositor(fde, Setup(path=None)), engine="gpu"
+        )
+
+
+def test_accumulate():
+    type_ids, total = accumulate(np.array([5, 3, 5]), np.array([2**60, 1, 2**60]))
+    assert list(type_ids) == [3, 5]
+    assert list(total) == [1, 2**61]
@@ -0,0 +1,117 @@
+import pandas as pd
+
+from benchmarks.synthetic_sde import write_synthetic_sde
+from fetchlib.blueprint import Blueprint, BlueprintCollection
+from fetchlib.decompositor import Decompositor
+from fetchlib.engine import TopologicalDecomposition
+from fetchlib.incremental import IncrementalDecomposition
+from fetchlib.rig import MediumSetIndustryRig, RigSet
+from fetchlib.setup import Setup
+from fetchlib.static_data_export import StaticDataExport
+from fetchlib.utils import ProductionClass, SpaceType
+
+from .test_static_data_export import fde
+
+
+def assert_same_as_full_recompute(plan, data_export, setup):
+    expected = TopologicalDecomposition(
+        step=plan.step, decompositor=Decompositor(data_export, setup)
+    )
+    assert len(expected.steps) == len(plan.steps)
+    for expected_step, step in zip(expected.steps, plan.steps):
+        pd.testing.assert_frame_equal(expected_step, step)
+    pd.testing.assert_series_equal(expected.required_materials, plan.required_materials)
+
+
+def synthetic_plan(tmp_path):
+    top = write_synthetic_sde(
+        tmp_path / "eve.db", raw=40, levels=(30, 60, 60, 20), inputs=(2, 6)
+    )
+    data_export = StaticDataExport(tmp_path / "eve.db")
+    setup = Setup(path=None)
+    table = data_export.create_init_table(**{name: 13 for name in top})
+    plan = IncrementalDecomposition(
+        step=table, decompositor=Decompositor(data_export, setup)
+    )
+    return data_export, setup, plan
+
+
+def test_replan_after_blueprint_change(tmp_path):
+    data_export, setup, plan = synthetic_plan(tmp_path)
+    before = plan.required_materials
+
+    setup.collection.add(Blueprint("Item 100", 0.1, 0.2, runs=4))
+    repriced = plan.replan()
+
+    assert_same_as_full_recompute(plan, data_export, setup)
+    assert not plan.required_materials.equals(before)
+    # Only the item and its downstream demand are priced again
+    assert data_export.type_ids(["Item 100"])[0] in repriced
+    assert 0 < len(repriced) < sum(len(ids) for ids, _ in plan.levels)
+
+    assert len(plan.replan()) == 0
+
+
+def test_replan_after_rigs_and_space_change(tmp_path):
+    data_export, setup, plan = synthetic_plan(tmp_path)
+    setup.collection = BlueprintCollection(
+        [Blueprint(f"Item {i}", 0.05, 0.1, runs=2) for i in range(80, 120)]
+    )
+    plan.replan()
+    assert_same_as_full_recompute(plan, data_export, setup)
+
+    setup.space_type = SpaceType.LOWSEC
+    setup.rig_set = RigSet(
+        [MediumSetIndustryRig(ProductionClass.ADVANCED_COMPONENT, tier=2)]
+    )
+    plan.replan()
+    assert_same_as_full_recompute(plan, data_export, setup)
+
+
+def test_replan_after_non_productable_change(tmp_path):
+    data_export, setup, plan = synthetic_plan(tmp_path)
+    setup._non_productables = {"Item 100", "Item 45"}
+
+    repriced = plan.replan()
+
+    assert_same_as_full_recompute(plan, data_export, setup)
+    assert data_export.type_ids(["Item 100"])[0] not in repriced
+
+
+def test_replan_on_fake_data_export():
+    setup = Setup(path=None)
+    plan = IncrementalDecomposition(
+        step=fde.create_init_table(Tengu=20), decompositor=Decompositor(fde, setup)
+    )
+    setup.collection = BlueprintCollection([Blueprint("Tengu", 0.1, 0.2, runs=3)])
+
+    # Tengu is repriced for its blueprint, amplifiers for changed demand
+    repriced = fde.type_ids(["Tengu", "Superconducting Gravimetric Amplifier"])
+    assert list(plan.replan()) == sorted(repriced)
+    assert_same_as_full_recompute(plan, fde, setup)
+
+
+def test_replan_of_components_shared_across_levels(tmp_path):
+    top = write_synthetic_sde(
+        tmp_path / "eve.db", raw=40, levels=(30, 60, 60, 20), inputs=(2, 6), skip=0.1
+    )
+    data_export = StaticDataExport(tmp_path / "eve.db")
+    setup = Setup(path=None)
+    # Ordered component is produced on its topological level
+    table = data_export.create_init_table(
+        **{name: 13 for name in top}, **{"Item 100": 7}
+    )
+    plan = IncrementalDecomposition(
+        step=table, decompositor=Decompositor(data_export, setup)
+    )
+    assert plan.steps[-1].shape[0] == len(top)
+
+    setup.collection = BlueprintCollection(
+        [Blueprint(f"Item {i}", 0.1, 0.2, runs=3) for i in range(60, 220, 7)]
+    )
+    plan.replan()
+    assert_same_as_full_recompute(plan, data_export, setup)
+
+    setup._non_productables = {"Item 150"}
+    plan.replan()
+    assert_same_as_full_recompute(plan, data_export, setup)
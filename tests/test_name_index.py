@@ -0,0 +1,91 @@
+import pytest
+
+from fetchlib.name_index import (
+    NameIndex,
+    UnknownTypeNames,
+    edit_distances,
+    parse_multibuy,
+)
+from fetchlib.setup import Setup, SetupManager
+
+from .test_static_data_export import fde
+
+NAMES = ["Tengu", "Tengu Blueprint", "Fulleroferrocene", "Fullerite-C60", "Raven"]
+
+
+@pytest.fixture
+def index():
+    return NameIndex(NAMES, range(1, len(NAMES) + 1))
+
+
+def test_edit_distance():
+    candidates = ["tengu", "tengo", "sitting", "", "kitten"]
+
+    assert list(edit_distances("tengu", candidates)) == [0, 1, 5, 5, 5]
+    assert list(edit_distances("kitten", candidates)) == [5, 5, 3, 6, 0]
+
+
+def test_resolve(index):
+    assert index.resolve("Tengu") == "Tengu"
+    assert index.resolve("  tENGU ") == "Tengu"
+    assert index.resolve("Tengo") is None
+    assert index.type_id("Raven") == 5
+    assert "Raven" in index and "raven" not in index
+
+
+def test_prefix(index):
+    assert index.prefix("ful") == ["Fullerite-C60", "Fulleroferrocene"]
+    assert index.prefix("tengu", limit=1) == ["Tengu"]
+    assert index.prefix("zzz") == []
+
+
+def test_suggest(index):
+    assert index.suggest("Fulleroferocene") == ["Fulleroferrocene"]
+    assert index.suggest("Tengo")[0] == "Tengu"
+    assert index.suggest("Nyx") == []
+
+
+def test_resolve_many(index):
+    resolution = index.resolve_many(["raven", "Tengo", "Tengu"])
+
+    assert resolution.names == ["Raven", None, "Tengu"]
+    assert list(resolution.type_ids) == [5, -1, 1]
+    assert resolution.unknown == ["Tengo"]
+    with pytest.raises(UnknownTypeNames) as err:
+        resolution.raise_for_unknown()
+    assert err.value.suggestions["Tengo"][0] == "Tengu"
+
+
+def test_parse_multibuy():
+    text = "Tengu 10\n\nSuperconducting Gravimetric Amplifier\t1,000\nRaven x2\nNyx\n"
+
+    assert parse_multibuy(text) == [
+        ("Tengu", 10),
+        ("Superconducting Gravimetric Amplifier", 1000),
+        ("Raven", 2),
+        ("Nyx", 1),
+    ]
+
+
+def test_create_init_table_ignores_case():
+    table = fde.create_init_table(tengu=5, Tengu=15)
+
+    assert list(table["typeName"]) == ["Tengu"]
+    assert list(table["quantity"]) == [20]
+
+
+def test_create_init_table_suggests():
+    with pytest.raises(ValueError, match="did you mean: Tengu"):
+        fde.create_init_table(Tengo=5)
+
+
+def test_setup_manager_resolves_names():
+    manager, setup = SetupManager(data_export=fde), Setup(path=None)
+
+    manager.add_blueprint_to_setup(
+        setup, name="tengu", material_efficiency=0.1, time_efficiency=0.2
+    )
+
+    assert setup.collection["Tengu"].material_efficiency == 0.1
+    with pytest.raises(UnknownTypeNames):
+        manager.add_blueprint_to_setup(setup, name="Fullerite-C60")
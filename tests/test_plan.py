@@ -0,0 +1,72 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from fetchlib.blueprint import Blueprint, BlueprintCollection
+from fetchlib.decomposition import Decomposition
+from fetchlib.decompositor import Decompositor
+from fetchlib.engine import ArrayDecomposition
+from fetchlib.plan import NameTable, Plan
+from fetchlib.setup import Setup
+from fetchlib.timing import estimate_time
+
+from .test_static_data_export import fde
+
+
+@pytest.fixture
+def decomposition():
+    setup = Setup(path=None)
+    setup.collection = BlueprintCollection([Blueprint("Tengu", 0.0, 0.2, runs=3)])
+    table = fde.create_init_table(Tengu=20, Fulleroferrocene=1500)
+    return Decomposition(step=table, decompositor=Decompositor(fde, setup))
+
+
+def test_plan_of_decomposition(decomposition):
+    plan = Plan.from_decomposition(decomposition)
+
+    jobs = estimate_time(decomposition).jobs
+    steps = plan.steps
+    assert list(steps["typeName"]) == list(jobs["typeName"])
+    for column in ("typeID", "level", "quantity", "runs", "jobs"):
+        assert list(steps[column]) == list(jobs[column])
+    assert list(plan.records.activity) == list(jobs["activityID"])
+    pd.testing.assert_series_equal(
+        plan.required_materials, decomposition.required_materials
+    )
+    # Record view and columns share the buffer of rows
+    assert np.shares_memory(plan.records, plan.rows)
+    assert plan.nbytes == plan.rows.nbytes + plan.materials.nbytes
+
+
+def test_plans_of_engines_match(decomposition):
+    array = ArrayDecomposition(
+        step=decomposition.steps[-1], decompositor=decomposition.decompositor
+    )
+    expected = Plan.from_decomposition(decomposition)
+    result = Plan.from_decomposition(array)
+    assert np.array_equal(expected.rows, result.rows)
+    assert np.array_equal(expected.materials, result.materials)
+
+
+def test_save_and_load_memory_mapped(decomposition, tmp_path):
+    names = NameTable.from_data_export(fde)
+    plan = Plan.from_decomposition(decomposition, names)
+    names.save(tmp_path / "names")
+    plan.save(tmp_path / "plan")
+
+    shared = NameTable.load(tmp_path / "names")
+    loaded = Plan.load(tmp_path / "plan", shared)
+    assert isinstance(loaded.rows, np.memmap)
+    assert np.array_equal(loaded.rows, plan.rows)
+    pd.testing.assert_frame_equal(loaded.steps, plan.steps)
+    pd.testing.assert_series_equal(
+        loaded.required_materials, decomposition.required_materials
+    )
+
+
+def test_name_table():
+    names = NameTable.from_data_export(fde, [30303, 29984, 29984])
+    assert list(names[[29984, 30303]]) == ["Tengu", "Fulleroferrocene"]
+    assert len(names[[]]) == 0
+    with pytest.raises(KeyError):
+        names[[29984, 1]]
@@ -0,0 +1,71 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from benchmarks.synthetic_sde import write_synthetic_sde
+from fetchlib.blueprint import Blueprint, BlueprintCollection
+from fetchlib.decompositor import Decompositor
+from fetchlib.preview import bill_of_materials, preview
+from fetchlib.setup import Setup
+from fetchlib.static_data_export import StaticDataExport
+
+from .test_static_data_export import fde
+
+
+def assert_bounds(result):
+    assert (result.estimate <= result.exact * (1 + 1e-9)).all()
+    assert (result.exact <= result.upper).all()
+    pd.testing.assert_series_equal(result.correction, result.exact - result.estimate)
+
+
+def test_preview_of_fake_data_export():
+    decompositor = Decompositor(fde, Setup(path=None))
+    result = preview({"Fulleroferrocene": 2500}, decompositor, exact=True)
+
+    # 2.5 runs of the reaction are estimated, 3 runs are required
+    assert result.estimate["Fullerite-C60"] == pytest.approx(250)
+    assert result.exact["Fullerite-C60"] == 300
+    assert_bounds(result)
+
+
+def test_preview_bounds_exact_quantities(tmp_path):
+    top = write_synthetic_sde(
+        tmp_path / "eve.db", raw=40, levels=(30, 60, 60, 20), inputs=(2, 6)
+    )
+    data_export = StaticDataExport(tmp_path / "eve.db")
+    setup = Setup(path=None)
+    setup.collection = BlueprintCollection(
+        [Blueprint(f"Item {i}", 0.1, 0.2, runs=i % 5 + 1) for i in range(40, 200, 3)]
+    )
+    setup._non_productables = {"Item 100"}
+    decompositor = Decompositor(data_export, setup)
+
+    for quantity in (1, 17, 2500):
+        result = preview({name: quantity for name in top[:3]}, decompositor, True)
+        assert_bounds(result)
+    assert preview({top[0]: 5}, decompositor).exact is None
+
+
+def test_bill_of_materials_is_cached_per_setup():
+    setup = Setup(path=None)
+    operator = bill_of_materials(Decompositor(fde, setup))
+    assert bill_of_materials(Decompositor(fde, setup)) is operator
+
+    # Lines do not affect materials
+    setup.production_lines = 3
+    assert bill_of_materials(Decompositor(fde, setup)) is operator
+
+    setup.collection.add(Blueprint("Tengu", 0.1, 0.2))
+    changed = bill_of_materials(Decompositor(fde, setup))
+    assert changed is not operator
+    ids, quantity = changed.apply(fde.type_ids(["Fulleroferrocene"]), np.array([10]))
+    assert fde.type_names(ids).tolist() == ["Fullerite-C60"]
+    assert quantity == pytest.approx([1.0])
+
+
+def test_collection_fingerprint_follows_add():
+    collection = BlueprintCollection([Blueprint("Tengu", 0.1, 0.2)])
+    fingerprint = collection.fingerprint
+    assert collection.fingerprint == fingerprint
+    collection.add(Blueprint("Loki", 0.1, 0.2))
+    assert collection.fingerprint != fingerprint
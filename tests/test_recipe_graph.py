@@ -0,0 +1,52 @@
+import numpy as np
+
+from fetchlib.recipe_graph import NO_BLUEPRINT, RecipeGraph
+from fetchlib.static_data_export import RECIPE_GRAPH_DIR, StaticDataExport
+
+from .test_static_data_export import fde, write_sqlite
+
+
+def test_recipe_graph_lookups():
+    graph = RecipeGraph.from_data_export(fde)
+
+    assert graph.blueprint[29984] == 29985
+    assert graph.activity[30303] == 11
+    assert graph.output_quantity[30303] == 1000
+    assert graph.blueprint[30371] == NO_BLUEPRINT
+    assert list(graph.is_productable([29984, 30371, 10**9, -1])) == [
+        True,
+        False,
+        False,
+        False,
+    ]
+
+
+def test_recipe_graph_expand():
+    graph = RecipeGraph.from_data_export(fde)
+
+    parents, material_ids, quantities = graph.expand([30371, 30303, 45653, 29984])
+
+    assert list(parents) == [1, 3]
+    assert list(material_ids) == [30371, 45653]
+    assert list(quantities) == [100, 12]
+
+
+def test_recipe_graph_save_load(tmp_path):
+    graph = RecipeGraph.from_data_export(fde)
+    graph.save(tmp_path / "graph")
+    loaded = RecipeGraph.load(tmp_path / "graph")
+
+    for name in RecipeGraph.ARRAYS:
+        assert np.array_equal(getattr(graph, name), getattr(loaded, name))
+
+
+def test_recipe_graph_is_persisted_with_snapshot(tmp_path):
+    db_path = write_sqlite(fde, tmp_path / "eve.db")
+    data_export = StaticDataExport(db_path)
+    graph = data_export.recipe_graph
+
+    directory = data_export.snapshot.directory / RECIPE_GRAPH_DIR
+    assert directory.exists()
+    loaded = StaticDataExport(db_path).recipe_graph
+    assert isinstance(loaded.blueprint, np.memmap)
+    assert np.array_equal(graph.indptr, loaded.indptr)
@@ -0,0 +1,111 @@
+import io
+import json
+
+import pytest
+
+from fetchlib.decomposition import Decomposition
+from fetchlib.decompositor import Decompositor
+from fetchlib.engine import ArrayDecomposition
+from fetchlib.render import FORMAT_CSV, FORMAT_JSONL, write_plan
+from fetchlib.setup import Setup
+
+from .test_static_data_export import fde
+
+
+@pytest.fixture
+def setup():
+    setup = Setup(path=None)
+    setup.production_lines, setup.reaction_lines = 7, 3
+    return setup
+
+
+@pytest.fixture
+def decomposition(setup):
+    table = fde.create_init_table(Tengu=20, Fulleroferrocene=15000)
+    return Decomposition(step=table, decompositor=Decompositor(fde, setup))
+
+
+def expected_tsv(decomposition):
+    result = []
+    for i, table in enumerate(decomposition, start=1):
+        result.append(f"Step {i} is: \n" + table.to_csv(index=False, sep="\t"))
+    result.append(
+        "Required materials:\n" + decomposition.required_materials.to_csv(sep="\t")
+    )
+    return "\n".join(result) + "\n"
+
+
+@pytest.mark.parametrize("chunksize", [1, 10000])
+def test_tsv_steps_in_production_order(decomposition, chunksize):
+    buffer = io.StringIO()
+    write_plan(decomposition, buffer, chunksize=chunksize)
+    assert buffer.getvalue() == expected_tsv(decomposition)
+    assert buffer.getvalue().startswith("Step 1 is: \ntypeName")
+
+    array = ArrayDecomposition(
+        step=decomposition.step, decompositor=decomposition.decompositor
+    )
+    array_buffer = io.StringIO()
+    write_plan(array, array_buffer, chunksize=chunksize)
+    assert array_buffer.getvalue() == buffer.getvalue()
+
+
+def test_lazy_decomposition_without_kept_steps(decomposition, setup):
+    expected = io.StringIO()
+    write_plan(decomposition, expected, setup=setup)
+
+    streamed = Decomposition(
+        step=decomposition.step,
+        decompositor=decomposition.decompositor,
+        lazy=True,
+        keep_steps=False,
+    )
+    buffer = io.StringIO()
+    write_plan(streamed, buffer, setup=setup)
+
+    assert buffer.getvalue() == expected.getvalue()
+    assert streamed.depth == 2
+
+
+def test_csv_balancing(decomposition, setup):
+    buffer = io.StringIO()
+    write_plan(decomposition, buffer, fmt=FORMAT_CSV, setup=setup)
+    text = buffer.getvalue()
+
+    assert text.startswith("Step 1 is: \ntypeName,")
+    assert "\nRequired materials:\ntypeName,quantity\n" in text
+    assert (
+        'Balancing runs for step 1:\ntypeName,lines\nTengu,"2 x 1 + 3 x 6, total - 7"'
+        in text
+    )
+
+
+def test_json_lines(decomposition, setup):
+    buffer = io.StringIO()
+    write_plan(decomposition, buffer, fmt=FORMAT_JSONL, setup=setup, chunksize=1)
+    records = [json.loads(line) for line in buffer.getvalue().splitlines()]
+
+    steps = [record for record in records if record["section"] == "step"]
+    assert [(r["step"], r["typeName"]) for r in steps] == [
+        (1, "Tengu"),
+        (1, "Fulleroferrocene"),
+        (2, "Superconducting Gravimetric Amplifier"),
+    ]
+    assert {
+        "section": "balancing",
+        "step": 1,
+        "typeName": "Fulleroferrocene",
+        "lines": 3,
+        "runs": 5,
+        "longer": 0,
+    } in records
+    assert records[-1] == {
+        "section": "materials",
+        "typeName": "Fullerite-C60",
+        "quantity": 1500,
+    }
+
+
+def test_unknown_format(decomposition):
+    with pytest.raises(ValueError):
+        write_plan(decomposition, io.StringIO(), fmt="xml")
@@ -0,0 +1,95 @@
+import numpy as np
+import pytest
+
+from benchmarks.synthetic_sde import write_synthetic_sde
+from fetchlib.blueprint import Blueprint, BlueprintCollection
+from fetchlib.decomposition import Decomposition
+from fetchlib.decompositor import Decompositor
+from fetchlib.engine import TopologicalDecomposition
+from fetchlib.scheduler import schedule
+from fetchlib.setup import Setup
+from fetchlib.static_data_export import StaticDataExport
+
+from .test_static_data_export import fde
+
+
+def assert_feasible(result, decomposition):
+    jobs = result.jobs
+    graph = decomposition.decompositor.data_export.recipe_graph
+    # Lines run a single job at a time
+    for _, line in jobs.groupby(["activityID", "line"]):
+        line = line.sort_values("start")
+        assert (line["start"].to_numpy()[1:] >= line["finish"].to_numpy()[:-1]).all()
+    # Node starts after all jobs of nodes producing its inputs
+    finish = jobs.groupby(["typeID", "level"])["finish"].max()
+    for (type_id, level), node in jobs.groupby(["typeID", "level"]):
+        _, material_ids, _ = graph.expand(np.array([type_id]))
+        for material_id in material_ids:
+            deeper = [
+                finish[(material_id, deeper_level)]
+                for deeper_level in range(level + 1, jobs["level"].max() + 1)
+                if (material_id, deeper_level) in finish.index
+            ]
+            if deeper:
+                assert node["start"].min() >= deeper[0]
+    assert result.makespan >= result.lower_bound
+
+
+def test_schedule_of_fake_data_export():
+    setup = Setup(path=None)
+    setup.production_lines, setup.reaction_lines = 5, 1
+    setup.collection = BlueprintCollection(
+        [Blueprint("Tengu", material_efficiency=0.0, time_efficiency=0.2, runs=3)]
+    )
+    table = fde.create_init_table(Tengu=20, Fulleroferrocene=1500)
+    decomposition = Decomposition(step=table, decompositor=Decompositor(fde, setup))
+    result = schedule(decomposition)
+
+    tengu = result.jobs[result.jobs["typeName"] == "Tengu"]
+    # 20 runs of at most 3 runs per job fill two rounds of 5 lines
+    assert list(tengu["runs"]) == [2] * 10
+    assert tengu["finish"].max() == pytest.approx(result.makespan)
+    assert result.makespan == pytest.approx(30600 + 2 * 2 * 300000 * 0.8)
+    assert result.utilization.loc[1, "lines"] == 5
+    assert_feasible(result, decomposition)
+    assert "Makespan: 11d 11:10:00" in str(result)
+
+
+@pytest.mark.parametrize("engine", [Decomposition, TopologicalDecomposition])
+def test_schedule_of_synthetic_sde(tmp_path, engine):
+    top = write_synthetic_sde(
+        tmp_path / "eve.db",
+        raw=40,
+        levels=(30, 60, 60, 20),
+        inputs=(2, 4),
+        skip=0.1,
+        material_quantity=(1, 3),
+    )
+    data_export = StaticDataExport(tmp_path / "eve.db")
+    setup = Setup(path=None)
+    setup.production_lines, setup.reaction_lines = 11, 4
+    setup.collection = BlueprintCollection(
+        [Blueprint(f"Item {i}", 0.1, 0.2, runs=5) for i in range(40, 200, 2)]
+    )
+    table = data_export.create_init_table(**{name: 3 for name in top[:4]})
+    decomposition = engine(step=table, decompositor=Decompositor(data_export, setup))
+    result = schedule(decomposition)
+
+    runs = result.jobs.groupby(["typeID", "level"])["runs"].sum()
+    _, max_runs = decomposition.decompositor.efficiency(
+        result.jobs["typeID"].to_numpy()
+    )
+    assert (result.jobs["runs"].to_numpy() <= max_runs).all()
+    assert runs.sum() == sum(
+        np.ceil(step["runs_required"]).sum() for step in decomposition.steps
+    )
+    assert_feasible(result, decomposition)
+
+
+def test_schedule_with_too_many_jobs():
+    table = fde.create_init_table(Tengu=10**7)
+    decomposition = Decomposition(
+        step=table, decompositor=Decompositor(fde, Setup(path=None))
+    )
+    with pytest.raises(ValueError):
+        schedule(decomposition, lines={1: 10**6})
@@ -0,0 +1,97 @@
+import sqlite3
+
+import pytest
+
+from fetchlib import static_data_export
+from fetchlib.sde_version import VersionManifest
+from fetchlib.static_data_export import RECIPE_GRAPH_DIR, StaticDataExport
+
+from .test_static_data_export import fde, write_sqlite
+
+
+@pytest.fixture
+def remote(tmp_path, monkeypatch):
+    """Fake fuzzwork: `state` holds published ETag and sql applied on download."""
+    state = {"etag": '"1"', "sql": None, "downloads": 0}
+
+    def remote_version(url):
+        return {"etag": state["etag"], "last_modified": None}
+
+    def download_and_decompress(url, dest, **kwargs):
+        state["downloads"] += 1
+        tmp = write_sqlite(fde, tmp_path / "new.db")
+        with sqlite3.connect(str(tmp)) as conn:
+            if state["sql"]:
+                conn.execute(state["sql"])
+        conn.close()
+        tmp.replace(dest)
+
+    monkeypatch.setattr(static_data_export, "remote_version", remote_version)
+    monkeypatch.setattr(
+        static_data_export, "download_and_decompress", download_and_decompress
+    )
+    monkeypatch.setattr(static_data_export, "fetch_md5", lambda url: None)
+    return state
+
+
+def test_version_manifest_is_created_on_download(tmp_path, remote):
+    data_export = StaticDataExport(tmp_path / "eve.db")
+    version = data_export.version
+
+    manifest = VersionManifest.load(data_export.manifest_path)
+    assert manifest.etag == '"1"'
+    assert version == manifest.version
+    assert set(manifest.tables) == set(static_data_export.TABLE_QUERIES)
+
+
+def test_version_depends_on_content_only(tmp_path):
+    first = StaticDataExport(write_sqlite(fde, tmp_path / "first.db"))
+    second = StaticDataExport(write_sqlite(fde, tmp_path / "second.db"))
+
+    assert first.version == second.version
+
+
+def test_no_refresh_without_update(tmp_path, remote):
+    data_export = StaticDataExport(tmp_path / "eve.db")
+
+    assert not data_export.check_for_update()
+    assert data_export.refresh() == set()
+    assert remote["downloads"] == 1
+
+
+def test_refresh_rebuilds_only_changed(tmp_path, remote):
+    data_export = StaticDataExport(tmp_path / "eve.db")
+    version = data_export.version
+    assert data_export.recipe_graph.material_quantities.max() == 100
+    snapshot = data_export.snapshot.directory
+    types_file = snapshot / "types" / "typeID.npy"
+    types_inode = types_file.stat().st_ino
+    materials_inode = (snapshot / "materials" / "quantity.npy").stat().st_ino
+
+    remote["etag"] = '"2"'
+    remote[
+        "sql"
+    ] = "update industryActivityMaterials set quantity = 150 where quantity = 100"
+    assert data_export.check_for_update()
+
+    assert data_export.refresh() == {"materials"}
+    assert data_export.version != version
+    assert types_file.stat().st_ino == types_inode
+    assert (snapshot / "materials" / "quantity.npy").stat().st_ino != materials_inode
+    assert not (snapshot / RECIPE_GRAPH_DIR).exists()
+    assert data_export.materials["quantity"].max() == 150
+    assert data_export.recipe_graph.material_quantities.max() == 150
+
+
+def test_refresh_keeps_unrelated_artifacts(tmp_path, remote):
+    data_export = StaticDataExport(tmp_path / "eve.db")
+    data_export.recipe_graph
+    graph_file = data_export.snapshot.directory / RECIPE_GRAPH_DIR / "indptr.npy"
+    graph_inode = graph_file.stat().st_ino
+
+    remote["etag"] = '"2"'
+    remote["sql"] = "update invMarketGroups set marketGroupName = 'Other'"
+
+    assert data_export.refresh() == {"market_groups"}
+    assert graph_file.stat().st_ino == graph_inode
+    assert set(data_export.market_groups["marketGroupName"]) == {"Other"}
@@ -0,0 +1,67 @@
+import numpy as np
+
+from fetchlib.blueprint import Blueprint, BlueprintCollection
+from fetchlib.decompositor import Decompositor
+from fetchlib.rig import MediumSetIndustryRig, RigSet
+from fetchlib.setup import DEFAULT_RUNS, Setup
+from fetchlib.utils import ProductionClass, SpaceType
+
+from .test_static_data_export import FakeDataExport
+
+
+def test_fingerprint_ignores_order_of_changes():
+    first, second = Setup(path=None), Setup(path=None)
+    first.collection.add(Blueprint("Tengu", 0.1, 0.2), Blueprint("Raven", 0.1, 0.2))
+    second.collection.add(Blueprint("Raven", 0.1, 0.2), Blueprint("Tengu", 0.1, 0.2))
+    assert first.fingerprint == second.fingerprint
+
+    second.production_lines = 5
+    assert first.efficiency_fingerprint == second.efficiency_fingerprint
+    assert first.expansion_fingerprint == second.expansion_fingerprint
+    assert first.fingerprint != second.fingerprint
+
+    second._non_productables = {"Tengu"}
+    assert first.efficiency_fingerprint == second.efficiency_fingerprint
+    assert first.expansion_fingerprint != second.expansion_fingerprint
+
+
+def test_efficiency_arrays_match_efficiency_impact():
+    data_export = FakeDataExport()
+    setup = Setup(path=None)
+    setup.collection = BlueprintCollection([Blueprint("Tengu", 0.1, 0.2, runs=3)])
+    setup.rig_set = RigSet(
+        [MediumSetIndustryRig(ProductionClass.ADVANCED_COMPONENT, tier=2)]
+    )
+    impact = setup.efficiency_impact(data_export)
+    type_ids = data_export.type_ids(impact.index)
+
+    me_impact, te_impact, run = setup.efficiency_arrays(data_export).take(type_ids)
+
+    assert np.allclose(me_impact, impact["me_impact"])
+    assert np.allclose(te_impact, impact["te_impact"])
+    assert np.allclose(run, impact["run"])
+    assert (
+        list(setup.efficiency_arrays(data_export).take([-1, 10**9])[2])
+        == [DEFAULT_RUNS] * 2
+    )
+
+
+def test_efficiency_arrays_are_cached_by_fingerprint():
+    data_export = FakeDataExport()
+    setup = Setup(path=None)
+    arrays = setup.efficiency_arrays(data_export)
+
+    # Shared between decompositors of equal setups
+    other = Setup(path=None)
+    assert other.efficiency_arrays(data_export) is arrays
+    Decompositor(data_export, other).efficiency(data_export.type_ids(["Tengu"]))
+    assert other.efficiency_arrays(data_export) is arrays
+
+    setup.space_type = SpaceType.LOWSEC
+    assert setup.efficiency_arrays(data_export) is not arrays
+    setup.space_type = SpaceType.NULL_WH
+    assert setup.efficiency_arrays(data_export) is arrays
+
+    # Arrays are dropped together with the data they were built from
+    data_export.cache.invalidate(["efficiency_arrays"])
+    assert setup.efficiency_arrays(data_export) is not arrays
@@ -0,0 +1,56 @@
+import os
+import sqlite3
+
+import pandas as pd
+import pytest
+
+from fetchlib.static_data_export import StaticDataExport
+
+from .test_static_data_export import fde, write_sqlite
+
+TABLES = ["types", "products", "materials", "activities", "market_groups"]
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    return write_sqlite(fde, tmp_path / "eve.db")
+
+
+@pytest.mark.parametrize("table", TABLES)
+def test_snapshot_matches_database(db_path, table):
+    from_snapshot = getattr(StaticDataExport(db_path), table)
+    from_database = getattr(StaticDataExport(db_path, use_snapshot=False), table)
+
+    pd.testing.assert_frame_equal(from_snapshot, from_database)
+
+
+def test_snapshot_is_compiled_once(db_path):
+    StaticDataExport(db_path).types
+    snapshot = StaticDataExport(db_path).snapshot
+    manifest_mtime = snapshot.manifest_path.stat().st_mtime_ns
+
+    assert snapshot.directory == db_path.with_name("eve.db.snapshot")
+    assert snapshot.is_fresh()
+    StaticDataExport(db_path).snapshot
+    assert snapshot.manifest_path.stat().st_mtime_ns == manifest_mtime
+
+
+def test_snapshot_is_rebuilt_on_source_change(db_path):
+    assert "Tengu" in StaticDataExport(db_path).types["typeName"].values
+
+    with sqlite3.connect(str(db_path)) as conn:
+        conn.execute("update invTypes set typeName = 'Legion' where typeID = 29984")
+    conn.close()
+    stat = db_path.stat()
+    os.utime(db_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+    types = StaticDataExport(db_path).types
+    assert "Legion" in types["typeName"].values
+    assert "Tengu" not in types["typeName"].values
+
+
+def test_snapshot_keeps_nulls(db_path):
+    types = StaticDataExport(db_path).types
+    blueprint = types[types["typeName"] == "Tengu Blueprint"]
+
+    assert blueprint["marketGroupID"].isna().all()
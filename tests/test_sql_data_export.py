@@ -0,0 +1,93 @@
+import os
+import sqlite3
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from fetchlib.decomposition import Decomposition
+from fetchlib.decompositor import Decompositor
+from fetchlib.setup import Setup
+from fetchlib.sql_data_export import SqliteDataExport
+from fetchlib.static_data_export import StaticDataExport
+from fetchlib.utils import ProductionClass
+
+from .test_static_data_export import fde, write_sqlite
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    return write_sqlite(fde, tmp_path / "eve.db")
+
+
+def test_sidecar_has_covering_indexes(db_path):
+    data_export = SqliteDataExport(db_path)
+    with data_export.sidecar() as conn:
+        indexes = {
+            name
+            for (name,) in conn.execute(
+                "select name from sqlite_master where type = 'index'"
+            )
+        }
+        plan = conn.execute(
+            "explain query plan select materialTypeID, quantity from materials "
+            "where typeID = 1 and activityID = 1"
+        ).fetchall()
+
+    assert {"materials_by_type", "products_by_product"} <= indexes
+    assert data_export.sidecar_path.exists()
+    assert "COVERING INDEX materials_by_type" in str(plan)
+
+
+def test_lookups_match_in_memory_backend(db_path):
+    sql, memory = SqliteDataExport(db_path), StaticDataExport(db_path)
+    type_ids = [29984, 30371, 30303, 45653, 1]
+
+    for expected, result in zip(
+        memory.recipe_graph.expand(type_ids), sql.recipe_graph.expand(type_ids)
+    ):
+        assert np.array_equal(expected, result)
+    for expected, result in zip(
+        memory.recipe_graph.recipes(type_ids), sql.recipe_graph.recipes(type_ids)
+    ):
+        assert np.array_equal(expected, result)
+    assert list(sql.type_names(type_ids)) == list(memory.type_names(type_ids)[:4]) + [
+        None
+    ]
+    assert list(sql.type_ids(["Tengu", "Nope"])) == [29984, -1]
+    assert list(sql.base_times(type_ids)) == list(memory.base_times(type_ids))
+    assert sql.get_class_contents(
+        ProductionClass.ADVANCED_COMPONENT
+    ) == memory.get_class_contents(ProductionClass.ADVANCED_COMPONENT)
+    assert set(sql.productable_type_names) == set(memory.productable_type_names)
+
+
+def test_decomposition_matches_in_memory_backend(db_path):
+    setup = Setup(path=None)
+    decompositions = [
+        Decomposition(
+            step=data_export.create_init_table(Tengu=20, Fulleroferrocene=1500),
+            decompositor=Decompositor(data_export, setup),
+        )
+        for data_export in (StaticDataExport(db_path), SqliteDataExport(db_path))
+    ]
+    expected, result = decompositions
+
+    for expected_step, step in zip(expected.steps, result.steps):
+        pd.testing.assert_frame_equal(expected_step, step)
+    pd.testing.assert_series_equal(
+        expected.required_materials, result.required_materials
+    )
+
+
+def test_sidecar_is_rebuilt_on_source_change(db_path):
+    data_export = SqliteDataExport(db_path)
+    assert list(data_export.type_ids(["Tengu"])) == [29984]
+
+    with sqlite3.connect(str(db_path)) as conn:
+        conn.execute("update invTypes set typeName = 'Legion' where typeID = 29984")
+    conn.close()
+    stat = db_path.stat()
+    os.utime(db_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+    assert list(data_export.type_ids(["Tengu", "Legion"])) == [-1, 29984]
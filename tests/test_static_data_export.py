@@ -1,7 +1,10 @@
+import sqlite3
+import threading
+
 import pandas as pd
 import pytest
 
-from fetchlib.static_data_export import AbstractDataExport, sde
+from fetchlib.static_data_export import AbstractDataExport, LazyDataExport, sde
 from fetchlib.utils import ProductionClass
 
 types_columns = ["typeID", "groupID", "typeName", "marketGroupID"]
@@ -121,6 +124,19 @@ class FakeDataExport(AbstractDataExport):
 fde = FakeDataExport()
 
 
+def write_sqlite(data_export: AbstractDataExport, path):
+    """Dump data_export to sqlite3 database with the fuzzwork SDE layout."""
+    types = data_export.types.assign(published=1, description="")
+    with sqlite3.connect(str(path)) as conn:
+        types.to_sql("invTypes", conn, index=False)
+        data_export.products.to_sql("industryActivityProducts", conn, index=False)
+        data_export.materials.to_sql("industryActivityMaterials", conn, index=False)
+        data_export.activities.to_sql("industryActivity", conn, index=False)
+        data_export.market_groups.to_sql("invMarketGroups", conn, index=False)
+    conn.close()
+    return path
+
+
 @pytest.mark.parametrize("data_export", [fde, sde])
 def test_sde_has_columns(data_export):
     assert not set(materials_columns) - set(data_export.materials.columns)
@@ -203,3 +219,61 @@ def test_productable_items(data_export):
             for product in productables
         ]
     )
+
+
+@pytest.mark.parametrize("data_export", [fde, sde])
+def test_indexed_views(data_export):
+    types = data_export.types
+    type_ids = types["typeID"].to_numpy()
+
+    assert data_export.types_by_id is data_export.types_by_id
+    assert data_export.types_by_id.index.is_unique
+    assert (
+        types.iloc[data_export.type_positions[type_ids]]["typeID"] == type_ids
+    ).all()
+    assert list(data_export.type_names([type_ids[0], -5, 10**9]))[0] == (
+        types["typeName"].iloc[0]
+    )
+    assert list(data_export.type_ids([types["typeName"].iloc[0], "Nope"])) == [
+        type_ids[0],
+        -1,
+    ]
+
+
+def test_version_is_unique_per_instance():
+    versions = {FakeDataExport().version for _ in range(100)}
+
+    assert len(versions) == 100
+    assert fde.version == fde.version
+
+
+def test_lazy_data_export_is_created_once():
+    created = []
+
+    def factory():
+        created.append(FakeDataExport())
+        return created[-1]
+
+    lazy = LazyDataExport(factory)
+    assert not lazy.is_loaded and not created
+
+    threads = [threading.Thread(target=lambda: lazy.types) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(created) == 1
+    assert lazy.get() is created[0]
+    assert "Tengu" in lazy.productable_type_names.values
+
+
+def test_lazy_data_export_injection():
+    def factory():
+        raise AssertionError("Factory should not be called")
+
+    lazy = LazyDataExport(factory)
+    lazy.inject(fde)
+
+    assert lazy.get() is fde
+    assert lazy.create_init_table(Tengu=1).shape[0] == 1
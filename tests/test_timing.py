@@ -0,0 +1,112 @@
+import numpy as np
+import pytest
+
+from benchmarks.synthetic_sde import write_synthetic_sde
+from fetchlib.blueprint import Blueprint, BlueprintCollection
+from fetchlib.decomposition import Decomposition
+from fetchlib.decompositor import Decompositor
+from fetchlib.engine import TopologicalDecomposition
+from fetchlib.setup import Setup
+from fetchlib.static_data_export import StaticDataExport
+from fetchlib.timing import estimate_time, format_duration, jobs_saved
+
+from .test_static_data_export import fde
+
+
+@pytest.fixture
+def decomposition():
+    setup = Setup(path=None)
+    setup.production_lines, setup.reaction_lines = 5, 1
+    setup.collection = BlueprintCollection(
+        [Blueprint("Tengu", material_efficiency=0.0, time_efficiency=0.2, runs=3)]
+    )
+    table = fde.create_init_table(Tengu=20, Fulleroferrocene=1500)
+    return Decomposition(step=table, decompositor=Decompositor(fde, setup))
+
+
+def test_base_times():
+    assert list(fde.base_times([29984, 30303, 30371, -1, 10**9])) == [
+        300000,
+        10800,
+        0,
+        0,
+        0,
+    ]
+
+
+def test_job_durations(decomposition):
+    jobs = estimate_time(decomposition).jobs.set_index("typeName")
+
+    tengu = jobs.loc["Tengu"]
+    assert (tengu["runs"], tengu["jobs"]) == (20, 7)
+    assert tengu["job_duration"] == pytest.approx(300000 * 3 * 0.8)
+    assert tengu["work"] == pytest.approx(300000 * 20 * 0.8)
+    assert tengu["duration"] == pytest.approx(300000 * 4 * 0.8)
+    reaction = jobs.loc["Fulleroferrocene"]
+    assert (reaction["runs"], reaction["duration"]) == (2, 2 * 10800)
+
+
+def test_step_wall_times(decomposition):
+    steps = estimate_time(decomposition).steps
+
+    assert list(steps.index) == [0, 1]
+    assert steps.loc[0, "production"] == pytest.approx(300000 * 20 * 0.8 / 5)
+    assert steps.loc[0, "reaction"] == 2 * 10800
+    # 251 runs of amplifier are spread over 5 lines, 51 runs at most
+    assert steps.loc[1, "wall_time"] == 600 * 51
+
+
+def test_critical_path(decomposition):
+    estimate = estimate_time(decomposition)
+    path = estimate.critical_path
+
+    assert list(path["typeName"]) == [
+        "Superconducting Gravimetric Amplifier",
+        "Tengu",
+    ]
+    assert path["start"].iloc[1] == path["finish"].iloc[0]
+    assert estimate.critical_path_time == pytest.approx(600 * 51 + 300000 * 4 * 0.8)
+    assert estimate.critical_path_time <= estimate.total_wall_time
+    assert "Critical path: 11d 11:10:00" in str(estimate)
+
+
+def test_inputs_on_skipped_levels(tmp_path):
+    top = write_synthetic_sde(
+        tmp_path / "eve.db", raw=40, levels=(30, 60, 60, 20), inputs=(2, 6), skip=0.2
+    )
+    data_export = StaticDataExport(tmp_path / "eve.db")
+    table = data_export.create_init_table(**{name: 13 for name in top})
+    decomposition = TopologicalDecomposition(
+        step=table, decompositor=Decompositor(data_export, Setup(path=None))
+    )
+    jobs = estimate_time(decomposition).jobs
+    finish = dict(zip(jobs["typeID"], jobs["finish"]))
+    start = jobs["finish"] - jobs["duration"]
+
+    skipped = 0
+    graph = data_export.recipe_graph
+    for row, (type_id, level) in enumerate(zip(jobs["typeID"], jobs["level"])):
+        _, material_ids, _ = graph.expand(np.array([type_id]))
+        for material_id in material_ids.tolist():
+            if material_id in finish:
+                assert start.iloc[row] >= finish[material_id]
+                material_level = jobs["level"][jobs["typeID"] == material_id]
+                skipped += int(material_level.iloc[0] > level + 1)
+    assert skipped
+
+
+def test_jobs_saved():
+    table = fde.create_init_table(
+        **{"Tengu": 1, "Superconducting Gravimetric Amplifier": 1}
+    )
+    report = jobs_saved(table, Decompositor(fde, Setup(path=None)))
+
+    sga = report.jobs.loc["Superconducting Gravimetric Amplifier"]
+    assert (sga["by_depth"], sga["topological"], sga["saved"]) == (2, 1, 1)
+    assert report.total == 1
+    assert "1 saved" in str(report)
+
+
+def test_format_duration():
+    assert format_duration(59.2) == "00:01:00"
+    assert format_duration(86400 + 3661) == "1d 01:01:01"